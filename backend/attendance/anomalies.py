@@ -0,0 +1,357 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import receiver
+
+from .models import AnomalyScanCursor, AttendanceAnomaly, AttendanceProof, ChangeLogEntry
+
+DEFAULTS = {
+    # Physically plausible BLE RSSI for a phone in a lecture room.
+    "RSSI_MIN": -110,
+    "RSSI_MAX": -15,
+    # Flag readings this many standard deviations from the session mean,
+    # once the session has enough readings for the mean to mean something.
+    "RSSI_Z_SCORE": 4.0,
+    "RSSI_MIN_SAMPLES": 20,
+    # More than RATE_MAX accepted proofs within RATE_WINDOW_SECONDS.
+    "RATE_WINDOW_SECONDS": 10,
+    "RATE_MAX": 60,
+    # Sessions without an end time are assumed to last this long.
+    "SESSION_MINUTES": 120,
+    # Per-session state kept in memory.
+    "MAX_SESSIONS": 1000,
+    "STATE_TTL_SECONDS": 6 * 3600,
+}
+
+
+class SessionState:
+    """Sliding-window view of one session's accepted proofs."""
+
+    def __init__(self):
+        self.seen = set()
+        self.students_by_device = {}
+        # Welford running mean/variance of in-range RSSI readings.
+        self.rssi_count = 0
+        self.rssi_mean = 0.0
+        self.rssi_m2 = 0.0
+        self.arrivals = deque()
+        self.burst_flagged_until = None
+        self.touched_at = 0.0
+
+    def rssi_std(self):
+        if self.rssi_count < 2:
+            return 0.0
+        return math.sqrt(self.rssi_m2 / (self.rssi_count - 1))
+
+    def add_rssi(self, rssi):
+        self.rssi_count += 1
+        delta = rssi - self.rssi_mean
+        self.rssi_mean += delta / self.rssi_count
+        self.rssi_m2 += delta * (rssi - self.rssi_mean)
+
+
+class AnomalyEngine:
+    """Flags suspicious proofs once they are accepted; see scan_new_proofs.
+
+    State lives in this process. A session seen for the first time (for
+    example after a restart) is rebuilt from its stored proofs with one
+    query before new proofs are checked against it.
+    """
+
+    def __init__(self, config=None, clock=time.monotonic):
+        self.config = {**DEFAULTS, **(config or {})}
+        self._clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._scanned_seq = None
+
+    def resume(self, last_seq):
+        """Drop all state unless this engine ran the scan that ended at ``last_seq``.
+
+        Another process may have checked proofs in between; the state it
+        built is not here, so sessions are rebuilt from the database.
+        """
+        with self._lock:
+            if last_seq != self._scanned_seq:
+                self._sessions.clear()
+            self._scanned_seq = None
+
+    def scanned(self, last_seq):
+        with self._lock:
+            self._scanned_seq = last_seq
+
+    def observe(self, proofs, unchecked=None):
+        """Return unsaved AttendanceAnomaly rows for newly accepted proofs.
+
+        ``unchecked`` holds the ids of stored proofs not checked yet (the
+        ones in ``proofs`` included); they are left out when a session's
+        state is rebuilt.
+        """
+        anomalies = []
+        by_session = {}
+        for proof in proofs:
+            by_session.setdefault(proof.session_id, []).append(proof)
+        for session_id, session_proofs in by_session.items():
+            if unchecked is None:
+                state = self._state(session_id, exclude={proof.id for proof in session_proofs})
+            else:
+                state = self._state(session_id, exclude=unchecked)
+            with self._lock:
+                for proof in session_proofs:
+                    if proof.id in state.seen:
+                        continue
+                    anomalies.extend(self._check(state, proof))
+        anomalies.extend(self._overlapping_sessions(proofs))
+        return anomalies
+
+    def replay(self, session_id):
+        """Check every stored proof of a session from a clean state."""
+        state = SessionState()
+        proofs = list(self._stored_proofs(session_id))
+        anomalies = []
+        for proof in proofs:
+            anomalies.extend(self._check(state, proof))
+        anomalies.extend(self._overlapping_sessions(proofs))
+        return anomalies
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _state(self, session_id, exclude=()):
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+                state.touched_at = now
+                return state
+
+        # The proofs waiting to be checked are already committed; leave them
+        # out so they are checked against the state from before they arrived.
+        hydrated = SessionState()
+        for proof in self._stored_proofs(session_id).exclude(id__in=exclude):
+            self._check(hydrated, proof)
+        hydrated.touched_at = now
+        with self._lock:
+            state = self._sessions.setdefault(session_id, hydrated)
+            while len(self._sessions) > self.config["MAX_SESSIONS"]:
+                self._sessions.popitem(last=False)
+            return state
+
+    def _expire(self, now):
+        cutoff = now - self.config["STATE_TTL_SECONDS"]
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if state.touched_at >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    @staticmethod
+    def _stored_proofs(session_id):
+        return (
+            AttendanceProof.objects.filter(session_id=session_id)
+            .select_related("session")
+            .only(
+                "id",
+                "session__starts_at",
+                "session__ends_at",
+                "student_id",
+                "device_id",
+                "rssi",
+                "created_at",
+            )
+            .order_by("created_at", "id")
+        )
+
+    def _check(self, state, proof):
+        config = self.config
+        state.seen.add(proof.id)
+        found = []
+
+        students = state.students_by_device.setdefault(proof.device_id, set())
+        if students and proof.student_id not in students:
+            found.append(
+                _anomaly(
+                    proof,
+                    AttendanceAnomaly.KIND_SHARED_DEVICE,
+                    {"other_students": sorted(students)},
+                )
+            )
+        students.add(proof.student_id)
+
+        if not config["RSSI_MIN"] <= proof.rssi <= config["RSSI_MAX"]:
+            found.append(
+                _anomaly(
+                    proof,
+                    AttendanceAnomaly.KIND_RSSI_RANGE,
+                    {"rssi": proof.rssi, "min": config["RSSI_MIN"], "max": config["RSSI_MAX"]},
+                )
+            )
+        else:
+            std = state.rssi_std()
+            if state.rssi_count >= config["RSSI_MIN_SAMPLES"] and std > 0:
+                z_score = (proof.rssi - state.rssi_mean) / std
+                if abs(z_score) > config["RSSI_Z_SCORE"]:
+                    found.append(
+                        _anomaly(
+                            proof,
+                            AttendanceAnomaly.KIND_RSSI_OUTLIER,
+                            {
+                                "rssi": proof.rssi,
+                                "session_mean": round(state.rssi_mean, 1),
+                                "z_score": round(z_score, 1),
+                            },
+                        )
+                    )
+            state.add_rssi(proof.rssi)
+
+        window = timedelta(seconds=config["RATE_WINDOW_SECONDS"])
+        state.arrivals.append(proof.created_at)
+        while state.arrivals and state.arrivals[0] <= proof.created_at - window:
+            state.arrivals.popleft()
+        if len(state.arrivals) > config["RATE_MAX"] and (
+            state.burst_flagged_until is None or proof.created_at >= state.burst_flagged_until
+        ):
+            # One flag per window, not one per proof in the burst.
+            state.burst_flagged_until = proof.created_at + window
+            found.append(
+                _anomaly(
+                    proof,
+                    AttendanceAnomaly.KIND_SUBMISSION_BURST,
+                    {
+                        "proofs": len(state.arrivals),
+                        "window_seconds": config["RATE_WINDOW_SECONDS"],
+                    },
+                )
+            )
+        return found
+
+    def _overlapping_sessions(self, proofs):
+        """Flag students whose earlier attendance overlaps this session in time.
+
+        Only the later proof of an overlapping pair is flagged, whether the
+        two are checked together or apart.
+        """
+        if not proofs:
+            return []
+        duration = timedelta(minutes=self.config["SESSION_MINUTES"])
+        earliest = min(proof.created_at for proof in proofs) - 2 * duration
+        others = {}
+        rows = AttendanceProof.objects.filter(
+            student_id__in={proof.student_id for proof in proofs},
+            created_at__gte=earliest,
+            created_at__lte=max(proof.created_at for proof in proofs),
+        ).values(
+            "id",
+            "student_id",
+            "session_id",
+            "created_at",
+            "session__starts_at",
+            "session__ends_at",
+        )
+        for row in rows:
+            others.setdefault(row["student_id"], []).append(row)
+
+        found = []
+        for proof in proofs:
+            starts_at = proof.session.starts_at
+            ends_at = proof.session.ends_at or starts_at + duration
+            for row in others.get(proof.student_id, ()):
+                if row["session_id"] == proof.session_id or (row["created_at"], row["id"]) >= (
+                    proof.created_at,
+                    proof.id,
+                ):
+                    continue
+                other_ends_at = row["session__ends_at"] or row["session__starts_at"] + duration
+                if row["session__starts_at"] < ends_at and starts_at < other_ends_at:
+                    found.append(
+                        _anomaly(
+                            proof,
+                            AttendanceAnomaly.KIND_OVERLAPPING_SESSIONS,
+                            {"other_session": row["session_id"]},
+                        )
+                    )
+                    break
+        return found
+
+
+def _anomaly(proof, kind, detail):
+    return AttendanceAnomaly(
+        session_id=proof.session_id,
+        proof_id=proof.id,
+        kind=kind,
+        student_id=proof.student_id,
+        device_id=proof.device_id,
+        detail=detail,
+    )
+
+
+def save_anomalies(anomalies):
+    # (proof, kind) is unique, so re-detected anomalies are skipped.
+    AttendanceAnomaly.objects.bulk_create(anomalies, ignore_conflicts=True)
+
+
+_engine = None
+
+
+def get_anomaly_engine():
+    global _engine
+    if _engine is None:
+        _engine = AnomalyEngine(getattr(settings, "ATTENDANCE_ANOMALIES", {}))
+    return _engine
+
+
+def scan_new_proofs(batch_size=2000):
+    """Check proofs logged since the last scan. Returns the number of anomalies found.
+
+    run_session_sweeper calls this, so uploads never wait on the checks. The
+    cursor is a ChangeLogEntry.seq, so run assign_sequence() first; the row
+    lock keeps concurrent sweepers from checking the same proofs twice.
+    """
+    engine = get_anomaly_engine()
+    found = 0
+    while True:
+        with transaction.atomic():
+            cursor, _ = AnomalyScanCursor.objects.select_for_update().get_or_create(pk=1)
+            proofs_logged = ChangeLogEntry.objects.filter(
+                kind=ChangeLogEntry.KIND_PROOF, deleted=False
+            )
+            entries = list(
+                proofs_logged.filter(seq__gt=cursor.last_seq)
+                .order_by("seq")
+                .values_list("seq", "object_id")[:batch_size]
+            )
+            if not entries:
+                return found
+            engine.resume(cursor.last_seq)
+            # Deleted proofs are simply missing here.
+            proofs = list(
+                AttendanceProof.objects.filter(id__in=[object_id for _, object_id in entries])
+                .select_related("session")
+                .order_by("created_at", "id")
+            )
+            unchecked = proofs_logged.filter(
+                Q(seq__gt=cursor.last_seq) | Q(seq__isnull=True)
+            ).values("object_id")
+            anomalies = engine.observe(proofs, unchecked=unchecked)
+            save_anomalies(anomalies)
+            cursor.last_seq = entries[-1][0]
+            cursor.save(update_fields=["last_seq"])
+        engine.scanned(cursor.last_seq)
+        found += len(anomalies)
+
+
+@receiver(setting_changed)
+def _reset_anomaly_engine(setting, **kwargs):
+    global _engine
+    if setting == "ATTENDANCE_ANOMALIES":
+        _engine = None
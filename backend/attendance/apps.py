@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class AttendanceConfig(AppConfig):
     name = 'attendance'
+
+    def ready(self):
+        from . import authentication  # noqa: F401  (cache eviction receivers)
+        from . import conditional  # noqa: F401  (session list change markers)
+        from . import signing  # noqa: F401  (device key eviction receivers)
+        from . import sync  # noqa: F401  (session change log receivers)
+        from .history import invalidate_history
+        from .live import publish_accepted_proofs
+        from .signals import proofs_accepted
+
+        proofs_accepted.connect(publish_accepted_proofs, dispatch_uid="attendance.live")
+        proofs_accepted.connect(invalidate_history, dispatch_uid="attendance.history")
@@ -0,0 +1,209 @@
+import gzip
+import heapq
+import json
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, UUIDField
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    ArchivedSession,
+    AttendanceAnomaly,
+    AttendanceProof,
+    AttendanceReplayGuard,
+    ProofArchive,
+    Session,
+)
+from .sync import untracked_proof_deletes
+from .validation import STATUS_FAIL
+
+PROOF_FIELDS = [field.attname for field in AttendanceProof._meta.concrete_fields]
+DATETIME_FIELDS = {
+    field.attname
+    for field in AttendanceProof._meta.concrete_fields
+    if isinstance(field, DateTimeField)
+}
+UUID_FIELDS = {
+    field.attname
+    for field in AttendanceProof._meta.concrete_fields
+    if isinstance(field, UUIDField)
+}
+CHUNK_SIZE = 2000
+
+
+class ArchiveChanged(Exception):
+    """Proofs changed while they were being archived; nothing was deleted."""
+
+
+def archive_root():
+    config = getattr(settings, "ATTENDANCE_ARCHIVE", {})
+    return Path(config.get("ROOT", Path(settings.BASE_DIR) / "archive"))
+
+
+def term_for(starts_at):
+    """Label like "2026-T1"; ATTENDANCE_ARCHIVE["TERM_MONTHS"] months per term."""
+    months = getattr(settings, "ATTENDANCE_ARCHIVE", {}).get("TERM_MONTHS", 6)
+    local = timezone.localtime(starts_at)
+    return f"{local.year}-T{(local.month - 1) // months + 1}"
+
+
+def archivable_sessions(before):
+    """Closed sessions that started before ``before`` and still have hot proofs."""
+    return Session.objects.filter(
+        active=False, starts_at__lt=before, archive_entry__isnull=True
+    ).order_by("starts_at", "id")
+
+
+def archive_sessions(sessions):
+    """Move the proofs of ``sessions`` into one archive file per course and term.
+
+    Each file is written completely before any row is deleted, and the rows
+    are deleted in one transaction per file, so a crash leaves either hot
+    rows or an archive (plus, at worst, an unreferenced file).
+    """
+    groups = {}
+    for session in sessions:
+        groups.setdefault((session.course_code, term_for(session.starts_at)), []).append(session)
+    return [
+        _archive_group(course_code, term, group)
+        for (course_code, term), group in sorted(groups.items())
+    ]
+
+
+def _archive_group(course_code, term, sessions):
+    session_ids = [session.id for session in sessions]
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    relative = Path(_safe(term)) / _safe(course_code) / f"proofs-{stamp}.jsonl.gz"
+    target = archive_root() / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + ".partial")
+
+    per_session = Counter()
+    per_student = {}
+    anomalies = {}
+    for row in AttendanceAnomaly.objects.filter(session_id__in=session_ids).values(
+        "proof_id", "kind", "detail", "created_at"
+    ):
+        row["created_at"] = row["created_at"].isoformat()
+        anomalies.setdefault(row.pop("proof_id"), []).append(row)
+
+    proofs = (
+        AttendanceProof.objects.filter(session_id__in=session_ids)
+        .order_by("session__starts_at", "session_id", "created_at", "id")
+        .values_list(*PROOF_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    try:
+        with gzip.open(partial, "wt", encoding="utf-8") as handle:
+            for values in proofs:
+                record = {name: _to_json(value) for name, value in zip(PROOF_FIELDS, values)}
+                record["anomalies"] = anomalies.get(record["id"], [])
+                handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+                per_session[record["session_id"]] += 1
+                counts = per_student.setdefault(record["student_id"], [0, 0])
+                counts[0] += 1
+                if record["validation_status"] != STATUS_FAIL:
+                    counts[1] += 1
+        os.replace(partial, target)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    try:
+        with transaction.atomic():
+            archive = ProofArchive.objects.create(
+                course_code=course_code,
+                term=term,
+                path=relative.as_posix(),
+                proof_count=sum(per_session.values()),
+                student_counts=per_student,
+            )
+            ArchivedSession.objects.bulk_create(
+                ArchivedSession(
+                    session_id=session_id, archive=archive, proof_count=per_session[session_id]
+                )
+                for session_id in session_ids
+            )
+            AttendanceReplayGuard.objects.filter(session_id__in=session_ids).delete()
+            AttendanceAnomaly.objects.filter(session_id__in=session_ids).delete()
+            with untracked_proof_deletes():
+                deleted = AttendanceProof.objects.filter(session_id__in=session_ids).delete()[1]
+            if deleted.get(AttendanceProof._meta.label, 0) != archive.proof_count:
+                raise ArchiveChanged(course_code, term)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    return archive
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _safe(part):
+    return "".join(char if char.isalnum() or char in "-_" else "_" for char in part) or "_"
+
+
+def read_archive(archive, session_ids=None):
+    """Yield unsaved AttendanceProof objects from one archive file, lazily.
+
+    Proofs come out in the order they were written: by session start, then
+    arrival. ``proof.archived_anomalies`` holds the proof's anomaly records.
+    """
+    wanted = set(session_ids) if session_ids is not None else None
+    with gzip.open(archive_root() / archive.path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            record = json.loads(line)
+            if wanted is not None and record["session_id"] not in wanted:
+                continue
+            anomalies = record.pop("anomalies", [])
+            for name in DATETIME_FIELDS:
+                if record[name] is not None:
+                    record[name] = parse_datetime(record[name])
+            for name in UUID_FIELDS:
+                # Files written before a field existed lack it.
+                if record.get(name) is not None:
+                    record[name] = uuid.UUID(record[name])
+            proof = AttendanceProof(**record)
+            proof.archived_anomalies = anomalies
+            yield proof
+
+
+def archived_proofs(sessions):
+    """Proofs of the archived ``sessions``, merged across archive files.
+
+    ``sessions`` is a Session queryset; each proof's ``session`` is set from
+    it. Nothing is queried or opened until the result is consumed, and the
+    order matches the export (session start, session id, arrival).
+    """
+    entries = ArchivedSession.objects.filter(session__in=sessions).select_related(
+        "archive", "session"
+    )
+    by_session = {}
+    by_archive = {}
+    for entry in entries:
+        by_session[entry.session_id] = entry.session
+        by_archive.setdefault(entry.archive_id, (entry.archive, []))[1].append(entry.session_id)
+    streams = [read_archive(archive, ids) for archive, ids in by_archive.values()]
+    for proof in heapq.merge(
+        *streams,
+        key=lambda proof: (
+            by_session[proof.session_id].starts_at,
+            proof.session_id,
+            proof.created_at,
+            proof.id,
+        ),
+    ):
+        proof.session = by_session[proof.session_id]
+        yield proof
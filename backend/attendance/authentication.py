@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+
+class CachedIdentity(NamedTuple):
+    user_id: int
+    username: str
+    first_name: str
+    is_active: bool
+    is_staff: bool
+    is_superuser: bool
+    profile_id: Optional[int]
+    role: Optional[str]
+    matric_number: Optional[str]
+
+    @classmethod
+    def from_user(cls, user):
+        profile = getattr(user, "profile", None)
+        return cls(
+            user_id=user.pk,
+            username=user.username,
+            first_name=user.first_name,
+            is_active=user.is_active,
+            is_staff=user.is_staff,
+            is_superuser=user.is_superuser,
+            profile_id=profile.pk if profile else None,
+            role=profile.role if profile else None,
+            matric_number=profile.matric_number if profile else None,
+        )
+
+    def build_user(self):
+        """Rebuild ``request.user`` with ``user.profile`` already attached.
+
+        The instances only carry the fields above and must not be saved.
+        """
+        user = User(
+            id=self.user_id,
+            username=self.username,
+            first_name=self.first_name,
+            is_active=self.is_active,
+            is_staff=self.is_staff,
+            is_superuser=self.is_superuser,
+        )
+        user._state.adding = False
+        user._state.db = DEFAULT_DB_ALIAS
+        if self.profile_id is not None:
+            profile = UserProfile(
+                id=self.profile_id,
+                user=user,
+                role=self.role,
+                matric_number=self.matric_number,
+            )
+            profile._state.adding = False
+            profile._state.db = DEFAULT_DB_ALIAS
+            user.profile = profile
+        return user
+
+
+class TokenIdentityCache:
+    """Bounded LRU of token key -> CachedIdentity with a per-entry TTL."""
+
+    def __init__(self, max_entries, ttl_seconds, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            identity, expires_at = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return identity
+
+    def set(self, key, identity):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (identity, self._clock() + self.ttl_seconds)
+            self._keys_by_user.setdefault(identity.user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].user_id
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+_identity_cache = None
+
+
+def get_identity_cache():
+    global _identity_cache
+    if _identity_cache is None:
+        config = getattr(settings, "ATTENDANCE_AUTH_CACHE", {})
+        _identity_cache = TokenIdentityCache(
+            max_entries=config.get("MAX_ENTRIES", 10000),
+            ttl_seconds=config.get("TTL_SECONDS", 5),
+        )
+    return _identity_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that resolves user and profile from memory.
+
+    A cache miss costs one query joining token, user and profile. Entries
+    are evicted when the token is deleted or the user or profile changes
+    in this process. Other processes only find out when their entry
+    expires, so a revoked token or deactivated user is still accepted
+    there for up to TTL_SECONDS; keep it short.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_identity_cache()
+        identity = cache.get(key)
+        if identity is None:
+            try:
+                token = Token.objects.select_related("user__profile").get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Invalid token.")
+            identity = CachedIdentity.from_user(token.user)
+            cache.set(key, identity)
+
+        if not identity.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        user = identity.build_user()
+        return (user, Token(key=key, user=user))
+
+
+@receiver(post_delete, sender=Token)
+def _evict_deleted_token(sender, instance, **kwargs):
+    get_identity_cache().delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _evict_changed_user(sender, instance, **kwargs):
+    get_identity_cache().delete_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def _evict_changed_profile(sender, instance, **kwargs):
+    get_identity_cache().delete_user(instance.user_id)
+
+
+@receiver(setting_changed)
+def _reset_identity_cache(setting, **kwargs):
+    global _identity_cache
+    if setting == "ATTENDANCE_AUTH_CACHE":
+        _identity_cache = None
@@ -0,0 +1,101 @@
+import base64
+import binascii
+import re
+import struct
+import zlib
+from typing import NamedTuple, Optional
+
+# Compact acoustic token: session u32, version tag u8, issued u32 (unix
+# seconds), 5-byte challenge, CRC-16/XMODEM of the preceding 14 bytes. Sent
+# as 26 characters of unpadded base32 (RFC 4648, either case).
+COMPACT_FORMAT = struct.Struct(">IBI5sH")
+COMPACT_BYTES = COMPACT_FORMAT.size
+CHALLENGE_BYTES = 5
+COMPACT_LENGTH = 26
+# 26 base32 characters hold 130 bits; the last two are always zero.
+_PAD_BITS = COMPACT_LENGTH * 5 - COMPACT_BYTES * 8
+_BASE32 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+# base32 byte -> the digit int(..., 32) reads for it; anything else -> "!",
+# which int() rejects.
+_BASE32_TO_INT = bytearray(b"!" * 256)
+for _value, _char in enumerate(_BASE32):
+    _BASE32_TO_INT[_char] = _BASE32_TO_INT[bytes([_char]).lower()[0]] = (
+        b"0123456789abcdefghijklmnopqrstuv"[_value]
+    )
+_BASE32_TO_INT = bytes(_BASE32_TO_INT)
+_TAG_VERSIONS = [f"#{tag:02x}" for tag in range(256)]
+
+ACOUSTIC_PATTERN = re.compile(
+    r"ac\|(\d+)\|([A-Za-z0-9_.-]+)\|(\d{10})\|([A-Za-z0-9_]+)", re.ASCII
+)
+BLE_PATTERN = re.compile(r"ble\|(\d+)\|(\d{10})\|([A-Za-z0-9_]+)", re.ASCII)
+
+
+class AcousticToken(NamedTuple):
+    session_id: int
+    # The token_version string, or "#xx" (its version_tag in hex) when the
+    # token was sent in compact form.
+    version: str
+    issued: int
+    challenge: str
+    compact: bool = False
+
+    def matches_version(self, version):
+        if self.compact:
+            return self.version == _TAG_VERSIONS[version_tag(version)]
+        return self.version == version
+
+
+class BleNonce(NamedTuple):
+    session_id: int
+    issued: int
+    nonce: str
+
+
+def version_tag(version):
+    """The one byte of a token_version a compact token has room for."""
+    return zlib.crc32(version.encode()) & 0xFF
+
+
+def decode_acoustic(token) -> Optional[AcousticToken]:
+    """Parse either acoustic form; None if the token is malformed."""
+    if not token.startswith("ac|"):
+        return _decode_compact(token) if len(token) == COMPACT_LENGTH else None
+    match = ACOUSTIC_PATTERN.fullmatch(token)
+    if match is None:
+        return None
+    session, version, issued, challenge = match.groups()
+    return AcousticToken(int(session), version, int(issued), challenge)
+
+
+def _decode_compact(token):
+    try:
+        value = int(token.encode("ascii").translate(_BASE32_TO_INT), 32)
+    except (UnicodeEncodeError, ValueError):
+        return None
+    if value & ((1 << _PAD_BITS) - 1):
+        return None
+    raw = (value >> _PAD_BITS).to_bytes(COMPACT_BYTES, "big")
+    session, tag, issued, challenge, checksum = COMPACT_FORMAT.unpack(raw)
+    if binascii.crc_hqx(raw[:-2], 0) != checksum:
+        return None
+    return AcousticToken(session, _TAG_VERSIONS[tag], issued, challenge.hex(), True)
+
+
+def encode_acoustic(session_id, version, issued, challenge, compact=False):
+    """Build an acoustic token; ``challenge`` is bytes for the compact form."""
+    if not compact:
+        return f"ac|{session_id}|{version}|{issued}|{challenge}"
+    if len(challenge) != CHALLENGE_BYTES:
+        raise ValueError(f"Compact challenges are {CHALLENGE_BYTES} bytes.")
+    body = COMPACT_FORMAT.pack(session_id, version_tag(version), issued, challenge, 0)[:-2]
+    raw = body + struct.pack(">H", binascii.crc_hqx(body, 0))
+    return base64.b32encode(raw).decode().rstrip("=")
+
+
+def decode_ble(nonce) -> Optional[BleNonce]:
+    match = BLE_PATTERN.fullmatch(nonce)
+    if match is None:
+        return None
+    session, issued, value = match.groups()
+    return BleNonce(int(session), int(issued), value)
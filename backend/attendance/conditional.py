@@ -0,0 +1,137 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import RoomProximityThreshold, Session, SessionListMarker, UserProfile
+
+# GET /api/sessions/ change markers, kept as SessionListMarker rows so the
+# web workers and the sweeper process all see the same values. Students all
+# see the same active list, so they share one marker; each lecturer sees
+# only their own sessions and gets a marker of their own. Changes that can
+# alter anyone's rows (lecturer names, room thresholds) bump a third marker
+# that every ETag includes.
+STUDENTS = "students"
+EVERYONE = "everyone"
+
+
+def _max_age():
+    # Validators also roll over this often, so a change no marker tracks is
+    # picked up within this many seconds.
+    return getattr(settings, "ATTENDANCE_SESSION_LIST", {}).get("MARKER_TTL_SECONDS", 300)
+
+
+def _scope(request):
+    profile = request.user.profile
+    if profile.role == UserProfile.ROLE_LECTURER:
+        return f"lecturer:{profile.pk}"
+    return STUDENTS
+
+
+def bump_session_list(lecturer_ids=(), everyone=False):
+    """Mark the students' list, and the given lecturers' lists, as changed.
+
+    Call it in the transaction that makes the change, so the markers commit
+    together with the rows. Scopes are updated in sorted order so two
+    writers never lock the same markers in opposite orders.
+    """
+    scopes = [EVERYONE] if everyone else [STUDENTS, *(f"lecturer:{pk}" for pk in lecturer_ids)]
+    now = timezone.now()
+    for scope in sorted(set(scopes)):
+        if _increment(scope, now):
+            continue
+        try:
+            with transaction.atomic():
+                SessionListMarker.objects.create(scope=scope, version=1, changed_at=now)
+        except IntegrityError:
+            # Another writer created the row first.
+            _increment(scope, now)
+
+
+def _increment(scope, now):
+    return SessionListMarker.objects.filter(scope=scope).update(
+        version=F("version") + 1, changed_at=now
+    )
+
+
+def _markers(request):
+    # condition() asks for the ETag and Last-Modified separately; query
+    # once per request. A scope nothing has changed yet has no row.
+    markers = getattr(request, "_session_list_markers", None)
+    if markers is None:
+        scopes = [_scope(request), EVERYONE]
+        found = {
+            scope: (version, changed_at)
+            for scope, version, changed_at in SessionListMarker.objects.filter(
+                scope__in=scopes
+            ).values_list("scope", "version", "changed_at")
+        }
+        markers = tuple(found.get(scope, (0, None)) for scope in scopes)
+        request._session_list_markers = markers
+    return markers
+
+
+def session_list_etag(request, *args, **kwargs):
+    """Changes with the caller's markers, the page/filters requested and the TTL window."""
+    (scope_version, _), (everyone_version, _) = _markers(request)
+    window = int(time.time()) // _max_age()
+    digest = hashlib.blake2b(
+        f"{_scope(request)}|{scope_version}|{everyone_version}|{window}|"
+        f"{request.get_full_path()}".encode(),
+        digest_size=12,
+    )
+    return digest.hexdigest()
+
+
+def session_list_last_modified(request, *args, **kwargs):
+    """Time of the newest marker (or TTL window start), once that second has passed.
+
+    HTTP dates have one-second resolution. A Last-Modified in the current
+    second could hide a change made later in the same second, so none is
+    sent until the second is over; clients fall back to the ETag meanwhile.
+    """
+    now = int(time.time())
+    changed = now - now % _max_age()
+    for _, changed_at in _markers(request):
+        if changed_at is not None:
+            changed = max(changed, int(changed_at.timestamp()))
+    if changed >= now:
+        return None
+    return datetime.fromtimestamp(changed, tz=dt_timezone.utc)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def _session_changed(sender, instance, **kwargs):
+    bump_session_list([instance.created_by_id] if instance.created_by_id else [])
+
+
+@receiver(post_save, sender=RoomProximityThreshold)
+@receiver(post_delete, sender=RoomProximityThreshold)
+def _threshold_changed(sender, **kwargs):
+    bump_session_list(everyone=True)
+
+
+# Lists show the owning lecturer's username and matric number; student
+# accounts appear in none of them.
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def _profile_changed(sender, instance, **kwargs):
+    if instance.role == UserProfile.ROLE_LECTURER:
+        bump_session_list(everyone=True)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    if UserProfile.objects.filter(user_id=instance.pk, role=UserProfile.ROLE_LECTURER).exists():
+        bump_session_list(everyone=True)
@@ -0,0 +1,172 @@
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AttendanceProof, ProofArchive, Session
+from .validation import STATUS_FAIL
+
+# Results are cached under keys that embed version counters. Accepting a
+# proof bumps its student's and course's counters and any session change
+# bumps the sessions counter, so stale entries are never read again and
+# simply age out. The TTL covers sessions that start without being saved.
+KEY_PREFIX = "attendance:history"
+
+
+def _cache_seconds():
+    return getattr(settings, "ATTENDANCE_HISTORY", {}).get("CACHE_SECONDS", 300)
+
+
+def _key(*parts):
+    # Student ids and course codes may hold characters memcached rejects.
+    return ":".join([KEY_PREFIX, *(quote(str(part), safe="") for part in parts)])
+
+
+def _version(*name):
+    key = _key("version", *name)
+    version = cache.get(key)
+    if version is None:
+        # Counters start from the clock, so one evicted and recreated never
+        # repeats a version an old entry was stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(names):
+    for name in names:
+        key = _key("version", *name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_sessions():
+    _bump([("sessions",)])
+
+
+def _percentage(attended, total):
+    return round(attended * 100 / total, 1) if total else None
+
+
+def student_history(student_id):
+    """Attended/total sessions per course for one student, in three queries."""
+    key = _key("student", student_id, _version("student", student_id), _version("sessions"))
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    courses = {}
+    for row in (
+        AttendanceProof.objects.filter(student_id=student_id)
+        .values("session__course_code")
+        .annotate(
+            present=Count("id"),
+            attended=Count("id", filter=~Q(validation_status=STATUS_FAIL)),
+        )
+        .order_by()
+    ):
+        courses[row["session__course_code"]] = {
+            "present": row["present"],
+            "attended": row["attended"],
+        }
+    for course_code, student_counts in ProofArchive.objects.filter(
+        student_counts__has_key=student_id
+    ).values_list("course_code", "student_counts"):
+        present, passed = student_counts[student_id]
+        counts = courses.setdefault(course_code, {"present": 0, "attended": 0})
+        counts["present"] += present
+        counts["attended"] += passed
+
+    totals = _session_totals(courses)
+    result = {
+        "student_id": student_id,
+        "courses": [
+            {
+                "course_code": course_code,
+                "sessions": totals.get(course_code, 0),
+                **counts,
+                "percentage": _percentage(counts["attended"], totals.get(course_code, 0)),
+            }
+            for course_code, counts in sorted(courses.items())
+        ],
+    }
+    cache.set(key, result, _cache_seconds())
+    return result
+
+
+def course_history(course_code):
+    """Attended/total sessions for every student of a course, in three queries."""
+    key = _key("course", course_code, _version("course", course_code), _version("sessions"))
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    students = {}
+    for row in (
+        AttendanceProof.objects.filter(session__course_code=course_code)
+        .values("student_id")
+        .annotate(
+            present=Count("id"),
+            attended=Count("id", filter=~Q(validation_status=STATUS_FAIL)),
+        )
+        .order_by()
+    ):
+        students[row["student_id"]] = {"present": row["present"], "attended": row["attended"]}
+    for student_counts in ProofArchive.objects.filter(course_code=course_code).values_list(
+        "student_counts", flat=True
+    ):
+        for student_id, (present, passed) in student_counts.items():
+            counts = students.setdefault(student_id, {"present": 0, "attended": 0})
+            counts["present"] += present
+            counts["attended"] += passed
+
+    total = _session_totals([course_code]).get(course_code, 0)
+    result = {
+        "course_code": course_code,
+        "sessions": total,
+        "students": [
+            {
+                "student_id": student_id,
+                **counts,
+                "percentage": _percentage(counts["attended"], total),
+            }
+            for student_id, counts in sorted(students.items())
+        ],
+    }
+    cache.set(key, result, _cache_seconds())
+    return result
+
+
+def _session_totals(course_codes):
+    """Sessions that have started, per course."""
+    return dict(
+        Session.objects.filter(course_code__in=list(course_codes), starts_at__lte=timezone.now())
+        .values("course_code")
+        .annotate(total=Count("id"))
+        .order_by()
+        .values_list("course_code", "total")
+    )
+
+
+def invalidate_history(sender, proofs, **kwargs):
+    names = set()
+    for proof in proofs:
+        names.add(("student", proof.student_id))
+        names.add(("course", proof.session.course_code))
+    _bump(names)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def _invalidate_sessions(sender, **kwargs):
+    # After commit, so a read in between cannot cache the old totals under
+    # the new version.
+    transaction.on_commit(bump_sessions)
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import Session, SessionAttendanceSummary, UserProfile
+
+KEEPALIVE_SECONDS = 15
+QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(self, session_id, loop):
+        self.session_id = session_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind reconnects and gets a fresh snapshot.
+            self.overflowed = True
+
+
+class LiveAttendanceBroker:
+    """In-process pub/sub fanning accepted proofs out to live streams.
+
+    publish() is called from request threads; each event is handed to the
+    subscriber's own event loop, so streams never block ingest. Nothing
+    crosses process boundaries: a stream only sees proofs accepted by the
+    process serving it.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id):
+        subscription = Subscription(session_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[session_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.session_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.session_id]
+
+    def has_subscribers(self, session_id):
+        with self._lock:
+            return session_id in self._subscriptions
+
+    def publish(self, session_id, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(session_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The stream's event loop has already shut down.
+                self.unsubscribe(subscription)
+
+
+broker = LiveAttendanceBroker()
+
+
+def session_counts(session_id):
+    summary = (
+        SessionAttendanceSummary.objects.filter(session_id=session_id)
+        .values("present_count", "failed_count")
+        .first()
+    )
+    if summary is None:
+        return {"present": 0, "failed": 0}
+    return {"present": summary["present_count"], "failed": summary["failed_count"]}
+
+
+def proof_event(proof, counts):
+    return {
+        "proof": {
+            "id": proof.id,
+            "session": proof.session_id,
+            "student_id": proof.student_id,
+            "rssi": proof.rssi,
+            "observed_at": proof.observed_at,
+            "validation_status": proof.validation_status,
+            "created_at": proof.created_at,
+        },
+        "counts": _public_counts(counts),
+    }
+
+
+def _public_counts(counts):
+    return {
+        "present": counts["present"],
+        "passed": counts["present"] - counts["failed"],
+        "failed": counts["failed"],
+    }
+
+
+def publish_accepted_proofs(sender, proofs, **kwargs):
+    by_session = defaultdict(list)
+    for proof in proofs:
+        by_session[proof.session_id].append(proof)
+    for session_id, session_proofs in by_session.items():
+        if not broker.has_subscribers(session_id):
+            continue
+        counts = session_counts(session_id)
+        for proof in session_proofs:
+            broker.publish(session_id, proof_event(proof, counts))
+
+
+def _format_event(name, data, event_id=None):
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _authorize(request, session_id):
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = drf_request.user
+    except APIException as exc:
+        return None, JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+    if not user.is_authenticated:
+        return None, JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    profile = user.profile
+    if profile.role != UserProfile.ROLE_LECTURER:
+        return None, JsonResponse(
+            {"detail": "Only lecturers can follow live attendance."}, status=403
+        )
+    if not Session.objects.filter(id=session_id, created_by=profile).exists():
+        return None, JsonResponse({"detail": "Not found."}, status=404)
+    return session_counts(session_id), None
+
+
+async def _event_stream(session_id, counts):
+    subscription = broker.subscribe(session_id)
+    try:
+        yield _format_event(
+            "snapshot", {"session": session_id, "counts": _public_counts(counts)}
+        )
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _format_event("proof", event, event_id=event["proof"]["id"])
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def live_attendance_stream(request, session_id):
+    if isinstance(request, WSGIRequest):
+        # WSGI servers buffer an async iterator into one response, so the
+        # stream would never reach the client.
+        return JsonResponse(
+            {"detail": "Live attendance needs the ASGI application (config.asgi)."}, status=501
+        )
+    counts, error = await sync_to_async(_authorize)(request, session_id)
+    if error is not None:
+        return error
+    response = StreamingHttpResponse(
+        _event_stream(session_id, counts), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,61 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance.archive import archivable_sessions, archive_sessions, term_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Move proofs of closed sessions that started before a cutoff into gzip-JSONL "
+        "archive files, one per course and term, and delete them from the hot tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            help="Archive sessions that started before this day (YYYY-MM-DD). "
+            "Defaults to --days ago.",
+        )
+        parser.add_argument(
+            "--days", type=int, default=180, help="Age cutoff when --before is not given."
+        )
+        parser.add_argument("--course", help="Only archive this course code.")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="List what would be archived and exit."
+        )
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            try:
+                day = parse_date(options["before"])
+            except ValueError:
+                day = None
+            if day is None:
+                raise CommandError("--before must be YYYY-MM-DD.")
+            before = timezone.make_aware(datetime.combine(day, time.min))
+        else:
+            before = timezone.now() - timedelta(days=options["days"])
+
+        sessions = archivable_sessions(before)
+        if options["course"]:
+            sessions = sessions.filter(course_code=options["course"].strip())
+        sessions = list(sessions)
+        if not sessions:
+            self.stdout.write("Nothing to archive.")
+            return
+
+        if options["dry_run"]:
+            groups = {}
+            for session in sessions:
+                key = (session.course_code, term_for(session.starts_at))
+                groups[key] = groups.get(key, 0) + 1
+            for (course_code, term), count in sorted(groups.items()):
+                self.stdout.write(f"{term:<10}{course_code:<12}{count:>6} session(s)")
+            return
+
+        for archive in archive_sessions(sessions):
+            self.stdout.write(f"{archive.path}: {archive.proof_count} proof(s)")
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(sessions)} session(s)."))
@@ -0,0 +1,57 @@
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.roster import RosterFormatError, import_roster, parse_roster_csv
+
+
+class Command(BaseCommand):
+    help = "Create student accounts from a roster CSV (matric_number, full_name[, password])."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Roster CSV file.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Password hashing processes (default: one per CPU, up to MAX_WORKERS).",
+        )
+        parser.add_argument(
+            "--credentials",
+            help="Write generated initial passwords to this CSV file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            text = Path(options["path"]).read_text(encoding="utf-8-sig")
+            rows = parse_roster_csv(text)
+        except (OSError, UnicodeDecodeError, RosterFormatError) as exc:
+            raise CommandError(str(exc))
+
+        results = import_roster(rows, workers=options["workers"])
+        created = [item for item in results if item["status"] == "created"]
+        rejected = [item for item in results if item["status"] != "created"]
+
+        for item in rejected:
+            errors = "; ".join(f"{field}: {message}" for field, message in item["errors"].items())
+            self.stderr.write(f"Row {item['row']} ({item['matric_number'] or '-'}): {errors}")
+
+        generated = [item for item in created if "initial_password" in item]
+        if generated:
+            if options["credentials"]:
+                handle = open(options["credentials"], "w", newline="", encoding="utf-8")
+            else:
+                handle = self.stdout
+            writer = csv.writer(handle)
+            writer.writerow(["matric_number", "initial_password"])
+            for item in generated:
+                writer.writerow([item["matric_number"], item["initial_password"]])
+            if handle is not self.stdout:
+                handle.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(created)} student(s); {len(rejected)} row(s) not imported."
+            )
+        )
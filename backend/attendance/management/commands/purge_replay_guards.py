@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from attendance.sweeper import purge_expired_guards
+
+
+class Command(BaseCommand):
+    help = "Delete replay guard rows whose challenge/nonce can no longer be accepted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows deleted per statement, to keep write locks short.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_guards(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired replay guard(s)."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from attendance.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recount SessionAttendanceSummary rows from AttendanceProof (archived sessions are skipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--session",
+            type=int,
+            action="append",
+            dest="sessions",
+            help="Only rebuild this session id (repeatable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Sessions recounted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_summaries(options["sessions"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} session summary(ies)."))
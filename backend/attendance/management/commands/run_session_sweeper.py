@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.anomalies import scan_new_proofs
+from attendance.sweeper import close_expired_sessions, purge_expired_guards
+from attendance.sync import assign_sequence, purge_change_log
+
+
+class Command(BaseCommand):
+    help = (
+        "Close sessions whose ends_at has passed, number new change log entries, check new "
+        "proofs for anomalies and purge expired replay guards and change log entries, "
+        "every --interval seconds. Safe to run on several workers at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=30, help="Seconds between sweeps."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Sessions closed per transaction.",
+        )
+        parser.add_argument("--once", action="store_true", help="Sweep once and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            self._run(options)
+        except KeyboardInterrupt:
+            pass
+
+    def _run(self, options):
+        interval = options["interval"]
+        while True:
+            started = time.monotonic()
+            close_old_connections()
+            closed = close_expired_sessions(batch_size=options["batch_size"])
+            purged = purge_expired_guards()
+            assign_sequence()
+            anomalies = scan_new_proofs()
+            changes = purge_change_log()
+            if closed or purged or anomalies or changes or options["once"]:
+                self.stdout.write(
+                    f"Closed {len(closed)} session(s); recorded {anomalies} anomaly(ies); "
+                    f"deleted {purged} expired replay guard(s) and {changes} change log entries."
+                )
+            if options["once"]:
+                return
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from attendance.anomalies import get_anomaly_engine, save_anomalies
+from attendance.models import AttendanceAnomaly, Session
+
+
+class Command(BaseCommand):
+    help = "Re-run anomaly checks over stored proofs and record anything missing."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--session",
+            type=int,
+            action="append",
+            dest="sessions",
+            help="Only scan this session id (repeatable). Defaults to active sessions.",
+        )
+        parser.add_argument("--all", action="store_true", help="Scan every session.")
+
+    def handle(self, *args, **options):
+        sessions = Session.objects.order_by("id")
+        if options["sessions"]:
+            sessions = sessions.filter(id__in=options["sessions"])
+        elif not options["all"]:
+            sessions = sessions.filter(active=True)
+
+        engine = get_anomaly_engine()
+        before = AttendanceAnomaly.objects.count()
+        scanned = 0
+        for session_id in sessions.values_list("id", flat=True).iterator():
+            save_anomalies(engine.replay(session_id))
+            scanned += 1
+        added = AttendanceAnomaly.objects.count() - before
+        self.stdout.write(
+            self.style.SUCCESS(f"Scanned {scanned} session(s); recorded {added} new anomaly(ies).")
+        )
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance import rssi
+from attendance.models import AttendanceProof, RoomProximityThreshold
+
+
+class Command(BaseCommand):
+    help = "Suggest and store per-room minimum RSSI from accepted proofs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=120,
+            help="Use proofs from sessions that started in the last N days.",
+        )
+        parser.add_argument(
+            "--room", action="append", dest="rooms", help="Only this room (repeatable)."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Print suggestions without saving."
+        )
+
+    def handle(self, *args, **options):
+        proofs = AttendanceProof.objects.filter(
+            session__starts_at__gte=timezone.now() - timedelta(days=options["days"])
+        ).exclude(session__room="")
+        if options["rooms"]:
+            proofs = proofs.filter(session__room__in=options["rooms"])
+
+        report = rssi.analyze(rssi.load_samples(proofs), group_by="room")
+        saved = 0
+        for group in report["groups"]:
+            suggested = group["suggested_min_rssi"]
+            self.stdout.write(
+                f"{group['room']:<24}{group['count']:>8} proofs"
+                f"  p10 {group['percentiles']['p10']:>7}  outliers {group['outliers']:>5}"
+                f"  suggested {suggested if suggested is not None else 'n/a (too few samples)'}"
+            )
+            if suggested is None or options["dry_run"]:
+                continue
+            RoomProximityThreshold.objects.update_or_create(
+                room=group["room"],
+                defaults={
+                    "min_rssi": suggested,
+                    "sample_count": group["count"],
+                    "percentile": rssi.THRESHOLD_PERCENTILE,
+                },
+            )
+            saved += 1
+        if not options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Stored {saved} room threshold(s)."))
@@ -0,0 +1,211 @@
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+VALIDATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base.rstrip(',')}}} {total}")
+            lines.append(f"{self.name}_count{{{base.rstrip(',')}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels).rstrip(',')}}} {value}")
+        return lines
+
+
+def _labels(names, values):
+    return "".join(f'{name}="{_escape(value)}",' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Per-process request, query and proof validation metrics.
+
+    Updates take one lock and touch a few list slots, so recording stays
+    cheap on the submission path. Each worker process keeps its own numbers;
+    scrape every process (or add a per-instance label in Prometheus).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.request_seconds = Histogram(
+            "attendance_request_seconds",
+            "Time to build the response, by view.",
+            ("view", "method", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.request_queries = Histogram(
+            "attendance_request_queries",
+            "SQL statements per request, by view.",
+            ("view", "method"),
+            QUERY_BUCKETS,
+        )
+        self.request_db_seconds = Histogram(
+            "attendance_request_db_seconds",
+            "Time spent in SQL per request, by view.",
+            ("view", "method"),
+            LATENCY_BUCKETS,
+        )
+        self.validation_seconds = Histogram(
+            "attendance_proof_validation_seconds",
+            "AttendanceProofSerializer validation time per proof.",
+            ("outcome",),
+            VALIDATION_BUCKETS,
+        )
+        self.rejections = Counter(
+            "attendance_proof_rejections_total",
+            "Rejected proofs, by reason.",
+            ("reason",),
+        )
+
+    def observe_request(self, view, method, status, seconds, queries, db_seconds):
+        with self._lock:
+            self.request_seconds.observe((view, method, status), seconds)
+            self.request_queries.observe((view, method), queries)
+            self.request_db_seconds.observe((view, method), db_seconds)
+
+    def observe_validation(self, seconds, reason=None):
+        with self._lock:
+            self.validation_seconds.observe(("rejected" if reason else "accepted",), seconds)
+            if reason:
+                self.rejections.inc((reason,))
+
+    def reject(self, reason):
+        with self._lock:
+            self.rejections.inc((reason,))
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP attendance_process_start_time_seconds Start of this metrics process.",
+                "# TYPE attendance_process_start_time_seconds gauge",
+                f'attendance_process_start_time_seconds{{pid="{os.getpid()}"}} {self.started_at}',
+            ]
+            for metric in (
+                self.request_seconds,
+                self.request_queries,
+                self.request_db_seconds,
+                self.validation_seconds,
+                self.rejections,
+            ):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _metrics_token():
+    return getattr(settings, "ATTENDANCE_METRICS", {}).get("TOKEN", "")
+
+
+def metrics_enabled():
+    """ENABLED and a TOKEN set: metrics are never served without authentication."""
+    config = getattr(settings, "ATTENDANCE_METRICS", {})
+    return bool(config.get("ENABLED", False) and _metrics_token())
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus text exposition of this process's registry.
+
+    Requires ``Authorization: Bearer <ATTENDANCE_METRICS["TOKEN"]>``.
+    """
+    if not metrics_enabled():
+        raise Http404()
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {_metrics_token()}"
+    ):
+        return HttpResponse("Invalid metrics token.\n", status=401, content_type="text/plain")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4")
+
+
+def rejection_reason(errors):
+    """Classify a proof's ValidationError detail into one metrics label."""
+    from .serializers import AttendanceProofSerializer
+    from .tokens import (
+        FORGED_ACOUSTIC_MESSAGE,
+        FORGED_BLE_MESSAGE,
+        STALE_MESSAGE,
+        VERSION_MESSAGE,
+    )
+
+    if not isinstance(errors, dict):
+        return "invalid"
+    messages = {
+        field: [str(message) for message in (value if isinstance(value, list) else [value])]
+        for field, value in errors.items()
+    }
+    flat = [message for values in messages.values() for message in values]
+    if AttendanceProofSerializer.REPLAY_MESSAGE in flat:
+        return "replay"
+    if AttendanceProofSerializer.DUPLICATE_MESSAGE in flat:
+        return "duplicate"
+    if FORGED_ACOUSTIC_MESSAGE in flat or FORGED_BLE_MESSAGE in flat or VERSION_MESSAGE in flat:
+        return "forged"
+    if {
+        STALE_MESSAGE,
+        AttendanceProofSerializer.ACOUSTIC_EXPIRED_MESSAGE,
+        AttendanceProofSerializer.BLE_EXPIRED_MESSAGE,
+    }.intersection(flat):
+        return "expired"
+    if AttendanceProofSerializer.WINDOW_MESSAGE in flat:
+        return "window"
+    if any("format" in message for message in flat):
+        return "format"
+    if "signature" in messages:
+        return "signature"
+    if "session" in messages:
+        return "session"
+    return "invalid"
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .metrics import metrics_enabled, registry
+
+
+class RequestMetricsMiddleware:
+    """Time each request and count the SQL it runs.
+
+    With ``ATTENDANCE_METRICS["ENABLED"]`` the numbers go to the per-process
+    registry served at /api/metrics/. With ``ATTENDANCE_QUERY_COUNT_HEADER``
+    the statement count is also returned in ``X-DB-Query-Count``, for the
+    load harness in ``benchmarks/classroom_burst.py``.
+    """
+
+    def __init__(self, get_response):
+        self.record = metrics_enabled()
+        self.header = getattr(settings, "ATTENDANCE_QUERY_COUNT_HEADER", False)
+        if not self.record and not self.header:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        if self.header:
+            response["X-DB-Query-Count"] = str(counter.count)
+        if self.record:
+            match = request.resolver_match
+            registry.observe_request(
+                match.view_name if match else "unmatched",
+                request.method,
+                response.status_code,
+                elapsed,
+                counter.count,
+                counter.seconds,
+            )
+        return response
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
@@ -0,0 +1,121 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:41
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations, models
+
+# The checks as they stood when this migration was written, frozen here so
+# later changes to attendance.validation cannot change what it computes.
+ACOUSTIC_PATTERN = re.compile(
+    r"^ac\|(?P<session>\d+)\|(?P<version>[A-Za-z0-9_.-]+)\|(?P<issued>\d{10})\|(?P<challenge>[A-Za-z0-9_]+)$"
+)
+BLE_PATTERN = re.compile(
+    r"^ble\|(?P<session>\d+)\|(?P<issued>\d{10})\|(?P<nonce>[A-Za-z0-9_]+)$"
+)
+EXPIRY_SECONDS = 60
+CHECK_BITS = {
+    key: 1 << position
+    for position, key in enumerate(
+        [
+            "acoustic_format",
+            "ble_format",
+            "acoustic_session",
+            "acoustic_freshness",
+            "ble_session",
+            "ble_freshness",
+        ]
+    )
+}
+
+VALIDATION_FIELDS = [
+    "validation_status",
+    "validation_checks",
+    "validation_failures",
+    "acoustic_age_seconds",
+    "ble_age_seconds",
+]
+
+
+def evaluate_proof(session_id, acoustic_token, ble_nonce, observed_at):
+    """Return (checks, failures, acoustic age, BLE age) for one proof."""
+    checks = 0
+    failures = 0
+    ages = {}
+    for prefix, pattern, raw in (
+        ("acoustic", ACOUSTIC_PATTERN, acoustic_token),
+        ("ble", BLE_PATTERN, ble_nonce),
+    ):
+        match = pattern.match(raw.strip())
+        checks |= CHECK_BITS[f"{prefix}_format"]
+        if not match:
+            failures |= CHECK_BITS[f"{prefix}_format"]
+            ages[prefix] = None
+            continue
+
+        issued = datetime.fromtimestamp(int(match.group("issued")), tz=dt_timezone.utc)
+        age = int((observed_at - issued).total_seconds())
+        ages[prefix] = age
+        checks |= CHECK_BITS[f"{prefix}_session"] | CHECK_BITS[f"{prefix}_freshness"]
+        if int(match.group("session")) != session_id:
+            failures |= CHECK_BITS[f"{prefix}_session"]
+        if not 0 <= age <= EXPIRY_SECONDS:
+            failures |= CHECK_BITS[f"{prefix}_freshness"]
+    return checks, failures, ages["acoustic"], ages["ble"]
+
+
+def backfill_validation_results(apps, schema_editor):
+    AttendanceProof = apps.get_model("attendance", "AttendanceProof")
+    batch = []
+    for proof in AttendanceProof.objects.iterator(chunk_size=2000):
+        (
+            proof.validation_checks,
+            proof.validation_failures,
+            proof.acoustic_age_seconds,
+            proof.ble_age_seconds,
+        ) = evaluate_proof(
+            proof.session_id, proof.acoustic_token, proof.ble_nonce, proof.observed_at
+        )
+        proof.validation_status = "fail" if proof.validation_failures else "pass"
+        batch.append(proof)
+        if len(batch) >= 2000:
+            AttendanceProof.objects.bulk_update(batch, VALIDATION_FIELDS)
+            batch = []
+    if batch:
+        AttendanceProof.objects.bulk_update(batch, VALIDATION_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendancereplayguard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendanceproof',
+            name='acoustic_age_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendanceproof',
+            name='ble_age_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendanceproof',
+            name='validation_checks',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendanceproof',
+            name='validation_failures',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendanceproof',
+            name='validation_status',
+            field=models.CharField(blank=True, choices=[('pass', 'Pass'), ('fail', 'Fail')], max_length=8),
+        ),
+        migrations.RunPython(backfill_validation_results, migrations.RunPython.noop),
+    ]
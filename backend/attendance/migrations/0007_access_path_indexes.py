@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_attendanceproof_validation_results'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendanceproof',
+            index=models.Index(fields=['session', '-created_at', '-id'], name='proof_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendanceproof',
+            index=models.Index(fields=['student_id', '-created_at'], name='proof_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancereplayguard',
+            index=models.Index(fields=['used_at'], name='replay_guard_used_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['created_by', '-starts_at'], name='session_owner_starts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-starts_at'], name='session_active_starts_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='attendanceproof',
+            name='proof_student_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='session',
+            name='session_owner_starts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='session',
+            name='session_active_starts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='attendanceproof',
+            index=models.Index(fields=['student_id', '-created_at', '-id'], name='proof_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['created_by', '-starts_at', '-id'], name='session_owner_starts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-starts_at', '-id'], name='session_active_starts_idx'),
+        ),
+    ]
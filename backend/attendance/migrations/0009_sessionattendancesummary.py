@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def backfill_summaries(apps, schema_editor):
+    AttendanceProof = apps.get_model("attendance", "AttendanceProof")
+    SessionAttendanceSummary = apps.get_model("attendance", "SessionAttendanceSummary")
+    rows = (
+        AttendanceProof.objects.values("session_id")
+        .annotate(
+            present=Count("id"),
+            failed=Count("id", filter=Q(validation_status="fail")),
+            last=Max("created_at"),
+        )
+        .order_by()
+    )
+    SessionAttendanceSummary.objects.bulk_create(
+        [
+            SessionAttendanceSummary(
+                session_id=row["session_id"],
+                present_count=row["present"],
+                passed_count=row["present"] - row["failed"],
+                failed_count=row["failed"],
+                last_arrival_at=row["last"],
+            )
+            for row in rows
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionAttendanceSummary',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_summary', serialize=False, to='attendance.session')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('last_arrival_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
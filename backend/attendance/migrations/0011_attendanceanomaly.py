@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_devicekey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('shared_device', 'Device used by several students'), ('rssi_range', 'Impossible RSSI'), ('rssi_outlier', "RSSI far from the session's"), ('submission_burst', 'Submission burst'), ('overlapping_sessions', 'Student in overlapping sessions')], max_length=24)),
+                ('student_id', models.CharField(max_length=64)),
+                ('device_id', models.CharField(blank=True, max_length=128)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('proof', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='attendance.attendanceproof')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='attendance.session')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', '-created_at', '-id'], name='anomaly_session_created_idx')],
+                'unique_together': {('proof', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_attendanceanomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomProximityThreshold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room', models.CharField(max_length=64, unique=True)),
+                ('min_rssi', models.IntegerField()),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('percentile', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0013_session_active_ends_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course_code', models.CharField(max_length=32)),
+                ('term', models.CharField(max_length=16)),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('proof_count', models.PositiveIntegerField(default=0)),
+                ('student_counts', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course_code', 'term'], name='archive_course_term_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSession',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive_entry', serialize=False, to='attendance.session')),
+                ('proof_count', models.PositiveIntegerField(default=0)),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='attendance.proofarchive')),
+            ],
+        ),
+    ]
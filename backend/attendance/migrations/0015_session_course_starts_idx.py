@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0014_proof_archives'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['course_code', 'starts_at'], name='session_course_starts_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0015_session_course_starts_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('session', 'Session'), ('proof', 'Attendance proof')], max_length=8)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('lecturer_id', models.BigIntegerField(blank=True, null=True)),
+                ('student_id', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lecturer_id', 'id'], name='changelog_lecturer_idx'), models.Index(condition=models.Q(('kind', 'session')), fields=['id'], name='changelog_session_idx'), models.Index(condition=models.Q(('kind', 'proof')), fields=['student_id', 'id'], name='changelog_student_idx'), models.Index(fields=['created_at'], name='changelog_created_idx')],
+            },
+        ),
+    ]
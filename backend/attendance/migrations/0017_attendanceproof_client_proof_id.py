@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0016_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendanceproof',
+            name='client_proof_id',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:56
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_entries(apps, schema_editor):
+    # Entries written so far have committed, so their ids are a valid order
+    # and cursors clients already hold keep working.
+    ChangeLogEntry = apps.get_model("attendance", "ChangeLogEntry")
+    ChangeLogCounter = apps.get_model("attendance", "ChangeLogCounter")
+    ChangeLogEntry.objects.update(seq=F("id"))
+    last = ChangeLogEntry.objects.aggregate(last=Max("id"))["last"] or 0
+    ChangeLogCounter.objects.create(pk=1, last_seq=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0018_sessionlistmarker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='changelogentry',
+            name='changelog_lecturer_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='changelogentry',
+            name='changelog_session_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='changelogentry',
+            name='changelog_student_idx',
+        ),
+        migrations.AddField(
+            model_name='changelogentry',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_entries, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['lecturer_id', 'seq'], name='changelog_lecturer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(condition=models.Q(('kind', 'session')), fields=['seq'], name='changelog_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(condition=models.Q(('kind', 'proof')), fields=['student_id', 'seq'], name='changelog_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(condition=models.Q(('seq__isnull', True)), fields=['id'], name='changelog_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+def start_after_checked_proofs(apps, schema_editor):
+    # Proofs numbered so far were checked when they were accepted.
+    ChangeLogCounter = apps.get_model("attendance", "ChangeLogCounter")
+    AnomalyScanCursor = apps.get_model("attendance", "AnomalyScanCursor")
+    counter = ChangeLogCounter.objects.filter(pk=1).first()
+    AnomalyScanCursor.objects.create(pk=1, last_seq=counter.last_seq if counter else 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0019_changelog_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyScanCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(start_after_checked_proofs, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .validation import STATUS_CHOICES
+
 
 class Session(models.Model):
     course_code = models.CharField(max_length=32)
@@ -21,6 +23,28 @@ class Session(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Lecturer's own sessions, in SessionPagination order.
+            models.Index(
+                fields=["created_by", "-starts_at", "-id"], name="session_owner_starts_idx"
+            ),
+            # Students only ever list active sessions.
+            models.Index(
+                fields=["-starts_at", "-id"],
+                condition=models.Q(active=True),
+                name="session_active_starts_idx",
+            ),
+            # Attendance history counts a course's sessions.
+            models.Index(fields=["course_code", "starts_at"], name="session_course_starts_idx"),
+            # The sweeper looks for active sessions past their end.
+            models.Index(
+                fields=["ends_at"],
+                condition=models.Q(active=True),
+                name="session_active_ends_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.course_code} - {self.starts_at:%Y-%m-%d %H:%M}"
 
@@ -37,10 +61,31 @@ class AttendanceProof(models.Model):
     observed_at = models.DateTimeField()
     signature = models.TextField()
 
+    # Report checks evaluated once at ingest; see attendance.validation.CHECKS.
+    validation_status = models.CharField(max_length=8, choices=STATUS_CHOICES, blank=True)
+    validation_checks = models.PositiveSmallIntegerField(default=0)
+    validation_failures = models.PositiveSmallIntegerField(default=0)
+    acoustic_age_seconds = models.IntegerField(null=True, blank=True)
+    ble_age_seconds = models.IntegerField(null=True, blank=True)
+    # Generated by the client so a retried upload finds the proof it already
+    # created; see AttendanceProofSerializer.find_retry.
+    client_proof_id = models.UUIDField(null=True, blank=True, unique=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("session", "student_id")
+        indexes = [
+            # Lecturer list, report and export walk each owned session's proofs
+            # in (created_at, id) order.
+            models.Index(
+                fields=["session", "-created_at", "-id"], name="proof_session_created_idx"
+            ),
+            # A student's own history.
+            models.Index(
+                fields=["student_id", "-created_at", "-id"], name="proof_student_created_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.student_id} @ {self.session_id}"
@@ -71,6 +116,195 @@ class AttendanceReplayGuard(models.Model):
 
     class Meta:
         unique_together = ("session", "challenge_token", "ble_nonce")
+        # purge_replay_guards deletes by age.
+        indexes = [models.Index(fields=["used_at"], name="replay_guard_used_at_idx")]
 
     def __str__(self) -> str:
         return f"{self.session_id}:{self.challenge_token}:{self.ble_nonce}"
+
+
+class SessionAttendanceSummary(models.Model):
+    """Running counts of accepted proofs, maintained by attendance.summaries."""
+
+    session = models.OneToOneField(
+        Session, on_delete=models.CASCADE, primary_key=True, related_name="attendance_summary"
+    )
+    present_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    last_arrival_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.session_id}: {self.present_count} present"
+
+
+class DeviceKey(models.Model):
+    """Ed25519 public key a student's device signs attendance proofs with."""
+
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="device_keys")
+    device_id = models.CharField(max_length=128, unique=True)
+    # Raw 32-byte key, base64 encoded.
+    public_key = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.device_id} ({self.profile_id})"
+
+
+class AttendanceAnomaly(models.Model):
+    KIND_SHARED_DEVICE = "shared_device"
+    KIND_RSSI_RANGE = "rssi_range"
+    KIND_RSSI_OUTLIER = "rssi_outlier"
+    KIND_SUBMISSION_BURST = "submission_burst"
+    KIND_OVERLAPPING_SESSIONS = "overlapping_sessions"
+    KIND_CHOICES = [
+        (KIND_SHARED_DEVICE, "Device used by several students"),
+        (KIND_RSSI_RANGE, "Impossible RSSI"),
+        (KIND_RSSI_OUTLIER, "RSSI far from the session's"),
+        (KIND_SUBMISSION_BURST, "Submission burst"),
+        (KIND_OVERLAPPING_SESSIONS, "Student in overlapping sessions"),
+    ]
+
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="anomalies")
+    proof = models.ForeignKey(AttendanceProof, on_delete=models.CASCADE, related_name="anomalies")
+    kind = models.CharField(max_length=24, choices=KIND_CHOICES)
+    student_id = models.CharField(max_length=64)
+    device_id = models.CharField(max_length=128, blank=True)
+    detail = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("proof", "kind")
+        indexes = [
+            models.Index(
+                fields=["session", "-created_at", "-id"], name="anomaly_session_created_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} @ {self.session_id}: {self.student_id}"
+
+
+class AnomalyScanCursor(models.Model):
+    """Last ChangeLogEntry.seq whose proof was checked; a single row, locked while scanning."""
+
+    last_seq = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return str(self.last_seq)
+
+
+class RoomProximityThreshold(models.Model):
+    """Weakest RSSI a student's phone should see in a room; see suggest_rssi_thresholds."""
+
+    room = models.CharField(max_length=64, unique=True)
+    min_rssi = models.IntegerField()
+    sample_count = models.PositiveIntegerField(default=0)
+    percentile = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.room}: {self.min_rssi} dBm"
+
+
+class ProofArchive(models.Model):
+    """One gzip-JSONL file of archived proofs for a course and term; see attendance.archive."""
+
+    course_code = models.CharField(max_length=32)
+    term = models.CharField(max_length=16)
+    # Relative to ATTENDANCE_ARCHIVE["ROOT"].
+    path = models.CharField(max_length=255, unique=True)
+    proof_count = models.PositiveIntegerField(default=0)
+    # student_id -> [proofs, passing proofs] in this file, so per-student
+    # totals need not open it.
+    student_counts = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["course_code", "term"], name="archive_course_term_idx")]
+
+    def __str__(self) -> str:
+        return self.path
+
+
+class ArchivedSession(models.Model):
+    """A session whose proofs were moved out of AttendanceProof into an archive."""
+
+    session = models.OneToOneField(
+        Session, on_delete=models.CASCADE, primary_key=True, related_name="archive_entry"
+    )
+    archive = models.ForeignKey(ProofArchive, on_delete=models.CASCADE, related_name="sessions")
+    proof_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.session_id} -> {self.archive_id}"
+
+
+class ChangeLogEntry(models.Model):
+    """One created, updated or deleted session or proof; see attendance.sync.
+
+    Rows are written in the same transaction as the change they record.
+    ``seq`` is the sync cursor. It is assigned after commit, in commit
+    order, so an entry never appears below a cursor a client already holds.
+    """
+
+    KIND_SESSION = "session"
+    KIND_PROOF = "proof"
+    KIND_CHOICES = [(KIND_SESSION, "Session"), (KIND_PROOF, "Attendance proof")]
+
+    id = models.BigAutoField(primary_key=True)
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    # Who the change is for: the session owner's profile id, and for proofs
+    # the student. Plain values, so entries outlive the rows they describe.
+    lecturer_id = models.BigIntegerField(null=True, blank=True)
+    student_id = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["lecturer_id", "seq"], name="changelog_lecturer_idx"),
+            # Students read every session change and their own proof changes.
+            models.Index(
+                fields=["seq"],
+                condition=models.Q(kind="session"),
+                name="changelog_session_idx",
+            ),
+            models.Index(
+                fields=["student_id", "seq"],
+                condition=models.Q(kind="proof"),
+                name="changelog_student_idx",
+            ),
+            # Entries still waiting for a seq.
+            models.Index(
+                fields=["id"], condition=models.Q(seq__isnull=True), name="changelog_pending_idx"
+            ),
+            models.Index(fields=["created_at"], name="changelog_created_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.seq or '-'}: {self.kind} {self.object_id}{' (deleted)' if self.deleted else ''}"
+
+
+class ChangeLogCounter(models.Model):
+    """The last ChangeLogEntry.seq handed out; a single row, locked while numbering."""
+
+    last_seq = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return str(self.last_seq)
+
+
+class SessionListMarker(models.Model):
+    """Change counter behind GET /api/sessions/ ETags; see attendance.conditional."""
+
+    # "students", "lecturer:<profile id>" or "everyone".
+    scope = models.CharField(max_length=40, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.scope}: {self.version}"
@@ -0,0 +1,97 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import remove_query_param
+
+
+class SessionPagination(CursorPagination):
+    ordering = ("-starts_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class NewestFirstPagination(CursorPagination):
+    """Proofs, the validation report and anomalies, newest first.
+
+    DRF's cursor filters on ``created_at`` alone and steps over ties with an
+    offset, which repeats rows when a proof lands while a client is walking
+    a page of rows sharing one timestamp. Here the cursor carries both
+    ``created_at`` and ``id``, so each page starts strictly after the last
+    row served whatever arrives in between. The ``(-created_at, -id)``
+    indexes on proofs and anomalies serve the filter. Subclass and override
+    ``page_size`` for a list that needs a different default.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        after = self._parse_position(self.cursor.position) if self.cursor else None
+
+        if reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+        if after is not None:
+            created_at, pk = after
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = after is not None, more
+        else:
+            self.has_next, self.has_previous = more, after is not None
+        if self.has_next or self.has_previous:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self._link(self.page[-1] if self.page else None, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self._link(self.page[0] if self.page else None, reverse=True)
+
+    def _link(self, row, reverse):
+        if row is None:
+            # Everything past the cursor went away; start again from the top.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        position = f"{row.created_at.isoformat()}|{row.pk}"
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=position))
+
+    def _parse_position(self, position):
+        if position is None:
+            return None
+        created_at, _, pk = position.rpartition("|")
+        try:
+            created_at, pk = parse_datetime(created_at), int(pk)
+        except ValueError:
+            created_at = None
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
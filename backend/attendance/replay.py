@@ -0,0 +1,176 @@
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError
+
+from .models import AttendanceReplayGuard
+
+
+class ReplayKey(NamedTuple):
+    session_id: int
+    challenge_token: str
+    ble_nonce: str
+
+
+class ReplayDetected(Exception):
+    pass
+
+
+class DatabaseReplayGuard:
+    """Replay protection backed by the AttendanceReplayGuard unique index.
+
+    claim() and claim_many() must run inside the caller's transaction so a
+    failed proof insert rolls the guard rows back with it. A conflict leaves
+    that transaction unusable, so callers should let ReplayDetected
+    propagate out of the atomic block.
+    """
+
+    def used(self, keys):
+        keys = set(keys)
+        if not keys:
+            return set()
+        rows = AttendanceReplayGuard.objects.filter(
+            session_id__in={key.session_id for key in keys},
+            challenge_token__in={key.challenge_token for key in keys},
+            ble_nonce__in={key.ble_nonce for key in keys},
+        ).values_list("session_id", "challenge_token", "ble_nonce")
+        return {ReplayKey(*row) for row in rows} & keys
+
+    def claim(self, key, student_id, issued_at):
+        try:
+            AttendanceReplayGuard.objects.create(
+                session_id=key.session_id,
+                challenge_token=key.challenge_token,
+                ble_nonce=key.ble_nonce,
+                student_id=student_id,
+            )
+        except IntegrityError:
+            raise ReplayDetected(key)
+
+    def claim_many(self, entries):
+        try:
+            AttendanceReplayGuard.objects.bulk_create(
+                [
+                    AttendanceReplayGuard(
+                        session_id=key.session_id,
+                        challenge_token=key.challenge_token,
+                        ble_nonce=key.ble_nonce,
+                        student_id=student_id,
+                    )
+                    for key, student_id, _ in entries
+                ]
+            )
+        except IntegrityError:
+            raise ReplayDetected()
+
+    def release(self, keys):
+        # Rows disappear with the rolled-back transaction.
+        pass
+
+
+class BucketedReplayGuard:
+    """In-process replay protection with whole-bucket expiry.
+
+    Keys are grouped by the issue time of their token. A token older than
+    ``ttl_seconds`` is rejected as expired before it reaches the guard, so
+    once a bucket falls out of that window it is dropped in one step rather
+    than entry by entry. With ``durable`` set, claims are also written
+    through to the database so other worker processes see them.
+
+    Memory claims do not roll back with the caller's transaction; callers
+    release() their keys if it fails for any reason.
+    """
+
+    def __init__(self, ttl_seconds, bucket_seconds=10, durable=False, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        self.durable = DatabaseReplayGuard() if durable else None
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def used(self, keys):
+        keys = set(keys)
+        with self._lock:
+            self._expire()
+            seen = {key for key in keys if any(key in bucket for bucket in self._buckets.values())}
+        if self.durable is not None:
+            seen |= self.durable.used(keys - seen)
+        return seen
+
+    def claim(self, key, student_id, issued_at):
+        self.claim_many([(key, student_id, issued_at)])
+
+    def claim_many(self, entries):
+        with self._lock:
+            self._expire()
+            keys = [key for key, _, _ in entries]
+            if len(set(keys)) != len(keys) or any(
+                key in bucket for key in keys for bucket in self._buckets.values()
+            ):
+                raise ReplayDetected()
+            for key, _, issued_at in entries:
+                self._buckets.setdefault(self._bucket_for(issued_at), set()).add(key)
+        if self.durable is not None:
+            try:
+                self.durable.claim_many(entries)
+            except ReplayDetected:
+                # Another process holds at least one of these keys; we cannot
+                # tell which, so let the database decide on the next attempt.
+                self.release(keys)
+                raise
+
+    def release(self, keys):
+        with self._lock:
+            for bucket in self._buckets.values():
+                bucket.difference_update(keys)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(bucket) for bucket in self._buckets.values())
+
+    def _bucket_for(self, issued_at):
+        return int(issued_at.timestamp()) // self.bucket_seconds
+
+    def _expire(self):
+        oldest_live = int(self._clock() - self.ttl_seconds) // self.bucket_seconds
+        for index in [index for index in self._buckets if index < oldest_live]:
+            del self._buckets[index]
+
+
+_replay_guard = None
+
+
+def get_replay_guard():
+    global _replay_guard
+    if _replay_guard is None:
+        _replay_guard = _build_replay_guard()
+    return _replay_guard
+
+
+def _build_replay_guard():
+    from .serializers import AttendanceProofSerializer
+
+    config = getattr(settings, "ATTENDANCE_REPLAY_GUARD", {})
+    backend = config.get("BACKEND", "database")
+    if backend == "database":
+        return DatabaseReplayGuard()
+    if backend == "memory":
+        return BucketedReplayGuard(
+            ttl_seconds=AttendanceProofSerializer.GUARD_TTL_SECONDS,
+            bucket_seconds=config.get("BUCKET_SECONDS", 10),
+            durable=config.get("DURABLE", False),
+        )
+    raise ValueError(f"Unknown ATTENDANCE_REPLAY_GUARD backend: {backend!r}")
+
+
+def _reset_replay_guard(setting, **kwargs):
+    global _replay_guard
+    if setting == "ATTENDANCE_REPLAY_GUARD":
+        _replay_guard = None
+
+
+setting_changed.connect(_reset_replay_guard)
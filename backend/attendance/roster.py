@@ -0,0 +1,189 @@
+import csv
+import io
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+REQUIRED_COLUMNS = ("matric_number", "full_name")
+MIN_PASSWORD_LENGTH = 6
+MAX_MATRIC_LENGTH = UserProfile._meta.get_field("matric_number").max_length
+# Below this many rows the pool start-up costs more than it saves.
+PARALLEL_HASH_THRESHOLD = 16
+TAKEN_MESSAGE = "matric_number already registered."
+
+DEFAULTS = {
+    # Each PBKDF2 hash takes a sizeable fraction of a second of CPU, so the
+    # API takes small files; larger rosters go through import_roster.
+    "MAX_REQUEST_ROWS": 100,
+    "MAX_WORKERS": 4,
+}
+
+
+def roster_settings():
+    return {**DEFAULTS, **getattr(settings, "ATTENDANCE_ROSTER", {})}
+
+
+class RosterFormatError(ValueError):
+    pass
+
+
+def parse_roster_csv(text):
+    """Return ``(line_number, row_dict)`` pairs from a roster CSV.
+
+    Columns: ``matric_number``, ``full_name`` and an optional ``password``.
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    columns = [name.strip() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise RosterFormatError(f"Missing column(s): {', '.join(missing)}.")
+    reader.fieldnames = columns
+    return [
+        (reader.line_num, {key: (value or "").strip() for key, value in row.items() if key})
+        for row in reader
+    ]
+
+
+def hash_passwords(passwords, workers=None):
+    """PBKDF2-hash passwords across a pool of spawned processes.
+
+    Spawned rather than forked, since a fork would copy the whole server
+    process, open database connections included. make_password is pickled
+    by reference, so the workers only import the hashers module and read
+    settings from DJANGO_SETTINGS_MODULE. ``workers`` defaults to one per
+    CPU, capped at MAX_WORKERS.
+    """
+    workers = workers or min(os.cpu_count() or 1, roster_settings()["MAX_WORKERS"])
+    if workers == 1 or len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_roster(rows, workers=None):
+    """Create student accounts for ``rows`` from parse_roster_csv().
+
+    Returns one result per row, in input order. Rows whose matric number
+    was registered by someone else while the import ran are "skipped".
+    """
+    results = {}
+    pending = []
+    seen = set()
+    for line, row in rows:
+        matric_number = row.get("matric_number", "")
+        full_name = row.get("full_name", "")
+        password = row.get("password", "")
+        errors = {}
+        if not matric_number:
+            errors["matric_number"] = "matric_number is required."
+        elif len(matric_number) > MAX_MATRIC_LENGTH:
+            errors["matric_number"] = f"matric_number must have at most {MAX_MATRIC_LENGTH} characters."
+        elif matric_number in seen:
+            errors["matric_number"] = "matric_number appears more than once in the file."
+        if not full_name:
+            errors["full_name"] = "full_name is required."
+        if password and len(password) < MIN_PASSWORD_LENGTH:
+            errors["password"] = f"password must have at least {MIN_PASSWORD_LENGTH} characters."
+        seen.add(matric_number)
+        if errors:
+            results[line] = _failed(line, matric_number, errors)
+        else:
+            pending.append((line, matric_number, full_name, password))
+
+    taken = _registered([matric_number for _, matric_number, _, _ in pending])
+    new_rows = []
+    for entry in pending:
+        line, matric_number = entry[0], entry[1]
+        if matric_number in taken:
+            results[line] = _failed(line, matric_number, {"matric_number": TAKEN_MESSAGE})
+        else:
+            new_rows.append(entry)
+
+    generated = {}
+    passwords = []
+    for line, _, _, password in new_rows:
+        if not password:
+            password = generated[line] = secrets.token_urlsafe(9)
+        passwords.append(password)
+    hashes = hash_passwords(passwords, workers=workers)
+
+    while True:
+        try:
+            users = _create_students(new_rows, hashes)
+            break
+        except IntegrityError:
+            # Someone registered one of these matric numbers after the check
+            # above. Skip those rows and insert the rest again.
+            raced = _registered([matric_number for _, matric_number, _, _ in new_rows])
+            if not raced:
+                raise
+            kept = []
+            for entry, password_hash in zip(new_rows, hashes):
+                line, matric_number = entry[0], entry[1]
+                if matric_number in raced:
+                    results[line] = {
+                        "row": line,
+                        "matric_number": matric_number,
+                        "status": "skipped",
+                        "errors": {"matric_number": TAKEN_MESSAGE},
+                    }
+                else:
+                    kept.append((entry, password_hash))
+            new_rows = [entry for entry, _ in kept]
+            hashes = [password_hash for _, password_hash in kept]
+
+    for (line, matric_number, _, _), user in zip(new_rows, users):
+        result = {"row": line, "matric_number": matric_number, "status": "created"}
+        if line in generated:
+            result["initial_password"] = generated[line]
+        results[line] = result
+    return [results[line] for line, _ in rows]
+
+
+def _registered(matric_numbers):
+    """The given matric numbers already used as a username or profile matric number."""
+    taken = set()
+    for username, profile_matric in User.objects.filter(
+        Q(username__in=matric_numbers) | Q(profile__matric_number__in=matric_numbers)
+    ).values_list("username", "profile__matric_number"):
+        taken.update((username, profile_matric))
+    return taken
+
+
+def _create_students(rows, hashes):
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [
+                User(username=matric_number, first_name=full_name, password=password_hash)
+                for (_, matric_number, full_name, _), password_hash in zip(rows, hashes)
+            ]
+        )
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=user,
+                    matric_number=user.username,
+                    role=UserProfile.ROLE_STUDENT,
+                )
+                for user in users
+            ]
+        )
+        Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in users])
+    return users
+
+
+def _failed(line, matric_number, errors):
+    return {"row": line, "matric_number": matric_number, "status": "failed", "errors": errors}
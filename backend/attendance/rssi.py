@@ -0,0 +1,165 @@
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from .models import Session
+from .validation import STATUS_FAIL
+
+HISTOGRAM_MIN = -120
+HISTOGRAM_MAX = 0
+HISTOGRAM_STEP = 5
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+# Robust z-score (median/MAD based) above which a reading is an outlier.
+OUTLIER_Z = 3.5
+THRESHOLD_PERCENTILE = 10
+THRESHOLD_MIN_SAMPLES = 30
+GROUP_BY_CHOICES = ("session", "room")
+
+
+class RssiSamples:
+    """Column arrays of proof RSSI readings, one entry per proof."""
+
+    def __init__(self, proof_ids, session_ids, rssi, passed, rooms):
+        self.proof_ids = proof_ids
+        self.session_ids = session_ids
+        self.rssi = rssi
+        self.passed = passed
+        # Room name per entry of np.unique(session_ids).
+        self.rooms = rooms
+
+    def __len__(self):
+        return len(self.rssi)
+
+    def room_codes(self):
+        """Return (room label per code, room code per proof)."""
+        _, session_index = np.unique(self.session_ids, return_inverse=True)
+        labels, room_of_session = np.unique(
+            np.array(self.rooms, dtype=object), return_inverse=True
+        )
+        return list(labels), room_of_session[session_index]
+
+
+def load_samples(proofs):
+    """Read id/session/rssi/status columns for ``proofs`` in two queries."""
+    if np is None:
+        raise ImproperlyConfigured("RSSI analytics require numpy.")
+    rows = list(proofs.order_by().values_list("id", "session_id", "rssi", "validation_status"))
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return RssiSamples(empty, empty, empty, np.array([], dtype=bool), [])
+    proof_ids, session_ids, rssi, statuses = zip(*rows)
+    session_ids = np.array(session_ids, dtype=np.int64)
+    unique_sessions = np.unique(session_ids)
+    room_by_session = dict(
+        Session.objects.filter(id__in=unique_sessions.tolist()).values_list("id", "room")
+    )
+    return RssiSamples(
+        np.array(proof_ids, dtype=np.int64),
+        session_ids,
+        np.array(rssi, dtype=np.float64),
+        np.array(statuses, dtype=object) != STATUS_FAIL,
+        [room_by_session.get(session_id, "") or "" for session_id in unique_sessions.tolist()],
+    )
+
+
+def _group_percentiles(keys, values, group_count, percentiles):
+    """Linear-interpolated percentiles of ``values`` within each key group.
+
+    Returns an array of shape (group_count, len(percentiles)); groups with
+    no values are NaN. Matches numpy.percentile's default method.
+    """
+    result = np.full((group_count, len(percentiles)), np.nan)
+    if not len(values):
+        return result
+    order = np.lexsort((values, keys))
+    sorted_keys = keys[order]
+    sorted_values = values[order]
+    groups, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+    for column, percentile in enumerate(percentiles):
+        position = starts + (percentile / 100) * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        fraction = position - low
+        result[groups, column] = (
+            sorted_values[low] + (sorted_values[high] - sorted_values[low]) * fraction
+        )
+    return result
+
+
+def robust_z_scores(keys, values, group_count):
+    """Per-reading 0.6745 * (x - median) / MAD within its group."""
+    medians = _group_percentiles(keys, values, group_count, (50,))[:, 0]
+    deviations = np.abs(values - medians[keys])
+    mads = _group_percentiles(keys, deviations, group_count, (50,))[:, 0]
+    scale = mads[keys]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(scale > 0, 0.6745 * (values - medians[keys]) / scale, 0.0)
+    return scores
+
+
+def analyze(samples, group_by="session"):
+    """Histogram, percentiles, outliers and a suggested threshold per group."""
+    if group_by == "room":
+        labels, keys = samples.room_codes()
+    else:
+        labels, keys = np.unique(samples.session_ids, return_inverse=True)
+        labels = labels.tolist()
+    group_count = len(labels)
+    rssi = samples.rssi
+    bin_count = (HISTOGRAM_MAX - HISTOGRAM_MIN) // HISTOGRAM_STEP
+    if not group_count:
+        return {"group_by": group_by, "bins": _bins(), "groups": []}
+
+    counts = np.bincount(keys, minlength=group_count)
+    passed_counts = np.bincount(keys, weights=samples.passed, minlength=group_count)
+    sums = np.bincount(keys, weights=rssi, minlength=group_count)
+    squares = np.bincount(keys, weights=rssi * rssi, minlength=group_count)
+    means = sums / counts
+    stds = np.sqrt(np.maximum(squares / counts - means * means, 0))
+
+    bins = np.clip((rssi - HISTOGRAM_MIN) // HISTOGRAM_STEP, 0, bin_count - 1).astype(np.int64)
+    histograms = np.bincount(keys * bin_count + bins, minlength=group_count * bin_count).reshape(
+        group_count, bin_count
+    )
+
+    percentiles = _group_percentiles(keys, rssi, group_count, PERCENTILES)
+    scores = robust_z_scores(keys, rssi, group_count)
+    outliers = np.abs(scores) > OUTLIER_Z
+    outlier_counts = np.bincount(keys, weights=outliers, minlength=group_count)
+
+    # Thresholds come from proofs that passed validation and are not outliers.
+    usable = samples.passed & ~outliers
+    usable_counts = np.bincount(keys[usable], minlength=group_count)
+    thresholds = _group_percentiles(
+        keys[usable], rssi[usable], group_count, (THRESHOLD_PERCENTILE,)
+    )[:, 0]
+
+    groups = []
+    for index, label in enumerate(labels):
+        suggested = None
+        if usable_counts[index] >= THRESHOLD_MIN_SAMPLES:
+            suggested = int(np.floor(thresholds[index]))
+        groups.append(
+            {
+                group_by: label,
+                "count": int(counts[index]),
+                "passed": int(passed_counts[index]),
+                "mean": round(float(means[index]), 1),
+                "std": round(float(stds[index]), 1),
+                "percentiles": {
+                    f"p{percentile}": round(float(percentiles[index, column]), 1)
+                    for column, percentile in enumerate(PERCENTILES)
+                },
+                "histogram": histograms[index].tolist(),
+                "outliers": int(outlier_counts[index]),
+                "suggested_min_rssi": suggested,
+            }
+        )
+    return {"group_by": group_by, "bins": _bins(), "groups": groups}
+
+
+def _bins():
+    return {"min": HISTOGRAM_MIN, "max": HISTOGRAM_MAX, "step": HISTOGRAM_STEP}
@@ -1,20 +1,36 @@
-import re
+import base64
+import time
+import uuid
 from datetime import timedelta, datetime, timezone as dt_timezone
 
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework.authtoken.models import Token
 from rest_framework import serializers
-from django.db import IntegrityError
-
-from .models import AttendanceProof, Session, UserProfile, AttendanceReplayGuard
+from rest_framework.fields import empty
+from django.db import IntegrityError, transaction
+
+from .codec import decode_acoustic, decode_ble
+from .metrics import registry, rejection_reason
+from .models import AttendanceAnomaly, AttendanceProof, DeviceKey, Session, UserProfile
+from .replay import ReplayDetected, ReplayKey, get_replay_guard
+from .roster import RosterFormatError, import_roster, parse_roster_csv, roster_settings
+from .signals import announce_accepted_proofs
+from .signing import canonical_payload, decode_public_key, get_signature_verifier
+from .summaries import record_accepted_proofs
+from .sync import record_proof_changes
+from .tokens import VERSION_MESSAGE, get_token_signer, token_version
+from .validation import check_labels, evaluate_proof
 
 
 class SessionSerializer(serializers.ModelSerializer):
     created_by_role = serializers.CharField(source="created_by.role", read_only=True)
     created_by_username = serializers.CharField(source="created_by.user.username", read_only=True)
     created_by_matric_number = serializers.CharField(source="created_by.matric_number", read_only=True)
+    # Annotated by SessionViewSet from RoomProximityThreshold.
+    min_rssi = serializers.IntegerField(read_only=True, allow_null=True)
 
     class Meta:
         model = Session
@@ -27,6 +43,7 @@ class SessionSerializer(serializers.ModelSerializer):
             "created_by_username",
             "created_by_matric_number",
             "room",
+            "min_rssi",
             "starts_at",
             "ends_at",
             "active",
@@ -36,14 +53,63 @@ class SessionSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
 
+class SessionSummarySerializer(serializers.ModelSerializer):
+    # Annotated by SessionSummaryListAPIView from SessionAttendanceSummary.
+    present = serializers.IntegerField(read_only=True)
+    passed = serializers.IntegerField(read_only=True)
+    failed = serializers.IntegerField(read_only=True)
+    last_arrival_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = Session
+        fields = [
+            "id",
+            "course_code",
+            "course_title",
+            "room",
+            "starts_at",
+            "ends_at",
+            "active",
+            "present",
+            "passed",
+            "failed",
+            "last_arrival_at",
+        ]
+
+
+def _as_datetime(value):
+    """observed_at as validation would store it; None if it does not parse."""
+    if not isinstance(value, datetime):
+        try:
+            value = parse_datetime(str(value).strip())
+        except ValueError:
+            return None
+        if value is None:
+            return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
 class AttendanceProofSerializer(serializers.ModelSerializer):
     FRESHNESS_WINDOW_SECONDS = 120
     SIGNAL_EXPIRY_SECONDS = 60
-    ACOUSTIC_PATTERN = re.compile(
-        r"^ac\|(?P<session>\d+)\|(?P<version>[A-Za-z0-9_.-]+)\|(?P<issued>\d{10})\|(?P<challenge>[A-Za-z0-9_]+)$"
-    )
-    BLE_PATTERN = re.compile(
-        r"^ble\|(?P<session>\d+)\|(?P<issued>\d{10})\|(?P<nonce>[A-Za-z0-9_]+)$"
+    # Signals may be issued up to 10s in the future, so a challenge/nonce
+    # pair can be accepted for at most this long after it was first used.
+    GUARD_TTL_SECONDS = SIGNAL_EXPIRY_SECONDS + 10
+    REPLAY_MESSAGE = "Replay detected: challenge/nonce already used."
+    DUPLICATE_MESSAGE = "Attendance already submitted for this session."
+    WINDOW_MESSAGE = "Proof timestamp is outside the allowed freshness window."
+    ACOUSTIC_EXPIRED_MESSAGE = "Acoustic token has expired."
+    BLE_EXPIRED_MESSAGE = "BLE nonce has expired."
+    CLIENT_ID_REUSED_MESSAGE = "client_proof_id was already used for a different proof."
+    # Text fields compared between a retry and the proof its client_proof_id
+    # created; session, rssi and observed_at are compared by value.
+    RETRY_FIELDS = ("device_id", "acoustic_token", "ble_nonce", "signature")
+
+    # The owner is joined in so validate() can check it without another query.
+    session = serializers.PrimaryKeyRelatedField(
+        queryset=Session.objects.select_related("created_by")
     )
 
     class Meta:
@@ -58,9 +124,44 @@ class AttendanceProofSerializer(serializers.ModelSerializer):
             "rssi",
             "observed_at",
             "signature",
+            "validation_status",
+            "client_proof_id",
             "created_at",
         ]
-        read_only_fields = ["id", "created_at"]
+        read_only_fields = ["id", "validation_status", "created_at"]
+        # Reuse is detected by the insert; see create().
+        extra_kwargs = {"client_proof_id": {"validators": []}}
+
+    def get_validators(self):
+        # (session, student_id) uniqueness is enforced by the insert in
+        # create(); the default UniqueTogetherValidator would cost a query.
+        return []
+
+    def run_validation(self, data=empty):
+        started = time.perf_counter()
+        try:
+            value = super().run_validation(data)
+        except serializers.ValidationError as exc:
+            registry.observe_validation(
+                time.perf_counter() - started, rejection_reason(exc.detail)
+            )
+            raise
+        registry.observe_validation(time.perf_counter() - started)
+        return value
+
+    def to_internal_value(self, data):
+        # Forged or stale tokens are rejected here, before the session field
+        # costs a query.
+        token_signer = get_token_signer()
+        if token_signer.required and hasattr(data, "get"):
+            errors = token_signer.verify(
+                data.get("session"), data.get("acoustic_token"), data.get("ble_nonce")
+            )
+            if errors:
+                raise serializers.ValidationError(
+                    {field: [message] for field, message in errors.items()}
+                )
+        return super().to_internal_value(data)
 
     def validate(self, attrs):
         observed_at = attrs["observed_at"]
@@ -69,13 +170,7 @@ class AttendanceProofSerializer(serializers.ModelSerializer):
         upper_bound = now + timedelta(seconds=10)
 
         if observed_at < lower_bound or observed_at > upper_bound:
-            raise serializers.ValidationError(
-                {
-                    "observed_at": (
-                        "Proof timestamp is outside the allowed freshness window."
-                    )
-                }
-            )
+            raise serializers.ValidationError({"observed_at": self.WINDOW_MESSAGE})
 
         session = attrs["session"]
         if not session.active:
@@ -89,80 +184,144 @@ class AttendanceProofSerializer(serializers.ModelSerializer):
 
         acoustic = attrs["acoustic_token"].strip()
         ble = attrs["ble_nonce"].strip()
-        acoustic_match = self.ACOUSTIC_PATTERN.match(acoustic)
-        if not acoustic_match:
+        acoustic_token = decode_acoustic(acoustic)
+        if acoustic_token is None:
             raise serializers.ValidationError(
                 {"acoustic_token": "Invalid acoustic token format."}
             )
-        ble_match = self.BLE_PATTERN.match(ble)
-        if not ble_match:
+        ble_nonce = decode_ble(ble)
+        if ble_nonce is None:
             raise serializers.ValidationError({"ble_nonce": "Invalid BLE nonce format."})
 
-        ac_session = int(acoustic_match.group("session"))
-        ble_session = int(ble_match.group("session"))
-        if ac_session != session.id or ble_session != session.id:
+        if acoustic_token.session_id != session.id or ble_nonce.session_id != session.id:
             raise serializers.ValidationError(
                 {"session": "Payload session_id does not match selected session."}
             )
 
-        ac_issued = datetime.fromtimestamp(
-            int(acoustic_match.group("issued")), tz=dt_timezone.utc
-        )
-        ble_issued = datetime.fromtimestamp(
-            int(ble_match.group("issued")), tz=dt_timezone.utc
-        )
+        ac_issued = datetime.fromtimestamp(acoustic_token.issued, tz=dt_timezone.utc)
+        ble_issued = datetime.fromtimestamp(ble_nonce.issued, tz=dt_timezone.utc)
         if (now - ac_issued).total_seconds() > self.SIGNAL_EXPIRY_SECONDS or (
             now - ac_issued
         ).total_seconds() < -10:
-            raise serializers.ValidationError(
-                {"acoustic_token": "Acoustic token has expired."}
-            )
+            raise serializers.ValidationError({"acoustic_token": self.ACOUSTIC_EXPIRED_MESSAGE})
         if (now - ble_issued).total_seconds() > self.SIGNAL_EXPIRY_SECONDS or (
             now - ble_issued
         ).total_seconds() < -10:
-            raise serializers.ValidationError({"ble_nonce": "BLE nonce has expired."})
-
-        challenge_token = acoustic_match.group("challenge")
-        ble_nonce_value = ble_match.group("nonce")
-        attrs["_decoded_challenge_token"] = challenge_token
-        attrs["_decoded_ble_nonce"] = ble_nonce_value
-        if AttendanceReplayGuard.objects.filter(
-            session=session,
-            challenge_token=challenge_token,
-            ble_nonce=ble_nonce_value,
-        ).exists():
-            raise serializers.ValidationError(
-                {"ble_nonce": "Replay detected: challenge/nonce already used."}
-            )
+            raise serializers.ValidationError({"ble_nonce": self.BLE_EXPIRED_MESSAGE})
+        if get_token_signer().required and not acoustic_token.matches_version(
+            token_version(session)
+        ):
+            raise serializers.ValidationError({"acoustic_token": [VERSION_MESSAGE]})
 
-        # Application-level duplicate guard for clearer API errors.
         student_id = attrs["student_id"].strip()
-        if AttendanceProof.objects.filter(session=session, student_id=student_id).exists():
-            raise serializers.ValidationError(
-                {"student_id": "Attendance already submitted for this session."}
-            )
+        device_id = attrs["device_id"].strip()
+        payload = canonical_payload(
+            session.id,
+            student_id,
+            device_id,
+            acoustic,
+            ble,
+            attrs["rssi"],
+            str(self.initial_data.get("observed_at", "")).strip(),
+        )
+        signature_error = get_signature_verifier().verify(
+            student_id, device_id, payload, attrs["signature"]
+        )
+        if signature_error:
+            raise serializers.ValidationError({"signature": signature_error})
 
+        attrs["_replay_key"] = ReplayKey(
+            session.id, acoustic_token.challenge, ble_nonce.nonce
+        )
+        attrs["_issued_at"] = min(ac_issued, ble_issued)
+
+        result = evaluate_proof(session.id, acoustic, ble, observed_at)
+        attrs["validation_status"] = result.status
+        attrs["validation_checks"] = result.checks
+        attrs["validation_failures"] = result.failures
+        attrs["acoustic_age_seconds"] = result.acoustic_age_seconds
+        attrs["ble_age_seconds"] = result.ble_age_seconds
         attrs["student_id"] = student_id
-        attrs["device_id"] = attrs["device_id"].strip()
+        attrs["device_id"] = device_id
         attrs["acoustic_token"] = attrs["acoustic_token"].strip()
         attrs["ble_nonce"] = attrs["ble_nonce"].strip()
         attrs["signature"] = attrs["signature"].strip()
         return attrs
 
     def create(self, validated_data):
-        challenge_token = validated_data.pop("_decoded_challenge_token", None)
-        ble_nonce_value = validated_data.pop("_decoded_ble_nonce", None)
-        proof = super().create(validated_data)
+        replay_key = validated_data.pop("_replay_key")
+        issued_at = validated_data.pop("_issued_at")
+        replay_guard = get_replay_guard()
+        # Replay and duplicate checks are the unique constraints themselves:
+        # whichever claim or insert fails tells us which error to report.
+        claimed = False
         try:
-            AttendanceReplayGuard.objects.create(
-                session=proof.session,
-                challenge_token=challenge_token or "",
-                ble_nonce=ble_nonce_value or "",
-                student_id=proof.student_id,
+            with transaction.atomic():
+                replay_guard.claim(replay_key, validated_data["student_id"], issued_at)
+                claimed = True
+                proof = super().create(validated_data)
+                record_proof_changes([proof])
+                record_accepted_proofs([proof])
+        except Exception as exc:
+            # Nothing was stored, whatever the cause, so the key must not
+            # stay claimed: the student's retry would look like a replay.
+            if claimed:
+                replay_guard.release([replay_key])
+            if not isinstance(exc, (IntegrityError, ReplayDetected)):
+                raise
+            # A retry that raced its own first attempt gets that attempt's proof.
+            original = self.find_retry(
+                {**validated_data, "session": validated_data["session"].pk},
+                validated_data["student_id"],
             )
-        except IntegrityError:
+            if original is not None:
+                return original
+            if isinstance(exc, ReplayDetected):
+                registry.reject("replay")
+                raise serializers.ValidationError({"ble_nonce": [self.REPLAY_MESSAGE]})
+            registry.reject("duplicate")
+            raise serializers.ValidationError({"student_id": [self.DUPLICATE_MESSAGE]})
+        announce_accepted_proofs([proof])
+        return proof
+
+    @staticmethod
+    def parse_client_proof_id(data):
+        try:
+            return uuid.UUID(str(data.get("client_proof_id")))
+        except (AttributeError, ValueError):
+            return None
+
+    @classmethod
+    def find_retry(cls, data, student_id):
+        """The proof an earlier upload with data's client_proof_id created, if any.
+
+        One lookup on the unique index, so a retry skips validation entirely.
+        """
+        client_proof_id = cls.parse_client_proof_id(data)
+        if client_proof_id is None:
+            return None
+        proof = AttendanceProof.objects.filter(client_proof_id=client_proof_id).first()
+        if proof is None:
+            return None
+        return cls.check_retry(proof, data, student_id)
+
+    @classmethod
+    def check_retry(cls, proof, data, student_id):
+        """Return ``proof`` if ``data`` re-sends it; raise if the id was reused."""
+        requested = str(data.get("student_id") or "").strip()
+        if (
+            proof.student_id != student_id
+            or (requested and requested != student_id)
+            or str(data.get("session") or "").strip() != str(proof.session_id)
+            or str(data.get("rssi")).strip() != str(proof.rssi)
+            or _as_datetime(data.get("observed_at")) != proof.observed_at
+            or any(
+                str(data.get(name) or "").strip() != getattr(proof, name)
+                for name in cls.RETRY_FIELDS
+            )
+        ):
             raise serializers.ValidationError(
-                {"ble_nonce": "Replay detected: challenge/nonce already used."}
+                {"client_proof_id": [cls.CLIENT_ID_REUSED_MESSAGE]}
             )
         return proof
 
@@ -197,6 +356,227 @@ class AttendanceProofSerializer(serializers.ModelSerializer):
         return cleaned
 
 
+class ValidationReportItemSerializer(serializers.ModelSerializer):
+    proof_id = serializers.IntegerField(source="id", read_only=True)
+    session_id = serializers.IntegerField(read_only=True)
+    passed_checks = serializers.SerializerMethodField()
+    failed_checks = serializers.SerializerMethodField()
+    status = serializers.CharField(source="validation_status", read_only=True)
+
+    class Meta:
+        model = AttendanceProof
+        fields = [
+            "proof_id",
+            "session_id",
+            "student_id",
+            "observed_at",
+            "acoustic_age_seconds",
+            "ble_age_seconds",
+            "passed_checks",
+            "failed_checks",
+            "status",
+        ]
+
+    def get_passed_checks(self, proof):
+        return check_labels(proof.validation_checks, proof.validation_failures)[0]
+
+    def get_failed_checks(self, proof):
+        return check_labels(proof.validation_checks, proof.validation_failures)[1]
+
+
+class AttendanceAnomalySerializer(serializers.ModelSerializer):
+    label = serializers.CharField(source="get_kind_display", read_only=True)
+
+    class Meta:
+        model = AttendanceAnomaly
+        fields = [
+            "id",
+            "session",
+            "proof",
+            "kind",
+            "label",
+            "student_id",
+            "device_id",
+            "detail",
+            "created_at",
+        ]
+
+
+class PrefetchedSessionField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        session = self.context["sessions"].get(pk)
+        if session is None:
+            self.fail("does_not_exist", pk_value=data)
+        return session
+
+
+class AttendanceProofBatchItemSerializer(AttendanceProofSerializer):
+    # Sessions are loaded once per batch by AttendanceProofBatchSerializer.
+    session = PrefetchedSessionField(queryset=Session.objects.all())
+
+
+class AttendanceProofBatchSerializer(serializers.Serializer):
+    MAX_BATCH_SIZE = 500
+    REPLAY_ERROR = {"ble_nonce": [AttendanceProofSerializer.REPLAY_MESSAGE]}
+    DUPLICATE_ERROR = {"student_id": [AttendanceProofSerializer.DUPLICATE_MESSAGE]}
+    IDENTITY_ERROR = {"student_id": ["student_id must match authenticated student identity."]}
+
+    proofs = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
+
+    def create(self, validated_data):
+        items = validated_data["proofs"]
+        student_id = validated_data["student_id"]
+        results = [None] * len(items)
+        self._accepted_proofs = []
+
+        session_ids = set()
+        for item in items:
+            try:
+                session_ids.add(int(item.get("session")))
+            except (TypeError, ValueError):
+                continue
+        sessions = Session.objects.select_related("created_by").in_bulk(session_ids)
+        retries = self._find_retries(items)
+        get_signature_verifier().prefetch(
+            {str(item.get("device_id") or "").strip() for item in items}
+        )
+        item_context = {**self.context, "sessions": sessions}
+
+        candidates = []
+        for index, item in enumerate(items):
+            requested = str(item.get("student_id") or "").strip()
+            if requested and requested != student_id:
+                registry.reject("identity")
+                results[index] = self._rejected(index, self.IDENTITY_ERROR)
+                continue
+            original = retries.get(index)
+            if original is not None:
+                try:
+                    AttendanceProofSerializer.check_retry(original, item, student_id)
+                except serializers.ValidationError as exc:
+                    results[index] = self._rejected(index, exc.detail)
+                else:
+                    results[index] = self._accepted(index, original, announce=False)
+                continue
+            item_serializer = AttendanceProofBatchItemSerializer(
+                data={**item, "student_id": student_id}, context=item_context
+            )
+            if not item_serializer.is_valid():
+                results[index] = self._rejected(index, item_serializer.errors)
+                continue
+            candidates.append((index, dict(item_serializer.validated_data)))
+
+        if candidates:
+            self._check_conflicts(candidates, student_id, results)
+            candidates = [(index, attrs) for index, attrs in candidates if results[index] is None]
+        if candidates:
+            self._insert(candidates, results)
+        announce_accepted_proofs(self._accepted_proofs)
+        return results
+
+    @staticmethod
+    def _find_retries(items):
+        """index -> proof already created under that item's client_proof_id."""
+        client_ids = {}
+        for index, item in enumerate(items):
+            client_proof_id = AttendanceProofSerializer.parse_client_proof_id(item)
+            if client_proof_id is not None:
+                client_ids[index] = client_proof_id
+        if not client_ids:
+            return {}
+        proofs = AttendanceProof.objects.in_bulk(
+            set(client_ids.values()), field_name="client_proof_id"
+        )
+        return {
+            index: proofs[client_proof_id]
+            for index, client_proof_id in client_ids.items()
+            if client_proof_id in proofs
+        }
+
+    def _check_conflicts(self, candidates, student_id, results):
+        keys = [attrs["_replay_key"] for _, attrs in candidates]
+        used_keys = get_replay_guard().used(keys)
+        submitted = set(
+            AttendanceProof.objects.filter(
+                session_id__in={key.session_id for key in keys}, student_id=student_id
+            ).values_list("session_id", flat=True)
+        )
+        for (index, attrs), key in zip(candidates, keys):
+            if key in used_keys:
+                registry.reject("replay")
+                results[index] = self._rejected(index, self.REPLAY_ERROR)
+            elif key.session_id in submitted:
+                registry.reject("duplicate")
+                results[index] = self._rejected(index, self.DUPLICATE_ERROR)
+            else:
+                # Later items in the same batch conflict with earlier ones.
+                used_keys.add(key)
+                submitted.add(key.session_id)
+
+    def _insert(self, candidates, results):
+        replay_guard = get_replay_guard()
+        entries = [
+            (attrs["_replay_key"], attrs["student_id"], attrs["_issued_at"])
+            for _, attrs in candidates
+        ]
+        proofs = [AttendanceProof(**self._model_fields(attrs)) for _, attrs in candidates]
+        claimed = False
+        try:
+            with transaction.atomic():
+                replay_guard.claim_many(entries)
+                claimed = True
+                AttendanceProof.objects.bulk_create(proofs)
+                record_proof_changes(proofs)
+                record_accepted_proofs(proofs)
+        except Exception as exc:
+            if claimed:
+                replay_guard.release([key for key, _, _ in entries])
+            if not isinstance(exc, (IntegrityError, ReplayDetected)):
+                raise
+            # A concurrent submission won the race for at least one row;
+            # retry item by item so the rest of the batch still lands.
+            self._insert_one_by_one(candidates, results)
+            return
+        for (index, _), proof in zip(candidates, proofs):
+            results[index] = self._accepted(index, proof)
+
+    def _insert_one_by_one(self, candidates, results):
+        for index, attrs in candidates:
+            item_serializer = AttendanceProofSerializer()
+            try:
+                proof = item_serializer.create(dict(attrs))
+            except serializers.ValidationError as exc:
+                results[index] = self._rejected(index, exc.detail)
+                continue
+            # create() has announced the proof (or it is an earlier upload's).
+            results[index] = self._accepted(index, proof, announce=False)
+
+    @staticmethod
+    def _model_fields(attrs):
+        return {name: value for name, value in attrs.items() if not name.startswith("_")}
+
+    def _accepted(self, index, proof, announce=True):
+        if announce:
+            self._accepted_proofs.append(proof)
+        return {
+            "index": index,
+            "status": "accepted",
+            "proof": AttendanceProofSerializer(proof).data,
+        }
+
+    @staticmethod
+    def _rejected(index, errors):
+        return {"index": index, "status": "rejected", "errors": errors}
+
+
 class RegisterSerializer(serializers.Serializer):
     full_name = serializers.CharField(max_length=150)
     matric_number = serializers.CharField(max_length=64, required=False, allow_blank=True)
@@ -261,6 +641,80 @@ class RegisterSerializer(serializers.Serializer):
         }
 
 
+class DeviceKeySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeviceKey
+        fields = ["device_id", "public_key", "created_at", "updated_at"]
+        read_only_fields = ["created_at", "updated_at"]
+        # device_id uniqueness is checked in create() so re-registering your
+        # own device rotates its key instead of failing.
+        extra_kwargs = {"device_id": {"validators": []}}
+
+    def validate_device_id(self, value):
+        cleaned = value.strip()
+        if not cleaned:
+            raise serializers.ValidationError("device_id cannot be empty.")
+        return cleaned
+
+    def validate_public_key(self, value):
+        try:
+            public_key = decode_public_key(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return base64.b64encode(public_key.public_bytes_raw()).decode()
+
+    def create(self, validated_data):
+        profile = validated_data.pop("profile")
+        try:
+            with transaction.atomic():
+                key, created = DeviceKey.objects.select_for_update().get_or_create(
+                    device_id=validated_data["device_id"],
+                    defaults={"profile": profile, "public_key": validated_data["public_key"]},
+                )
+        except IntegrityError:
+            key, created = DeviceKey.objects.get(device_id=validated_data["device_id"]), False
+        if key.profile_id != profile.id:
+            raise serializers.ValidationError(
+                {"device_id": "Device is registered to another account."}
+            )
+        if not created and key.public_key != validated_data["public_key"]:
+            key.public_key = validated_data["public_key"]
+            key.save(update_fields=["public_key", "updated_at"])
+        return key
+
+
+class RosterImportSerializer(serializers.Serializer):
+    file = serializers.FileField(required=False)
+    csv = serializers.CharField(required=False, trim_whitespace=False)
+
+    def validate(self, attrs):
+        upload = attrs.get("file")
+        text = attrs.get("csv")
+        if bool(upload) == bool(text):
+            raise serializers.ValidationError("Provide exactly one of file or csv.")
+        if upload:
+            try:
+                text = upload.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raise serializers.ValidationError({"file": "Roster must be UTF-8 encoded CSV."})
+        try:
+            attrs["rows"] = parse_roster_csv(text)
+        except RosterFormatError as exc:
+            raise serializers.ValidationError({"csv": str(exc)})
+        limit = roster_settings()["MAX_REQUEST_ROWS"]
+        if len(attrs["rows"]) > limit:
+            raise serializers.ValidationError(
+                {
+                    "csv": f"At most {limit} rows per request; import larger rosters "
+                    "with the import_roster management command."
+                }
+            )
+        return attrs
+
+    def create(self, validated_data):
+        return import_roster(validated_data["rows"])
+
+
 class LoginSerializer(serializers.Serializer):
     identifier = serializers.CharField(max_length=150)
     password = serializers.CharField(write_only=True)
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent once the transaction that stored the proofs has committed.
+# Receivers get ``proofs``: a list of AttendanceProof instances.
+proofs_accepted = Signal()
+
+
+def announce_accepted_proofs(proofs):
+    if proofs:
+        transaction.on_commit(
+            lambda: proofs_accepted.send(sender=proofs[0].__class__, proofs=proofs)
+        )
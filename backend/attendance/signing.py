@@ -0,0 +1,208 @@
+import base64
+import binascii
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+except ImportError:  # pragma: no cover - cryptography is optional
+    InvalidSignature = Ed25519PublicKey = None
+
+from .models import DeviceKey
+
+PUBLIC_KEY_BYTES = 32
+SIGNATURE_BYTES = 64
+
+UNREGISTERED_MESSAGE = "Device has no registered signing key."
+FOREIGN_DEVICE_MESSAGE = "Device is registered to another student."
+INVALID_SIGNATURE_MESSAGE = "Signature does not match the proof payload."
+
+
+def canonical_payload(
+    session_id, student_id, device_id, acoustic_token, ble_nonce, rssi, observed_at
+):
+    """Bytes the device signs; the same join the mobile app hashes.
+
+    ``observed_at`` is the string exactly as submitted, since re-serialising
+    the parsed timestamp would not reproduce the client's formatting.
+    """
+    return "|".join(
+        [str(session_id), student_id, device_id, acoustic_token, ble_nonce, str(rssi), observed_at]
+    ).encode()
+
+
+def _decode_bytes(value, length):
+    value = value.strip()
+    if len(value) == length * 2:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            pass
+    try:
+        raw = base64.urlsafe_b64decode(
+            value.replace("+", "-").replace("/", "_") + "=" * (-len(value) % 4)
+        )
+    except (binascii.Error, ValueError):
+        return None
+    return raw if len(raw) == length else None
+
+
+def decode_public_key(value):
+    """Parse a hex or base64 raw Ed25519 public key; ValueError if invalid."""
+    if Ed25519PublicKey is None:
+        raise ValueError("Signature verification requires the cryptography package.")
+    raw = _decode_bytes(value, PUBLIC_KEY_BYTES)
+    if raw is None:
+        raise ValueError(f"Public key must be {PUBLIC_KEY_BYTES} bytes, hex or base64 encoded.")
+    return Ed25519PublicKey.from_public_bytes(raw)
+
+
+class RegisteredDevice(NamedTuple):
+    student_id: str
+    public_key: object
+
+
+class DeviceKeyCache:
+    """Bounded LRU of device_id -> RegisteredDevice (or None) with a TTL.
+
+    Unregistered devices are cached as None so unsigned submissions do not
+    cost a query each either.
+    """
+
+    MISSING = object()
+
+    def __init__(self, max_entries, ttl_seconds, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, device_id):
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is None:
+                return self.MISSING
+            device, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[device_id]
+                return self.MISSING
+            self._entries.move_to_end(device_id)
+            return device
+
+    def set(self, device_id, device):
+        with self._lock:
+            self._entries.pop(device_id, None)
+            self._entries[device_id] = (device, self._clock() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, device_id):
+        with self._lock:
+            self._entries.pop(device_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DeviceSignatureVerifier:
+    def __init__(self, cache, required=False):
+        self.cache = cache
+        self.required = required
+
+    def prefetch(self, device_ids):
+        """Load every uncached device in one query; used by batch uploads."""
+        missing = {
+            device_id
+            for device_id in device_ids
+            if self.cache.get(device_id) is self.cache.MISSING
+        }
+        if not missing:
+            return
+        found = {}
+        keys = DeviceKey.objects.select_related("profile__user").filter(device_id__in=missing)
+        for key in keys:
+            found[key.device_id] = self._registered(key)
+        for device_id in missing:
+            self.cache.set(device_id, found.get(device_id))
+
+    def device(self, device_id):
+        device = self.cache.get(device_id)
+        if device is self.cache.MISSING:
+            key = (
+                DeviceKey.objects.select_related("profile__user")
+                .filter(device_id=device_id)
+                .first()
+            )
+            device = self._registered(key) if key else None
+            self.cache.set(device_id, device)
+        return device
+
+    def verify(self, student_id, device_id, payload, signature):
+        """Return an error message, or None if the proof may be accepted."""
+        device = self.device(device_id)
+        if device is None:
+            return UNREGISTERED_MESSAGE if self.required else None
+        if device.student_id != student_id:
+            return FOREIGN_DEVICE_MESSAGE
+        raw = _decode_bytes(signature, SIGNATURE_BYTES)
+        if raw is None or device.public_key is None:
+            return INVALID_SIGNATURE_MESSAGE
+        try:
+            device.public_key.verify(raw, payload)
+        except InvalidSignature:
+            return INVALID_SIGNATURE_MESSAGE
+        return None
+
+    @staticmethod
+    def _registered(key):
+        profile = key.profile
+        try:
+            public_key = decode_public_key(key.public_key)
+        except ValueError:
+            # Keys are checked on registration; this only happens when the
+            # cryptography package is missing. No signature can match.
+            public_key = None
+        return RegisteredDevice(profile.matric_number or profile.user.username, public_key)
+
+
+_verifier = None
+
+
+def get_signature_verifier():
+    global _verifier
+    if _verifier is None:
+        config = getattr(settings, "ATTENDANCE_DEVICE_KEYS", {})
+        _verifier = DeviceSignatureVerifier(
+            DeviceKeyCache(
+                max_entries=config.get("CACHE_MAX_ENTRIES", 20000),
+                ttl_seconds=config.get("CACHE_TTL_SECONDS", 300),
+            ),
+            required=config.get("REQUIRED", False),
+        )
+    return _verifier
+
+
+@receiver(post_save, sender=DeviceKey)
+@receiver(post_delete, sender=DeviceKey)
+def _evict_device_key(sender, instance, **kwargs):
+    get_signature_verifier().cache.delete(instance.device_id)
+
+
+@receiver(setting_changed)
+def _reset_signature_verifier(setting, **kwargs):
+    global _verifier
+    if setting == "ATTENDANCE_DEVICE_KEYS":
+        _verifier = None
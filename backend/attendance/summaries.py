@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateTimeField, F, Max, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AttendanceProof, Session, SessionAttendanceSummary
+from .validation import STATUS_FAIL
+
+COUNT_FIELDS = ("present_count", "passed_count", "failed_count")
+
+
+def _totals(proofs):
+    totals = defaultdict(lambda: {"present_count": 0, "passed_count": 0, "failed_count": 0})
+    last_arrival = {}
+    for proof in proofs:
+        counts = totals[proof.session_id]
+        counts["present_count"] += 1
+        if proof.validation_status == STATUS_FAIL:
+            counts["failed_count"] += 1
+        else:
+            counts["passed_count"] += 1
+        last = last_arrival.get(proof.session_id)
+        if last is None or proof.created_at > last:
+            last_arrival[proof.session_id] = proof.created_at
+    return [(session_id, counts, last_arrival[session_id]) for session_id, counts in totals.items()]
+
+
+def record_accepted_proofs(proofs):
+    """Add newly inserted proofs to their sessions' summaries.
+
+    Call inside the transaction that inserted the proofs, after the inserts,
+    so the summary row lock is held for as short a time as possible.
+    """
+    for session_id, counts, last_arrival in _totals(proofs):
+        if _increment(session_id, counts, last_arrival):
+            continue
+        try:
+            with transaction.atomic():
+                SessionAttendanceSummary.objects.create(
+                    session_id=session_id, last_arrival_at=last_arrival, **counts
+                )
+        except IntegrityError:
+            # Another submission created the row first.
+            _increment(session_id, counts, last_arrival)
+
+
+def _increment(session_id, counts, last_arrival):
+    arrival = Value(last_arrival, output_field=DateTimeField())
+    return SessionAttendanceSummary.objects.filter(session_id=session_id).update(
+        **{name: F(name) + value for name, value in counts.items()},
+        # Greatest() is NULL on SQLite if either side is.
+        last_arrival_at=Greatest(Coalesce("last_arrival_at", arrival), arrival),
+    )
+
+
+def rebuild_summaries(session_ids=None, batch_size=500):
+    """Recount summaries from AttendanceProof. Returns the number of sessions.
+
+    Archived sessions are skipped: their proofs have left AttendanceProof,
+    and their summaries already hold the final counts.
+    """
+    sessions = (
+        Session.objects.filter(archive_entry__isnull=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    if session_ids is not None:
+        sessions = sessions.filter(id__in=session_ids)
+    all_ids = list(sessions)
+    for start in range(0, len(all_ids), batch_size):
+        _rebuild_batch(all_ids[start : start + batch_size])
+    return len(all_ids)
+
+
+def _rebuild_batch(session_ids):
+    with transaction.atomic():
+        SessionAttendanceSummary.objects.bulk_create(
+            [SessionAttendanceSummary(session_id=session_id) for session_id in session_ids],
+            ignore_conflicts=True,
+        )
+        # Locking the rows first makes concurrent submissions wait, so their
+        # increments land on top of the recount instead of being lost.
+        summaries = list(
+            SessionAttendanceSummary.objects.select_for_update().filter(session_id__in=session_ids)
+        )
+        counted = {
+            row["session_id"]: row
+            for row in AttendanceProof.objects.filter(session_id__in=session_ids)
+            .values("session_id")
+            .annotate(
+                present_count=Count("id"),
+                failed_count=Count("id", filter=Q(validation_status=STATUS_FAIL)),
+                last_arrival_at=Max("created_at"),
+            )
+            .order_by()
+        }
+        for summary in summaries:
+            row = counted.get(summary.session_id)
+            summary.present_count = row["present_count"] if row else 0
+            summary.failed_count = row["failed_count"] if row else 0
+            summary.passed_count = summary.present_count - summary.failed_count
+            summary.last_arrival_at = row["last_arrival_at"] if row else None
+        SessionAttendanceSummary.objects.bulk_update(
+            summaries, [*COUNT_FIELDS, "last_arrival_at"]
+        )
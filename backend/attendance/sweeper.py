@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .conditional import bump_session_list
+from .history import bump_sessions
+from .models import AttendanceReplayGuard, Session
+from .serializers import AttendanceProofSerializer
+from .summaries import rebuild_summaries
+from .sync import record_session_changes
+
+
+def close_expired_sessions(now=None, batch_size=200):
+    """Deactivate sessions whose ends_at has passed. Returns their ids.
+
+    Rows are locked with SKIP LOCKED, so sweepers running on several workers
+    take disjoint batches instead of waiting on each other. Each closed
+    session's summary is recounted in the same transaction, so it is exact
+    when the session leaves the active list.
+    """
+    now = now or timezone.now()
+    closed = []
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Session.objects.select_for_update(skip_locked=True)
+                .filter(active=True, ends_at__lte=now)
+                .order_by("ends_at", "id")
+                .values_list("id", "created_by_id")[:batch_size]
+            )
+            if not rows:
+                break
+            ids = [session_id for session_id, _ in rows]
+            Session.objects.filter(id__in=ids, active=True).update(active=False)
+            record_session_changes(rows)
+            rebuild_summaries(ids)
+            # update() sends no post_save. Last, so the marker rows stay
+            # locked only until commit.
+            bump_session_list({lecturer_id for _, lecturer_id in rows if lecturer_id})
+        closed.extend(ids)
+    if closed:
+        bump_sessions()
+    return closed
+
+
+def purge_expired_guards(now=None, batch_size=5000):
+    """Delete replay guard rows that can no longer match. Returns the count."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=AttendanceProofSerializer.GUARD_TTL_SECONDS)
+    expired = AttendanceReplayGuard.objects.filter(used_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(expired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # Another sweeper may have deleted some of these already.
+        count, _ = AttendanceReplayGuard.objects.filter(id__in=ids).delete()
+        deleted += count
@@ -0,0 +1,257 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from heapq import merge
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AttendanceProof, ChangeLogCounter, ChangeLogEntry, Session
+
+SESSION_FIELDS = (
+    "id",
+    "course_code",
+    "course_title",
+    "lecturer_name",
+    "room",
+    "starts_at",
+    "ends_at",
+    "active",
+    "token_version",
+)
+PROOF_FIELDS = (
+    "id",
+    "session_id",
+    "student_id",
+    "device_id",
+    "rssi",
+    "observed_at",
+    "validation_status",
+    "created_at",
+)
+
+DEFAULTS = {
+    "PAGE_SIZE": 500,
+    # The sweeper deletes older entries; clients behind that get a reset.
+    "RETENTION_DAYS": 30,
+}
+
+_untracked = ContextVar("untracked_proof_deletes", default=False)
+
+
+def sync_settings():
+    return {**DEFAULTS, **getattr(settings, "ATTENDANCE_SYNC", {})}
+
+
+def record_session_changes(rows, deleted=False):
+    """Log changes to sessions given as (session_id, created_by_id) pairs.
+
+    Session saves and deletes are logged by the receivers below; call this
+    for bulk writes (update(), bulk_create()) that send no signals.
+    """
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            kind=ChangeLogEntry.KIND_SESSION,
+            object_id=session_id,
+            deleted=deleted,
+            lecturer_id=lecturer_id,
+        )
+        for session_id, lecturer_id in rows
+    )
+
+
+def record_proof_changes(proofs):
+    """Log inserted proofs. Call in the transaction that inserted them."""
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            kind=ChangeLogEntry.KIND_PROOF,
+            object_id=proof.pk,
+            lecturer_id=proof.session.created_by_id,
+            student_id=proof.student_id,
+        )
+        for proof in proofs
+    )
+
+
+def record_proof_deletes(rows):
+    """Log deleted proofs given as (proof_id, student_id, lecturer_id) triples."""
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            kind=ChangeLogEntry.KIND_PROOF,
+            object_id=proof_id,
+            deleted=True,
+            lecturer_id=lecturer_id,
+            student_id=student_id,
+        )
+        for proof_id, student_id, lecturer_id in rows
+    )
+
+
+@contextmanager
+def untracked_proof_deletes():
+    """Log no tombstones for proofs deleted inside the block.
+
+    The archiver uses it: archived proofs still exist, they have just left
+    the hot table.
+    """
+    token = _untracked.set(True)
+    try:
+        yield
+    finally:
+        _untracked.reset(token)
+
+
+@receiver(post_save, sender=Session)
+def _session_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_session_changes([(instance.pk, instance.created_by_id)])
+
+
+@receiver(pre_delete, sender=Session)
+def _session_deleting(sender, instance, **kwargs):
+    # The proofs go with the session. Log them in one insert here rather
+    # than one per proof from _proof_deleted.
+    record_proof_deletes(
+        (proof_id, student_id, instance.created_by_id)
+        for proof_id, student_id in AttendanceProof.objects.filter(
+            session_id=instance.pk
+        ).values_list("id", "student_id")
+    )
+
+
+@receiver(post_delete, sender=Session)
+def _session_deleted(sender, instance, **kwargs):
+    record_session_changes([(instance.pk, instance.created_by_id)], deleted=True)
+
+
+@receiver(post_delete, sender=AttendanceProof)
+def _proof_deleted(sender, instance, origin=None, **kwargs):
+    if _untracked.get():
+        return
+    if isinstance(origin, Session) or (
+        isinstance(origin, QuerySet) and origin.model is Session
+    ):
+        return  # Logged by _session_deleting.
+    record_proof_deletes(
+        [(instance.pk, instance.student_id, instance.session.created_by_id)]
+    )
+
+
+def assign_sequence(batch_size=5000):
+    """Number committed entries that have no seq yet. Returns the count.
+
+    Entries only become visible here once their transaction commits, and
+    numbering runs under the counter row lock, so seq follows commit order:
+    a client holding cursor N can never miss an entry numbered below N.
+    run_session_sweeper calls this; requests never do, so polling sync
+    takes no locks.
+    """
+    numbered = 0
+    while True:
+        with transaction.atomic():
+            counter, _ = ChangeLogCounter.objects.select_for_update().get_or_create(pk=1)
+            pending = list(
+                ChangeLogEntry.objects.filter(seq__isnull=True).order_by("id")[:batch_size]
+            )
+            if not pending:
+                return numbered
+            for entry in pending:
+                counter.last_seq += 1
+                entry.seq = counter.last_seq
+            ChangeLogEntry.objects.bulk_update(pending, ["seq"], batch_size=500)
+            counter.save(update_fields=["last_seq"])
+        numbered += len(pending)
+
+
+def changes_since(cursor, lecturer_id=None, student_id=None):
+    """One page of changes visible to a lecturer or a student after ``cursor``.
+
+    Lecturers see their own sessions and the proofs submitted to them;
+    students see every session change and their own proofs. ``cursor`` is
+    None for a first sync, which only returns the cursor to start from.
+    Read-only: entries the sweeper has not numbered yet show up on a later
+    call.
+    """
+    config = sync_settings()
+    if cursor is None or _expired(cursor):
+        head = ChangeLogCounter.objects.values_list("last_seq", flat=True).first()
+        return {"cursor": str(head or 0), "reset": True, "more": False}
+
+    page_size = config["PAGE_SIZE"]
+    entries = ChangeLogEntry.objects.filter(seq__gt=cursor).order_by("seq")
+    fields = ("seq", "kind", "object_id", "deleted")
+    if lecturer_id is not None:
+        rows = list(entries.filter(lecturer_id=lecturer_id).values_list(*fields)[: page_size + 1])
+    else:
+        # Two index range scans instead of one OR over both.
+        sessions = entries.filter(kind=ChangeLogEntry.KIND_SESSION).values_list(*fields)
+        proofs = entries.filter(
+            kind=ChangeLogEntry.KIND_PROOF, student_id=student_id
+        ).values_list(*fields)
+        rows = list(merge(sessions[: page_size + 1], proofs[: page_size + 1]))[: page_size + 1]
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    # Only the latest entry per object matters.
+    latest = {}
+    for _, kind, object_id, deleted in rows:
+        latest[(kind, object_id)] = deleted
+    upserts = {ChangeLogEntry.KIND_SESSION: [], ChangeLogEntry.KIND_PROOF: []}
+    deletes = {ChangeLogEntry.KIND_SESSION: [], ChangeLogEntry.KIND_PROOF: []}
+    for (kind, object_id), deleted in latest.items():
+        (deletes if deleted else upserts)[kind].append(object_id)
+
+    session_rows = Session.objects.filter(id__in=upserts[ChangeLogEntry.KIND_SESSION])
+    proof_rows = AttendanceProof.objects.filter(id__in=upserts[ChangeLogEntry.KIND_PROOF])
+    if lecturer_id is not None:
+        session_rows = session_rows.filter(created_by_id=lecturer_id)
+        proof_rows = proof_rows.filter(session__created_by_id=lecturer_id)
+    else:
+        proof_rows = proof_rows.filter(student_id=student_id)
+    # Proofs archived since they were logged are simply absent; they still
+    # exist, so untracked_proof_deletes() keeps them from being tombstoned.
+    return {
+        "cursor": str(rows[-1][0] if rows else cursor),
+        "reset": False,
+        "more": more,
+        "sessions": _table(SESSION_FIELDS, session_rows, upserts[ChangeLogEntry.KIND_SESSION]),
+        "proofs": _table(PROOF_FIELDS, proof_rows, upserts[ChangeLogEntry.KIND_PROOF]),
+        "deleted": {
+            "sessions": deletes[ChangeLogEntry.KIND_SESSION],
+            "proofs": deletes[ChangeLogEntry.KIND_PROOF],
+        },
+    }
+
+
+def _table(fields, queryset, ids):
+    # Column names once, then one array per row: far smaller than a list of
+    # objects repeating every key.
+    rows = sorted(queryset.order_by().values_list(*fields)) if ids else []
+    return {"fields": list(fields), "rows": rows}
+
+
+def _expired(cursor):
+    """True if entries after ``cursor`` may already have been purged."""
+    oldest = ChangeLogEntry.objects.aggregate(oldest=Min("seq"))["oldest"]
+    return oldest is not None and cursor < oldest - 1
+
+
+def purge_change_log(now=None, batch_size=5000):
+    """Delete numbered entries past RETENTION_DAYS, always keeping the newest. Returns the count."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=sync_settings()["RETENTION_DAYS"])
+    newest = ChangeLogEntry.objects.aggregate(newest=Max("seq"))["newest"]
+    if newest is None:
+        return 0
+    expired = ChangeLogEntry.objects.filter(created_at__lt=cutoff, seq__lt=newest).order_by("seq")
+    deleted = 0
+    while True:
+        ids = list(expired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        count, _ = ChangeLogEntry.objects.filter(id__in=ids).delete()
+        deleted += count
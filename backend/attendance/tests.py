@@ -1,3 +1,1783 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from . import anomalies, authentication, history, rssi
+from .archive import archive_sessions, read_archive
+from .authentication import CachedIdentity, CachedTokenAuthentication, TokenIdentityCache
+from .codec import (
+    COMPACT_LENGTH,
+    AcousticToken,
+    BleNonce,
+    decode_acoustic,
+    decode_ble,
+    encode_acoustic,
+    version_tag,
+)
+from .live import QUEUE_SIZE, LiveAttendanceBroker, _authorize
+from .metrics import rejection_reason
+from .models import (
+    AttendanceAnomaly,
+    AttendanceProof,
+    ProofArchive,
+    RoomProximityThreshold,
+    AttendanceReplayGuard,
+    ChangeLogEntry,
+    Session,
+    SessionAttendanceSummary,
+    SessionListMarker,
+    UserProfile,
+)
+from .replay import BucketedReplayGuard, ReplayDetected, ReplayKey, get_replay_guard
+from .roster import PARALLEL_HASH_THRESHOLD, hash_passwords, import_roster, parse_roster_csv
+from .serializers import AttendanceProofBatchSerializer, AttendanceProofSerializer
+from .signing import (
+    FOREIGN_DEVICE_MESSAGE,
+    INVALID_SIGNATURE_MESSAGE,
+    UNREGISTERED_MESSAGE,
+    DeviceKeyCache,
+    canonical_payload,
+    get_signature_verifier,
+)
+from .summaries import rebuild_summaries
+from .sweeper import close_expired_sessions
+from .sync import assign_sequence, record_proof_changes, record_session_changes
+from .tokens import (
+    FORGED_ACOUSTIC_MESSAGE,
+    FORGED_BLE_MESSAGE,
+    STALE_MESSAGE,
+    VERSION_MESSAGE,
+    SessionTokenSigner,
+    get_token_signer,
+)
+from .validation import CHECK_BITS, STATUS_FAIL, STATUS_PASS
+
+try:
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+except ImportError:  # pragma: no cover - cryptography is optional
+    Ed25519PrivateKey = None
+
+# Tables that grow with every class; a full scan of these is a regression.
+LARGE_TABLES = {
+    AttendanceAnomaly._meta.db_table,
+    Session._meta.db_table,
+    AttendanceProof._meta.db_table,
+    AttendanceReplayGuard._meta.db_table,
+    ChangeLogEntry._meta.db_table,
+}
+
+
+def full_scans(sql):
+    """Return the large tables EXPLAIN says ``sql`` reads end to end."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("EXPLAIN " + sql)
+            pattern = re.compile(r"Seq Scan on (\w+)")
+        elif connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            # "SCAN t USING INDEX i" walks an index in order; a bare
+            # "SCAN t" reads every row.
+            pattern = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+        else:
+            raise NotImplementedError(connection.vendor)
+        lines = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for line in lines:
+        match = pattern.search(line)
+        if match and match.group(1) in LARGE_TABLES:
+            scans.append(match.group(1))
+    return scans
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN every read endpoint's SQL over a seeded dataset."""
+
+    LECTURERS = 4
+    SESSIONS_PER_LECTURER = 30
+    STUDENTS = 120
+
+    @classmethod
+    def setUpTestData(cls):
+        lecturers = []
+        for index in range(cls.LECTURERS):
+            user = User.objects.create(username=f"lecturer{index}")
+            lecturers.append(UserProfile.objects.create(user=user, role=UserProfile.ROLE_LECTURER))
+        cls.lecturer = lecturers[0]
+        cls.lecturer_token = Token.objects.create(user=cls.lecturer.user).key
+
+        student_user = User.objects.create(username="21/52HP001")
+        UserProfile.objects.create(
+            user=student_user, matric_number="21/52HP001", role=UserProfile.ROLE_STUDENT
+        )
+        cls.student_token = Token.objects.create(user=student_user).key
+
+        now = timezone.now()
+        sessions = Session.objects.bulk_create(
+            Session(
+                course_code=f"CSC{index % 7}01",
+                lecturer_name=lecturer.user.username,
+                created_by=lecturer,
+                room="Hall A",
+                starts_at=now - timedelta(days=index),
+                active=index % 10 == 0,
+            )
+            for lecturer in lecturers
+            for index in range(cls.SESSIONS_PER_LECTURER)
+        )
+        cls.session = sessions[0]
+
+        failed_bit = next(iter(CHECK_BITS.values()))
+        proofs = []
+        guards = []
+        for session in sessions:
+            for index in range(cls.STUDENTS):
+                failed = index % 5 == 0
+                observed_at = session.starts_at + timedelta(seconds=index)
+                proofs.append(
+                    AttendanceProof(
+                        session=session,
+                        student_id=f"21/52HP{index:03d}",
+                        device_id=f"device-{index}",
+                        acoustic_token=f"ac|{session.id}|v1|0|ac_{index}",
+                        ble_nonce=f"ble|{session.id}|0|ble_{index}",
+                        rssi=-60,
+                        observed_at=observed_at,
+                        signature="0" * 64,
+                        validation_status=STATUS_FAIL if failed else STATUS_PASS,
+                        validation_failures=failed_bit if failed else 0,
+                    )
+                )
+                guards.append(
+                    AttendanceReplayGuard(
+                        session=session,
+                        challenge_token=f"ac_{index}",
+                        ble_nonce=f"ble_{index}",
+                        student_id=f"21/52HP{index:03d}",
+                    )
+                )
+        AttendanceProof.objects.bulk_create(proofs, batch_size=2000)
+        AttendanceReplayGuard.objects.bulk_create(guards, batch_size=2000)
+        AttendanceAnomaly.objects.bulk_create(
+            AttendanceAnomaly(
+                session_id=proof.session_id,
+                proof_id=proof.id,
+                kind=AttendanceAnomaly.KIND_SHARED_DEVICE,
+                student_id=proof.student_id,
+                device_id=proof.device_id,
+            )
+            for proof in proofs[::7]
+        )
+        record_session_changes((session.id, session.created_by_id) for session in sessions)
+        record_proof_changes(proofs)
+        assign_sequence()
+        call_command("rebuild_attendance_summaries", stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertIndexedGet(self, path, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, HTTP_AUTHORIZATION=f"Token {token}")
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, path)
+        self.assertSelectsIndexed(queries)
+        return response
+
+    def assertIndexedPages(self, path, token, pages=2):
+        """Walk cursor pages; later pages filter on the cursor position."""
+        for _ in range(pages):
+            response = self.assertIndexedGet(path, token)
+            path = response.json()["next"]
+            if path is None:
+                break
+
+    def assertSelectsIndexed(self, queries):
+        selects = [query["sql"] for query in queries if query["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects)
+        for sql in selects:
+            scans = full_scans(sql)
+            self.assertFalse(scans, f"Full scan of {', '.join(scans)} in:\n{sql}")
+
+    def test_session_list(self):
+        self.assertIndexedPages("/api/sessions/?page_size=10", self.lecturer_token)
+        self.assertIndexedPages("/api/sessions/?page_size=5", self.student_token)
+
+    def test_session_summaries(self):
+        self.assertIndexedGet("/api/sessions/summaries/", self.lecturer_token)
+        # The token is cached by now, so this is the summaries query alone.
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/sessions/summaries/", HTTP_AUTHORIZATION=f"Token {self.lecturer_token}"
+            )
+        summaries = response.json()
+        self.assertEqual(len(summaries), self.SESSIONS_PER_LECTURER)
+        self.assertEqual(summaries[0]["present"], self.STUDENTS)
+        self.assertEqual(summaries[0]["failed"], self.STUDENTS // 5)
+
+    def test_session_detail(self):
+        self.assertIndexedGet(f"/api/sessions/{self.session.id}/", self.lecturer_token)
+
+    def test_attendance_list(self):
+        self.assertIndexedPages(f"/api/attendance/?session={self.session.id}", self.lecturer_token)
+        self.assertIndexedPages("/api/attendance/?student_id=21/52HP007", self.lecturer_token)
+        self.assertIndexedPages("/api/attendance/?page_size=10", self.student_token)
+
+    def test_attendance_list_by_lecturer(self):
+        self.assertIndexedPages("/api/attendance/", self.lecturer_token)
+
+    def test_validation_report(self):
+        check = next(iter(CHECK_BITS))
+        for query in ("", f"?session={self.session.id}", "?status=fail", f"?check={check}"):
+            self.assertIndexedPages(f"/api/attendance/report/{query}", self.lecturer_token)
+
+    def test_anomalies(self):
+        for query in ("", f"?session={self.session.id}", "?kind=shared_device"):
+            self.assertIndexedPages(f"/api/attendance/anomalies/{query}", self.lecturer_token)
+
+    def test_rssi_analytics(self):
+        for query in ("", "?group_by=room", f"?session={self.session.id}"):
+            self.assertIndexedGet(f"/api/attendance/rssi/{query}", self.lecturer_token)
+
+    def test_history(self):
+        self.assertIndexedGet("/api/attendance/history/", self.student_token)
+        self.assertIndexedGet("/api/attendance/history/?course_code=CSC101", self.lecturer_token)
+
+    def test_sync(self):
+        # Incremental syncs: a few new sessions, then the middle of the proofs.
+        cursors = [
+            ChangeLogEntry.objects.filter(kind=ChangeLogEntry.KIND_SESSION)
+            .order_by("-seq")
+            .values_list("seq", flat=True)[5],
+            ChangeLogEntry.objects.count() // 2,
+        ]
+        for token in (self.lecturer_token, self.student_token):
+            self.assertIndexedGet("/api/sync/", token)
+            with self.settings(ATTENDANCE_SYNC={"PAGE_SIZE": 50}):
+                for cursor in cursors:
+                    self.assertIndexedGet(f"/api/sync/?cursor={cursor}", token)
+
+    def test_retry_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            AttendanceProofSerializer.find_retry(
+                {"client_proof_id": "2f1c8e9a-6a55-4c1e-9d62-2d2b8a7b4c10"}, "21/52HP001"
+            )
+        self.assertEqual(len(queries), 1)
+        self.assertSelectsIndexed(queries)
+
+    def test_export(self):
+        day = timezone.localdate().isoformat()
+        for query in ("", f"?session={self.session.id}", "?course_code=CSC101", f"?from={day}&to={day}"):
+            self.assertIndexedGet(f"/api/attendance/export/{query}", self.lecturer_token)
+
+    def test_live_snapshot(self):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {self.lecturer_token}")
+        with CaptureQueriesContext(connection) as queries:
+            counts, error = _authorize(request, self.session.id)
+        self.assertIsNone(error)
+        self.assertEqual(counts["present"], self.STUDENTS)
+        self.assertSelectsIndexed(queries)
+
+    def test_session_sweep(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(
+                Session.objects.filter(active=True, ends_at__lte=timezone.now())
+                .order_by("ends_at", "id")
+                .values_list("id", flat=True)[:200]
+            )
+        self.assertSelectsIndexed(queries)
+
+    def test_replay_guard_purge(self):
+        cutoff = timezone.now() - timedelta(minutes=5)
+        with CaptureQueriesContext(connection) as queries:
+            list(AttendanceReplayGuard.objects.filter(used_at__lt=cutoff).values_list("id")[:5000])
+        self.assertSelectsIndexed(queries)
+
+
+def make_user(username, role, matric_number=None):
+    user = User.objects.create(username=username)
+    profile = UserProfile.objects.create(user=user, role=role, matric_number=matric_number)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+    return profile, client
+
+
+def make_session(owner, **fields):
+    fields.setdefault("course_code", "CSC101")
+    fields.setdefault("starts_at", timezone.now())
+    return Session.objects.create(lecturer_name="Dr. Ada", created_by=owner, **fields)
+
+
+def proof_payload(session_id, challenge="c1", nonce="n1", **fields):
+    issued = int(time.time())
+    return {
+        "session": session_id,
+        "device_id": "device-1",
+        "acoustic_token": f"ac|{session_id}|v1|{issued}|{challenge}",
+        "ble_nonce": f"ble|{session_id}|{issued}|{nonce}",
+        "rssi": -60,
+        "observed_at": timezone.now().isoformat(),
+        "signature": "sig",
+        **fields,
+    }
+
+
+
+class TokenAuthCacheTests(TestCase):
+    def setUp(self):
+        authentication._identity_cache = None
+        self.addCleanup(setattr, authentication, "_identity_cache", None)
+        self.profile, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        self.key = Token.objects.get(user=self.profile.user).key
+        self.auth = CachedTokenAuthentication()
+
+    def test_hit_needs_no_query(self):
+        with self.assertNumQueries(1):
+            user, _ = self.auth.authenticate_credentials(self.key)
+        with self.assertNumQueries(0):
+            cached, _ = self.auth.authenticate_credentials(self.key)
+        self.assertEqual((cached.pk, cached.profile.pk), (user.pk, self.profile.pk))
+        self.assertEqual(cached.profile.role, UserProfile.ROLE_LECTURER)
+
+    def test_entry_expires_after_ttl(self):
+        clock = mock.Mock(return_value=0)
+        cache = TokenIdentityCache(max_entries=10, ttl_seconds=5, clock=clock)
+        authentication._identity_cache = cache
+        self.auth.authenticate_credentials(self.key)
+        clock.return_value = 4.9
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.key)
+        clock.return_value = 5
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.key)
+
+    def test_deleted_token_is_evicted(self):
+        self.auth.authenticate_credentials(self.key)
+        Token.objects.get(key=self.key).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.key)
+
+    def test_deactivated_user_is_evicted(self):
+        self.auth.authenticate_credentials(self.key)
+        user = self.profile.user
+        user.is_active = False
+        user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.key)
+
+    def test_lru_keeps_recently_used_entries(self):
+        cache = TokenIdentityCache(max_entries=2, ttl_seconds=60)
+        identity = CachedIdentity.from_user(self.profile.user)
+        cache.set("a", identity)
+        cache.set("b", identity)
+        cache.get("a")
+        cache.set("c", identity)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), identity)
+        cache.delete_user(self.profile.user.pk)
+        self.assertEqual(len(cache), 0)
+
+
+
+class AcousticCodecTests(TestCase):
+    CHALLENGE = bytes.fromhex("0a1b2c3d4e")
+
+    def test_compact_round_trip(self):
+        token = encode_acoustic(4242, "v1", 1_800_000_000, self.CHALLENGE, compact=True)
+        self.assertEqual(len(token), COMPACT_LENGTH)
+        tag = f"#{version_tag('v1'):02x}"
+        expected = AcousticToken(4242, tag, 1_800_000_000, "0a1b2c3d4e", compact=True)
+        self.assertEqual(decode_acoustic(token), expected)
+        self.assertEqual(decode_acoustic(token.lower()), expected)
+        self.assertTrue(expected.matches_version("v1"))
+        self.assertFalse(expected.matches_version("v2"))
+
+    def test_legacy_round_trip(self):
+        token = encode_acoustic(7, "v1", 1_800_000_000, "ac_01")
+        self.assertEqual(token, "ac|7|v1|1800000000|ac_01")
+        self.assertEqual(decode_acoustic(token), AcousticToken(7, "v1", 1_800_000_000, "ac_01"))
+        self.assertIsNone(decode_acoustic("ac|7|v1|18000|ac_01"))
+        self.assertEqual(decode_ble("ble|7|1800000000|n_1"), BleNonce(7, 1_800_000_000, "n_1"))
+        self.assertIsNone(decode_ble("ble|7|1800000000|"))
+
+    def test_corrupted_compact_tokens_are_rejected(self):
+        token = encode_acoustic(4242, "v1", 1_800_000_000, self.CHALLENGE, compact=True)
+        for position in range(COMPACT_LENGTH - 1):
+            replacement = "B" if token[position] == "A" else "A"
+            corrupted = token[:position] + replacement + token[position + 1 :]
+            self.assertIsNone(decode_acoustic(corrupted), corrupted)
+        # The last character also carries the two always-zero padding bits.
+        padded = token[:-1] + ("B" if token[-1] == "A" else "A")
+        self.assertIsNone(decode_acoustic(padded))
+        self.assertIsNone(decode_acoustic(token[:-1]))
+        self.assertIsNone(decode_acoustic(token + "A"))
+        self.assertIsNone(decode_acoustic(token[:-1] + "1"))
+        with self.assertRaises(ValueError):
+            encode_acoustic(4242, "v1", 1_800_000_000, b"four", compact=True)
+
+    def test_serializer_accepts_both_forms(self):
+        lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        legacy_session = make_session(lecturer, token_version="v1")
+        compact_session = make_session(lecturer, course_code="CSC102", token_version="v1")
+        legacy = proof_payload(legacy_session.id, student_id="21/52HP001")
+        self.assertTrue(legacy["acoustic_token"].startswith("ac|"))
+        compact = proof_payload(compact_session.id, student_id="21/52HP001")
+        issued = int(compact["ble_nonce"].split("|")[2])
+        compact["acoustic_token"] = encode_acoustic(
+            compact_session.id, "v1", issued, self.CHALLENGE, compact=True
+        )
+        for payload in (legacy, compact):
+            response = student.post("/api/attendance/", payload, format="json")
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.json()["acoustic_token"], payload["acoustic_token"])
+
+
+class ArchiveTests(TestCase):
+    def test_round_trip_keeps_client_proof_id(self):
+        lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        session = make_session(lecturer, active=False, starts_at=timezone.now() - timedelta(days=400))
+        client_proof_id = uuid.uuid4()
+        proof = AttendanceProof.objects.create(
+            session=session,
+            student_id="21/52HP001",
+            device_id="device-1",
+            acoustic_token="a",
+            ble_nonce="b",
+            rssi=-60,
+            observed_at=session.starts_at,
+            signature="sig",
+            validation_status=STATUS_PASS,
+            client_proof_id=client_proof_id,
+        )
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            ATTENDANCE_ARCHIVE={"ROOT": root}
+        ):
+            [archive] = archive_sessions([session])
+            self.assertFalse(AttendanceProof.objects.exists())
+            [restored] = read_archive(ProofArchive.objects.get(pk=archive.pk))
+        self.assertEqual(restored.pk, proof.pk)
+        self.assertEqual(restored.client_proof_id, client_proof_id)
+        self.assertEqual(restored.observed_at, proof.observed_at)
+
+    def test_rebuild_keeps_archived_counts(self):
+        lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        session = make_session(lecturer, active=False, starts_at=timezone.now() - timedelta(days=400))
+        for index in range(3):
+            AttendanceProof.objects.create(
+                session=session,
+                student_id=f"21/52HP00{index}",
+                device_id=f"device-{index}",
+                acoustic_token=f"a{index}",
+                ble_nonce=f"b{index}",
+                rssi=-60,
+                observed_at=session.starts_at,
+                signature="sig",
+                validation_status=STATUS_FAIL if index == 0 else STATUS_PASS,
+            )
+        rebuild_summaries()
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            ATTENDANCE_ARCHIVE={"ROOT": root}
+        ):
+            archive_sessions([session])
+        self.assertEqual(rebuild_summaries(), 0)
+        summary = SessionAttendanceSummary.objects.get(session=session)
+        self.assertEqual(
+            (summary.present_count, summary.passed_count, summary.failed_count), (3, 2, 1)
+        )
+
+    def test_failed_write_leaves_no_files(self):
+        lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        session = make_session(lecturer, active=False, starts_at=timezone.now() - timedelta(days=400))
+        AttendanceProof.objects.create(
+            session=session,
+            student_id="21/52HP001",
+            device_id="device-1",
+            acoustic_token="a",
+            ble_nonce="b",
+            rssi=-60,
+            observed_at=session.starts_at,
+            signature="sig",
+            validation_status=STATUS_PASS,
+        )
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            ATTENDANCE_ARCHIVE={"ROOT": root}
+        ):
+            with mock.patch("attendance.archive.json.dumps", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    archive_sessions([session])
+            self.assertEqual([path for path in Path(root).rglob("*") if path.is_file()], [])
+        self.assertEqual(AttendanceProof.objects.count(), 1)
+
+
+class IdempotentSubmitTests(TestCase):
+    def setUp(self):
+        self.lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        _, self.other = make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        self.session = make_session(self.lecturer)
+        self.payload = proof_payload(
+            self.session.id, student_id="21/52HP001", client_proof_id=str(uuid.uuid4())
+        )
+
+    def test_retry_returns_original_without_validation(self):
+        first = self.student.post("/api/attendance/", self.payload, format="json")
+        self.assertEqual(first.status_code, 201, first.content)
+        # The tokens are spent now; only the retry lookup can accept this.
+        with self.assertNumQueries(1):
+            retry = self.student.post("/api/attendance/", self.payload, format="json")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(AttendanceProof.objects.count(), 1)
+
+    def test_changed_payload_is_rejected(self):
+        self.assertEqual(
+            self.student.post("/api/attendance/", self.payload, format="json").status_code, 201
+        )
+        observed_at = timezone.now() - timedelta(seconds=5)
+        for change in (
+            {"rssi": -61},
+            {"observed_at": observed_at.isoformat()},
+            {"device_id": "device-2"},
+            {"signature": "other"},
+        ):
+            response = self.student.post(
+                "/api/attendance/", {**self.payload, **change}, format="json"
+            )
+            self.assertEqual(response.status_code, 400, change)
+            self.assertEqual(
+                response.json(),
+                {"client_proof_id": [AttendanceProofSerializer.CLIENT_ID_REUSED_MESSAGE]},
+            )
+
+    def test_other_students_id_is_rejected(self):
+        self.assertEqual(
+            self.student.post("/api/attendance/", self.payload, format="json").status_code, 201
+        )
+        response = self.other.post(
+            "/api/attendance/",
+            {**self.payload, "student_id": "21/52HP002", "acoustic_token": "x", "ble_nonce": "y"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("client_proof_id", response.json())
+
+    def test_concurrent_duplicate_resolves_to_winner(self):
+        # Both attempts pass validation before either inserts.
+        attempts = [AttendanceProofSerializer(data=self.payload) for _ in range(2)]
+        for attempt in attempts:
+            self.assertTrue(attempt.is_valid(), attempt.errors)
+        winner = attempts[0].save(student_id="21/52HP001")
+        loser = attempts[1].save(student_id="21/52HP001")
+        self.assertEqual(loser.pk, winner.pk)
+        self.assertEqual(AttendanceProof.objects.count(), 1)
+
+    def test_batch_retry(self):
+        items = [
+            self.payload,
+            proof_payload(
+                make_session(self.lecturer).id, "c2", "n2", client_proof_id=str(uuid.uuid4())
+            ),
+        ]
+        first = self.student.post("/api/attendance/batch/", {"proofs": items}, format="json")
+        self.assertEqual(first.json()["accepted"], 2, first.content)
+        retry = self.student.post(
+            "/api/attendance/batch/",
+            {"proofs": [items[0], {**items[1], "rssi": -70}]},
+            format="json",
+        )
+        results = retry.json()["results"]
+        self.assertEqual(results[0]["proof"], first.json()["results"][0]["proof"])
+        self.assertEqual(
+            results[1]["errors"],
+            {"client_proof_id": [AttendanceProofSerializer.CLIENT_ID_REUSED_MESSAGE]},
+        )
+
+
+
+class ProofErrorShapeTests(TestCase):
+    """Rejections found at insert time look like validation errors: lists of messages."""
+
+    REPLAY = {"ble_nonce": [AttendanceProofSerializer.REPLAY_MESSAGE]}
+    DUPLICATE = {"student_id": [AttendanceProofSerializer.DUPLICATE_MESSAGE]}
+
+    def setUp(self):
+        self.lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        _, self.other = make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        self.session = make_session(self.lecturer)
+        self.payload = proof_payload(self.session.id, student_id="21/52HP001")
+        response = self.student.post("/api/attendance/", self.payload, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_single_upload(self):
+        replay = self.other.post(
+            "/api/attendance/", {**self.payload, "student_id": "21/52HP002"}, format="json"
+        )
+        self.assertEqual((replay.status_code, replay.json()), (400, self.REPLAY))
+        duplicate = self.student.post(
+            "/api/attendance/",
+            proof_payload(self.session.id, "c2", "n2", student_id="21/52HP001"),
+            format="json",
+        )
+        self.assertEqual((duplicate.status_code, duplicate.json()), (400, self.DUPLICATE))
+
+    def test_batch_upload_after_losing_a_race(self):
+        # Skip the pre-insert check, as if the winning uploads committed
+        # just after it ran; the batch then falls back to one insert per item.
+        with mock.patch.object(AttendanceProofBatchSerializer, "_check_conflicts"):
+            response = self.student.post(
+                "/api/attendance/batch/",
+                {"proofs": [self.payload, proof_payload(self.session.id, "c2", "n2")]},
+                format="json",
+            )
+        results = response.json()["results"]
+        self.assertEqual([result["errors"] for result in results], [self.REPLAY, self.DUPLICATE])
+
+
+
+class AnomalyScanTests(TestCase):
+    def setUp(self):
+        anomalies._engine = None
+        self.lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        self.session = make_session(self.lecturer)
+        self.students = [
+            make_user(f"21/52HP00{n}", UserProfile.ROLE_STUDENT, f"21/52HP00{n}")
+            for n in range(1, 4)
+        ]
+
+    def submit(self, n):
+        profile, client = self.students[n]
+        response = client.post(
+            "/api/attendance/",
+            proof_payload(self.session.id, f"c{n}", f"n{n}", student_id=profile.matric_number),
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def scan(self):
+        assign_sequence()
+        return anomalies.scan_new_proofs()
+
+    def test_upload_defers_checks_to_the_sweeper(self):
+        self.submit(0)
+        self.students[1][1].get("/api/sessions/")  # caches the token
+        with self.assertNumQueries(7), self.captureOnCommitCallbacks(execute=True):
+            self.submit(1)
+        self.assertFalse(AttendanceAnomaly.objects.exists())
+        self.assertEqual(self.scan(), 1)
+        self.assertEqual(
+            list(AttendanceAnomaly.objects.values_list("kind", "student_id")),
+            [(AttendanceAnomaly.KIND_SHARED_DEVICE, "21/52HP002")],
+        )
+        self.assertEqual(self.scan(), 0)
+
+    def test_state_rebuilt_after_another_sweeper_scanned(self):
+        self.submit(0)
+        self.scan()
+        with mock.patch.object(anomalies, "_engine", anomalies.AnomalyEngine()):
+            self.submit(1)
+            self.scan()
+        self.submit(2)
+        self.scan()
+        anomaly = AttendanceAnomaly.objects.get(student_id="21/52HP003")
+        self.assertEqual(anomaly.detail, {"other_students": ["21/52HP001", "21/52HP002"]})
+
+
+
+
+class ValidationReportTests(TestCase):
+    ALL_CHECKS = sum(CHECK_BITS.values())
+
+    def setUp(self):
+        self.lecturer, self.client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        self.session = make_session(self.lecturer)
+        # One proof failing each check, one failing two, and two passing.
+        failures = [
+            *CHECK_BITS.values(),
+            CHECK_BITS["acoustic_format"] | CHECK_BITS["ble_format"],
+            0,
+            0,
+        ]
+        self.proofs = [
+            AttendanceProof.objects.create(
+                session=self.session,
+                student_id=f"21/52HP{index:03d}",
+                device_id=f"device-{index}",
+                acoustic_token=f"a{index}",
+                ble_nonce=f"b{index}",
+                rssi=-60,
+                observed_at=self.session.starts_at,
+                signature="sig",
+                validation_status=STATUS_FAIL if failed else STATUS_PASS,
+                validation_checks=self.ALL_CHECKS,
+                validation_failures=failed,
+            )
+            for index, failed in enumerate(failures)
+        ]
+        other, _ = make_user("other", UserProfile.ROLE_LECTURER)
+        AttendanceProof.objects.create(
+            session=make_session(other),
+            student_id="21/52HP001",
+            device_id="device-x",
+            acoustic_token="ax",
+            ble_nonce="bx",
+            rssi=-60,
+            observed_at=self.session.starts_at,
+            signature="sig",
+            validation_status=STATUS_FAIL,
+            validation_checks=self.ALL_CHECKS,
+            validation_failures=self.ALL_CHECKS,
+        )
+
+    def report(self, query):
+        response = self.client.get(f"/api/attendance/report/?session={self.session.id}&{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, query):
+        return sorted(item["proof_id"] for item in self.report(query)["results"])
+
+    def test_filter_on_each_check(self):
+        both = self.proofs[len(CHECK_BITS)].id
+        for index, check in enumerate(CHECK_BITS):
+            expected = [self.proofs[index].id]
+            if check in ("acoustic_format", "ble_format"):
+                expected.append(both)
+            self.assertEqual(self.ids(f"check={check}"), expected, check)
+        self.assertEqual(self.ids("status=fail"), [proof.id for proof in self.proofs[:-2]])
+        self.assertEqual(self.ids("status=pass"), [proof.id for proof in self.proofs[-2:]])
+        self.assertEqual(self.ids("status=pass&check=ble_format"), [])
+
+    def test_item_lists_checks(self):
+        [item] = self.report("check=ble_session")["results"]
+        self.assertEqual(item["status"], STATUS_FAIL)
+        self.assertEqual(item["failed_checks"], ["BLE session mismatch"])
+        self.assertEqual(len(item["passed_checks"]), len(CHECK_BITS) - 1)
+
+    def test_invalid_filters_are_refused(self):
+        for query in ("check=rssi", "status=maybe"):
+            response = self.client.get(f"/api/attendance/report/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_cursor_walks_every_page(self):
+        page = self.report("page_size=3")
+        seen = []
+        pages = 0
+        while True:
+            pages += 1
+            seen.extend(item["proof_id"] for item in page["results"])
+            if not page["next"]:
+                break
+            page = self.client.get(page["next"]).json()
+        self.assertEqual(pages, 3)
+        # Newest first, each proof once.
+        self.assertEqual(seen, [proof.id for proof in reversed(self.proofs)])
+
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.lecturer, self.client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        self.session = make_session(self.lecturer)
+        for index in range(5):
+            self.add_proof(index)
+        # Every row arrived in the same instant; only id tells them apart.
+        AttendanceProof.objects.update(created_at=self.session.starts_at)
+        self.ids = list(AttendanceProof.objects.order_by("-id").values_list("id", flat=True))
+
+    def add_proof(self, index):
+        return AttendanceProof.objects.create(
+            session=self.session,
+            student_id=f"21/52HP{index:03d}",
+            device_id=f"device-{index}",
+            acoustic_token=f"a{index}",
+            ble_nonce=f"b{index}",
+            rssi=-60,
+            observed_at=self.session.starts_at,
+            signature="sig",
+            validation_status=STATUS_PASS,
+        )
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return [item["id"] for item in body["results"]], body["next"], body["previous"]
+
+    def test_tied_rows_are_neither_skipped_nor_repeated(self):
+        first, next_url, previous = self.page("/api/attendance/?page_size=2")
+        self.assertEqual((first, previous), (self.ids[:2], None))
+        # A proof arriving mid-walk belongs before the first page.
+        self.add_proof(99)
+        second, next_url, back_to_first = self.page(next_url)
+        third, last, back_to_second = self.page(next_url)
+        self.assertEqual((second, third, last), (self.ids[2:4], self.ids[4:], None))
+
+        # previous walks back over the same pages, then on to the new proof.
+        self.assertEqual(self.page(back_to_second)[0], second)
+        first_again, _, newer = self.page(back_to_first)
+        self.assertEqual(first_again, first)
+        self.assertEqual(len(self.page(newer)[0]), 1)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get("/api/attendance/?cursor=cD1ub3QtYS1wb3NpdGlvbg==")
+        self.assertEqual(response.status_code, 404)
+
+    def test_links_keep_filters_and_page_size(self):
+        _, next_url, _ = self.page(f"/api/attendance/?session={self.session.id}&page_size=2")
+        self.assertIn(f"session={self.session.id}", next_url)
+        self.assertIn("page_size=2", next_url)
+        self.assertIn("cursor=", next_url)
+
+
+class SessionSummaryTests(TestCase):
+    def setUp(self):
+        self.lecturer, self.lecturer_client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.first = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        _, self.second = make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        self.sessions = [
+            make_session(self.lecturer, starts_at=timezone.now() - timedelta(minutes=minutes))
+            for minutes in (20, 10)
+        ]
+
+    def summaries(self):
+        response = self.lecturer_client.get("/api/sessions/summaries/")
+        self.assertEqual(response.status_code, 200, response.content)
+        rows = response.json()
+        return {
+            row["id"]: (row["present"], row["passed"], row["failed"], row["last_arrival_at"])
+            for row in rows
+        }
+
+    def test_uploads_update_counts_and_rebuild_agrees(self):
+        first, second = (session.id for session in self.sessions)
+        self.assertEqual(
+            self.summaries(), {first: (0, 0, 0, None), second: (0, 0, 0, None)}
+        )
+        single = self.first.post(
+            "/api/attendance/", proof_payload(first, student_id="21/52HP001"), format="json"
+        )
+        self.assertEqual(single.status_code, 201, single.content)
+        # Observed before the tokens were issued: accepted, but it fails
+        # the freshness checks.
+        early = (timezone.now() - timedelta(seconds=5)).isoformat()
+        batch = self.second.post(
+            "/api/attendance/batch/",
+            {
+                "proofs": [
+                    proof_payload(first, "c2", "n2"),
+                    proof_payload(second, "c3", "n3", observed_at=early),
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(batch.json()["accepted"], 2, batch.content)
+        self.assertEqual(
+            AttendanceProof.objects.get(session_id=second).validation_status, STATUS_FAIL
+        )
+
+        incremental = self.summaries()
+        self.assertEqual(
+            {session_id: counts[:3] for session_id, counts in incremental.items()},
+            {first: (2, 2, 0), second: (1, 0, 1)},
+        )
+        latest = AttendanceProof.objects.filter(session_id=first).latest("created_at")
+        self.assertEqual(
+            incremental[first][3], serializers.DateTimeField().to_representation(latest.created_at)
+        )
+        self.assertEqual(rebuild_summaries(), 2)
+        self.assertEqual(self.summaries(), incremental)
+
+    def test_students_are_refused(self):
+        self.assertEqual(self.first.get("/api/sessions/summaries/").status_code, 403)
+
+
+class SessionListETagTests(TestCase):
+    def setUp(self):
+        self.lecturer, self.lecturer_client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        self.session = make_session(self.lecturer, ends_at=timezone.now() + timedelta(hours=1))
+
+    def poll(self, client, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return client.get("/api/sessions/", **headers)
+
+    def test_unchanged_poll_skips_sessions(self):
+        etag = self.poll(self.student)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.poll(self.student, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertIn(f'FROM "{SessionListMarker._meta.db_table}"', queries[0]["sql"])
+
+    def test_sweeper_close_changes_every_etag(self):
+        etags = [self.poll(client)["ETag"] for client in (self.student, self.lecturer_client)]
+        Session.objects.filter(pk=self.session.pk).update(
+            ends_at=timezone.now() - timedelta(minutes=1)
+        )
+        # The sweeper runs in another process; only the database is shared.
+        close_expired_sessions()
+        for client, etag in zip((self.student, self.lecturer_client), etags):
+            response = self.poll(client, etag)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.poll(self.student).json()["results"], [])
+
+    def test_other_lecturer_keeps_etag(self):
+        _, other = make_user("lecturer2", UserProfile.ROLE_LECTURER)
+        etag = self.poll(other)["ETag"]
+        make_session(self.lecturer)
+        self.assertEqual(self.poll(other, etag).status_code, 304)
+
+    @override_settings(ATTENDANCE_SESSION_LIST={"MARKER_TTL_SECONDS": 60})
+    def test_etag_expires(self):
+        now = time.time()
+        with mock.patch("attendance.conditional.time.time", return_value=now):
+            etag = self.poll(self.student)["ETag"]
+        with mock.patch("attendance.conditional.time.time", return_value=now + 60):
+            self.assertEqual(self.poll(self.student, etag).status_code, 200)
+
+
+
+class AttendanceHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer, self.lecturer_client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.first = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        _, self.second = make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        self.sessions = [make_session(self.lecturer) for _ in range(2)]
+        # Not started yet, so not counted.
+        make_session(self.lecturer, starts_at=timezone.now() + timedelta(days=1))
+        other_course = make_session(self.lecturer, course_code="CSC102")
+        AttendanceProof.objects.create(
+            session=other_course,
+            student_id="21/52HP001",
+            device_id="device-1",
+            acoustic_token="a",
+            ble_nonce="b",
+            rssi=-60,
+            observed_at=other_course.starts_at,
+            signature="sig",
+            validation_status=STATUS_FAIL,
+        )
+        self.submit(self.first, "21/52HP001", self.sessions[0])
+        self.submit(self.second, "21/52HP002", self.sessions[0], "c2", "n2")
+
+    def submit(self, client, student_id, session, challenge="c1", nonce="n1"):
+        payload = proof_payload(session.id, challenge, nonce, student_id=student_id)
+        # History is invalidated once the proof commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post("/api/attendance/", payload, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def courses(self):
+        return self.first.get("/api/attendance/history/").json()["courses"]
+
+    def course(self):
+        response = self.lecturer_client.get("/api/attendance/history/?course_code=CSC101")
+        return response.json()
+
+    def test_per_course_totals(self):
+        self.assertEqual(
+            self.courses(),
+            [
+                {
+                    "course_code": "CSC101",
+                    "sessions": 2,
+                    "present": 1,
+                    "attended": 1,
+                    "percentage": 50.0,
+                },
+                {
+                    "course_code": "CSC102",
+                    "sessions": 1,
+                    "present": 1,
+                    "attended": 0,
+                    "percentage": 0.0,
+                },
+            ],
+        )
+        self.assertEqual(
+            self.course(),
+            {
+                "course_code": "CSC101",
+                "sessions": 2,
+                "students": [
+                    {"student_id": "21/52HP001", "present": 1, "attended": 1, "percentage": 50.0},
+                    {"student_id": "21/52HP002", "present": 1, "attended": 1, "percentage": 50.0},
+                ],
+            },
+        )
+        # Cached: the second read only touches the cache.
+        with self.assertNumQueries(0):
+            history.student_history("21/52HP001")
+
+    def test_new_proof_invalidates(self):
+        self.courses()
+        self.course()
+        self.submit(self.first, "21/52HP001", self.sessions[1], "c3", "n3")
+        self.assertEqual(self.courses()[0]["present"], 2)
+        self.assertEqual(self.courses()[0]["percentage"], 100.0)
+        self.assertEqual(self.course()["students"][0]["attended"], 2)
+
+    def test_new_session_invalidates(self):
+        self.courses()
+        self.course()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_session(self.lecturer)
+        self.assertEqual(self.courses()[0]["sessions"], 3)
+        self.assertEqual(self.course()["sessions"], 3)
+
+    def test_sweeper_close_invalidates(self):
+        # The sweeper closes sessions with update(), which sends no signals.
+        before = history._version("sessions")
+        Session.objects.filter(pk=self.sessions[0].pk).update(
+            ends_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(close_expired_sessions(), [self.sessions[0].pk])
+        self.assertNotEqual(history._version("sessions"), before)
+
+
+
+@skipIf(rssi.np is None, "numpy is not installed")
+class RssiAnalyticsTests(TestCase):
+    # Five evenly spaced readings, and 32 readings with one outlier (-120),
+    # one failed proof (-100) and 30 usable ones.
+    FIRST = [-80, -70, -60, -50, -40]
+    SECOND = [-120, -100] + [-70] * 10 + [-60] * 10 + [-50] * 10
+
+    def samples(self):
+        np = rssi.np
+        values = self.FIRST + self.SECOND
+        return rssi.RssiSamples(
+            proof_ids=np.arange(len(values)),
+            session_ids=np.array([1] * len(self.FIRST) + [2] * len(self.SECOND)),
+            rssi=np.array(values, dtype=np.float64),
+            passed=np.array([value != -100 for value in values]),
+            rooms=["Hall A", "Hall B"],
+        )
+
+    @staticmethod
+    def histogram(*pairs):
+        bins = [0] * ((rssi.HISTOGRAM_MAX - rssi.HISTOGRAM_MIN) // rssi.HISTOGRAM_STEP)
+        for index, count in pairs:
+            bins[index] = count
+        return bins
+
+    def test_statistics_per_session(self):
+        first, second = rssi.analyze(self.samples())["groups"]
+        self.assertEqual(
+            first,
+            {
+                "session": 1,
+                "count": 5,
+                "passed": 5,
+                "mean": -60.0,
+                "std": 14.1,  # sqrt(200)
+                "percentiles": {
+                    "p5": -78.0,
+                    "p10": -76.0,
+                    "p25": -70.0,
+                    "p50": -60.0,
+                    "p75": -50.0,
+                    "p90": -44.0,
+                    "p95": -42.0,
+                },
+                # Bin i covers [-120 + 5i, -115 + 5i).
+                "histogram": self.histogram((8, 1), (10, 1), (12, 1), (14, 1), (16, 1)),
+                "outliers": 0,
+                # Fewer than THRESHOLD_MIN_SAMPLES usable readings.
+                "suggested_min_rssi": None,
+            },
+        )
+        self.assertEqual(
+            second,
+            {
+                "session": 2,
+                "count": 32,
+                "passed": 31,
+                "mean": -63.1,  # -2020 / 32
+                "std": 14.7,  # sqrt(134400 / 32 - 63.125 ** 2)
+                "percentiles": {
+                    "p5": -83.5,
+                    "p10": -70.0,
+                    "p25": -70.0,
+                    "p50": -60.0,
+                    "p75": -50.0,
+                    "p90": -50.0,
+                    "p95": -50.0,
+                },
+                "histogram": self.histogram((0, 1), (4, 1), (10, 10), (12, 10), (14, 10)),
+                # Median -60, MAD 10: -120 scores 0.6745 * 60 / 10 = 4.05.
+                "outliers": 1,
+                # p10 of the 30 passed non-outliers.
+                "suggested_min_rssi": -70,
+            },
+        )
+
+    def test_api_groups_by_room(self):
+        lecturer, client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        sessions = [make_session(lecturer, room=room) for room in ("Hall A", "Hall A", "Hall B")]
+        AttendanceProof.objects.bulk_create(
+            AttendanceProof(
+                session=session,
+                student_id=f"21/52HP{index:03d}",
+                device_id=f"device-{index}",
+                acoustic_token=f"a{index}",
+                ble_nonce=f"b{index}",
+                rssi=value,
+                observed_at=session.starts_at,
+                signature="sig",
+                validation_status=STATUS_PASS,
+            )
+            for index, (session, value) in enumerate(
+                [(sessions[0], -80), (sessions[1], -40), (sessions[2], -60)]
+            )
+        )
+        RoomProximityThreshold.objects.create(room="Hall A", min_rssi=-75, percentile=10)
+        response = client.get("/api/attendance/rssi/?group_by=room")
+        self.assertEqual(response.status_code, 200, response.content)
+        groups = {
+            group["room"]: (group["count"], group["mean"], group["stored_min_rssi"])
+            for group in response.json()["groups"]
+        }
+        self.assertEqual(groups, {"Hall A": (2, -60.0, -75), "Hall B": (1, -60.0, None)})
+        bad = client.get("/api/attendance/rssi/?group_by=device")
+        self.assertEqual(bad.status_code, 400)
+
+
+
+class ExportCSVTests(TestCase):
+    def setUp(self):
+        self.lecturer, self.client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        now = timezone.now()
+        # The archived session starts between the two live ones.
+        self.sessions = [
+            make_session(
+                self.lecturer, active=False, room="Hall A", starts_at=now - timedelta(days=days)
+            )
+            for days in (500, 400, 0)
+        ]
+        self.proofs = [
+            self.proof(session, student_id)
+            for session in self.sessions
+            for student_id in ("21/52HP002", "21/52HP001")
+        ]
+        other, _ = make_user("other", UserProfile.ROLE_LECTURER)
+        self.proof(make_session(other), "21/52HP001")
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            ATTENDANCE_ARCHIVE={"ROOT": root}
+        ):
+            archive_sessions([self.sessions[1]])
+            self.assertFalse(AttendanceProof.objects.filter(session=self.sessions[1]).exists())
+            self.rows = self.export()
+            self.filtered = self.export(f"?session={self.sessions[1].id}")
+
+    def proof(self, session, student_id):
+        return AttendanceProof.objects.create(
+            session=session,
+            student_id=student_id,
+            device_id=f"device-{student_id}",
+            acoustic_token=f"a-{session.id}-{student_id}",
+            ble_nonce=f"b-{session.id}-{student_id}",
+            rssi=-61,
+            observed_at=session.starts_at,
+            signature="sig",
+            validation_status=STATUS_PASS,
+        )
+
+    def export(self, query=""):
+        response = self.client.get(f"/api/attendance/export/{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        body = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(body)))
+
+    def test_header(self):
+        self.assertEqual(
+            self.rows[0],
+            [
+                "proof_id",
+                "session_id",
+                "course_code",
+                "course_title",
+                "room",
+                "session_starts_at",
+                "student_id",
+                "device_id",
+                "rssi",
+                "observed_at",
+                "validation_status",
+                "created_at",
+            ],
+        )
+
+    def test_rows_merge_archived_and_live_in_order(self):
+        # Session start, then arrival within a session, whichever table
+        # or file the proof is in. Other lecturers' proofs are left out.
+        self.assertEqual(
+            [int(row[0]) for row in self.rows[1:]], [proof.id for proof in self.proofs]
+        )
+
+    def test_row_content(self):
+        # Rows read back from an archive file look just like live ones.
+        for row, proof in ((self.rows[1], self.proofs[0]), (self.rows[3], self.proofs[2])):
+            self.assertEqual(
+                row,
+                [
+                    str(proof.id),
+                    str(proof.session.id),
+                    "CSC101",
+                    "",
+                    "Hall A",
+                    proof.session.starts_at.isoformat(),
+                    "21/52HP002",
+                    "device-21/52HP002",
+                    "-61",
+                    proof.observed_at.isoformat(),
+                    STATUS_PASS,
+                    proof.created_at.isoformat(),
+                ],
+            )
+
+    def test_session_filter(self):
+        self.assertEqual(
+            [int(row[0]) for row in self.filtered[1:]], [proof.id for proof in self.proofs[2:4]]
+        )
+
+    def test_students_are_refused(self):
+        _, student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        self.assertEqual(student.get("/api/attendance/export/").status_code, 403)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.lecturer, self.lecturer_client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        self.session = make_session(self.lecturer, active=False)
+        self.proof = AttendanceProof.objects.create(
+            session=self.session,
+            student_id="21/52HP001",
+            device_id="device-1",
+            acoustic_token="a",
+            ble_nonce="b",
+            rssi=-60,
+            observed_at=self.session.starts_at,
+            signature="sig",
+            validation_status=STATUS_PASS,
+        )
+        self.cursors = {
+            client: self.sync(client)["cursor"] for client in (self.student, self.lecturer_client)
+        }
+
+    def sync(self, client, cursor=None):
+        assign_sequence()  # What the sweeper does between polls.
+        path = "/api/sync/" if cursor is None else f"/api/sync/?cursor={cursor}"
+        return client.get(path).json()
+
+    def assertDeleted(self, sessions, proofs):
+        for client, cursor in self.cursors.items():
+            self.assertEqual(
+                self.sync(client, cursor)["deleted"], {"sessions": sessions, "proofs": proofs}
+            )
+
+    def test_session_delete_tombstones_its_proofs(self):
+        session_id, proof_id = self.session.pk, self.proof.pk
+        self.session.delete()
+        self.assertDeleted([session_id], [proof_id])
+
+    def test_proof_delete_is_tombstoned(self):
+        proof_id = self.proof.pk
+        self.proof.delete()
+        self.assertDeleted([], [proof_id])
+
+    def test_archived_proofs_are_not_tombstoned(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            ATTENDANCE_ARCHIVE={"ROOT": root}
+        ):
+            archive_sessions([self.session])
+        self.assertFalse(AttendanceProof.objects.exists())
+        self.assertDeleted([], [])
+
+    def test_late_commit_lands_after_the_cursor(self):
+        # An entry whose id was handed out before the client's cursor but
+        # that committed after it.
+        cursor = self.cursors[self.student]
+        ChangeLogEntry.objects.create(
+            id=ChangeLogEntry.objects.order_by("id").first().id - 1,
+            kind=ChangeLogEntry.KIND_PROOF,
+            object_id=self.proof.pk,
+            lecturer_id=self.lecturer.pk,
+            student_id=self.proof.student_id,
+        )
+        response = self.sync(self.student, cursor)
+        self.assertEqual([row[0] for row in response["proofs"]["rows"]], [self.proof.pk])
+        self.assertGreater(int(response["cursor"]), int(cursor))
+
+    def test_polling_never_writes(self):
+        cursor, proof_id = self.cursors[self.student], self.proof.pk
+        self.proof.delete()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.student.get(f"/api/sync/?cursor={cursor}").json()
+        self.assertEqual(
+            [query["sql"].split()[0] for query in queries],
+            ["SELECT"] * len(queries),
+        )
+        # Not numbered yet: the sweeper has not run.
+        self.assertEqual((response["cursor"], response["deleted"]["proofs"]), (cursor, []))
+        self.assertTrue(ChangeLogEntry.objects.filter(seq__isnull=True).exists())
+        self.assertEqual(self.sync(self.student, cursor)["deleted"]["proofs"], [proof_id])
+
+
+class LiveBrokerTests(TestCase):
+    def test_publish_reaches_only_that_sessions_streams(self):
+        async def run():
+            broker = LiveAttendanceBroker()
+            subscription = broker.subscribe(1)
+            other = broker.subscribe(2)
+            # Proofs are published from request threads.
+            publisher = threading.Thread(target=broker.publish, args=(1, {"proof": 1}))
+            publisher.start()
+            publisher.join()
+            self.assertEqual(await asyncio.wait_for(subscription.queue.get(), 1), {"proof": 1})
+            self.assertTrue(other.queue.empty())
+            broker.unsubscribe(subscription)
+            self.assertFalse(broker.has_subscribers(1))
+            self.assertTrue(broker.has_subscribers(2))
+
+        asyncio.run(run())
+
+    def test_slow_stream_overflows(self):
+        async def run():
+            broker = LiveAttendanceBroker()
+            subscription = broker.subscribe(1)
+            for number in range(QUEUE_SIZE + 1):
+                broker.publish(1, {"proof": number})
+            await asyncio.sleep(0)
+            return subscription
+
+        subscription = asyncio.run(run())
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual(subscription.queue.qsize(), QUEUE_SIZE)
+
+    def test_stream_with_closed_loop_is_dropped(self):
+        broker = LiveAttendanceBroker()
+
+        async def subscribe():
+            broker.subscribe(1)
+
+        asyncio.run(subscribe())
+        broker.publish(1, {"proof": 1})
+        self.assertFalse(broker.has_subscribers(1))
+
+    def test_wsgi_gets_501(self):
+        lecturer, client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        session = make_session(lecturer)
+        self.assertEqual(client.get(f"/api/sessions/{session.id}/live/").status_code, 501)
+
+
+class MetricsTests(TestCase):
+    def test_rejection_reasons(self):
+        serializer = AttendanceProofSerializer
+        for errors, reason in (
+            ({"acoustic_token": [serializer.ACOUSTIC_EXPIRED_MESSAGE]}, "expired"),
+            ({"ble_nonce": [serializer.BLE_EXPIRED_MESSAGE]}, "expired"),
+            ({"acoustic_token": ["Token has expired."]}, "expired"),
+            ({"observed_at": [serializer.WINDOW_MESSAGE]}, "window"),
+            ({"observed_at": ["Datetime has wrong format."]}, "format"),
+            ({"observed_at": ["This field is required."]}, "invalid"),
+        ):
+            self.assertEqual(rejection_reason(errors), reason, errors)
+
+    def test_endpoint_requires_a_token(self):
+        with override_settings(ATTENDANCE_METRICS={"ENABLED": True, "TOKEN": ""}):
+            self.assertEqual(self.client.get("/api/metrics/").status_code, 404)
+        with override_settings(ATTENDANCE_METRICS={"ENABLED": True, "TOKEN": "secret"}):
+            self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+            response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(response.status_code, 200)
+
+
+class RosterImportTests(TestCase):
+    def test_registration_during_import_is_skipped(self):
+        rows = parse_roster_csv(
+            "matric_number,full_name,password\n21/52HP001,Ada,secret1\n21/52HP002,Ben,secret2\n"
+        )
+        # 21/52HP002 registers between the duplicate check and the insert.
+        make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        with mock.patch("attendance.roster._registered", side_effect=[set(), {"21/52HP002"}]):
+            results = import_roster(rows, workers=1)
+        self.assertEqual(
+            [(result["matric_number"], result["status"]) for result in results],
+            [("21/52HP001", "created"), ("21/52HP002", "skipped")],
+        )
+        self.assertTrue(
+            UserProfile.objects.filter(matric_number="21/52HP001", user__auth_token__isnull=False).exists()
+        )
+        self.assertEqual(User.objects.filter(username="21/52HP002").count(), 1)
+
+    @override_settings(ATTENDANCE_ROSTER={"MAX_REQUEST_ROWS": 2})
+    def test_api_refuses_files_over_the_row_limit(self):
+        _, lecturer = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        rows = "".join(f"21/52HP00{index},Student {index}\n" for index in range(3))
+        response = lecturer.post(
+            "/api/auth/roster/import/",
+            {"csv": "matric_number,full_name\n" + rows},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("import_roster", response.json()["csv"][0])
+        self.assertFalse(User.objects.filter(username__startswith="21/52HP").exists())
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_hash_pool_is_spawned(self):
+        passwords = [f"secret{index}" for index in range(PARALLEL_HASH_THRESHOLD)]
+        with mock.patch("attendance.roster.ProcessPoolExecutor") as executor:
+            pool = executor.return_value.__enter__.return_value
+            pool.map.return_value = iter(passwords)
+            hash_passwords(passwords, workers=2)
+        self.assertEqual(executor.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+        # One CPU, or too few rows to be worth a pool: hashed in process.
+        with mock.patch("attendance.roster.ProcessPoolExecutor") as executor:
+            hash_passwords(passwords[:2], workers=2)
+            hash_passwords(passwords[:2] * 8, workers=1)
+        executor.assert_not_called()
+
+
+class BatchUploadTests(TestCase):
+    def setUp(self):
+        self.lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        self.sessions = [make_session(self.lecturer) for _ in range(3)]
+
+    def post(self, proofs):
+        return self.student.post("/api/attendance/batch/", {"proofs": proofs}, format="json")
+
+    def test_results_follow_item_order(self):
+        first, second, third = (session.id for session in self.sessions)
+        response = self.post(
+            [
+                proof_payload(first),
+                proof_payload(second, "c2", "n2", acoustic_token="garbage"),
+                proof_payload(third, "c3", "n3"),
+                proof_payload(first, "c4", "n4"),  # second proof for the first session
+            ]
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body["accepted"], body["rejected"]), (2, 2))
+        self.assertEqual(
+            [(result["index"], result["status"]) for result in body["results"]],
+            [(0, "accepted"), (1, "rejected"), (2, "accepted"), (3, "rejected")],
+        )
+        self.assertIn("acoustic_token", body["results"][1]["errors"])
+        self.assertEqual(
+            body["results"][3]["errors"],
+            {"student_id": [AttendanceProofSerializer.DUPLICATE_MESSAGE]},
+        )
+        self.assertEqual(
+            sorted(AttendanceProof.objects.values_list("session_id", flat=True)), [first, third]
+        )
+        self.assertEqual(
+            [body["results"][index]["proof"]["session"] for index in (0, 2)], [first, third]
+        )
+
+    def test_rejected_items_leave_the_rest_standing(self):
+        accepted = self.post([proof_payload(self.sessions[0].id)])
+        self.assertEqual(accepted.json()["accepted"], 1)
+        response = self.post(
+            [
+                proof_payload(self.sessions[0].id),  # replayed tokens
+                proof_payload(self.sessions[1].id, "c2", "n2", student_id="21/52HP999"),
+                proof_payload(self.sessions[1].id, "c3", "n3"),
+            ]
+        ).json()
+        self.assertEqual(
+            [result["status"] for result in response["results"]],
+            ["rejected", "rejected", "accepted"],
+        )
+        self.assertEqual(
+            response["results"][0]["errors"],
+            {"ble_nonce": [AttendanceProofSerializer.REPLAY_MESSAGE]},
+        )
+        self.assertEqual(list(response["results"][1]["errors"]), ["student_id"])
+        self.assertEqual(AttendanceProof.objects.count(), 2)
+
+    def test_empty_and_oversized_batches_are_refused(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        too_many = [proof_payload(self.sessions[0].id, f"c{n}", f"n{n}") for n in range(501)]
+        self.assertEqual(self.post(too_many).status_code, 400)
+        self.assertFalse(AttendanceProof.objects.exists())
+
+
+class ReplayGuardTests(TestCase):
+    NOW = 1_800_000_000
+
+    def setUp(self):
+        self.lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        self.session = make_session(self.lecturer)
+        self.key = ReplayKey(self.session.id, "c1", "n1")
+        self.issued_at = datetime.fromtimestamp(self.NOW, tz=dt_timezone.utc)
+        self.clock = mock.Mock(return_value=self.NOW)
+
+    def guard(self, durable=False):
+        return BucketedReplayGuard(
+            ttl_seconds=70, bucket_seconds=10, durable=durable, clock=self.clock
+        )
+
+    def test_bucket_expires_whole(self):
+        guard = self.guard()
+        guard.claim(self.key, "21/52HP001", self.issued_at)
+        other = ReplayKey(self.session.id, "c2", "n2")
+        guard.claim(other, "21/52HP002", self.issued_at + timedelta(seconds=9))
+        with self.assertRaises(ReplayDetected):
+            guard.claim(self.key, "21/52HP003", self.issued_at)
+
+        # Still inside the TTL for the bucket's newest token.
+        self.clock.return_value = self.NOW + 79
+        self.assertEqual(guard.used([self.key, other]), {self.key, other})
+        # Every token in the bucket is past the TTL: the bucket goes at once.
+        self.clock.return_value = self.NOW + 80
+        self.assertEqual(guard.used([self.key, other]), set())
+        self.assertEqual(len(guard), 0)
+        guard.claim(self.key, "21/52HP003", self.issued_at)
+
+    def test_durable_claims_reach_other_processes(self):
+        first, second = self.guard(durable=True), self.guard(durable=True)
+        first.claim(self.key, "21/52HP001", self.issued_at)
+        self.assertTrue(
+            AttendanceReplayGuard.objects.filter(
+                session=self.session, challenge_token="c1", ble_nonce="n1"
+            ).exists()
+        )
+        # The second process has nothing in memory and asks the database.
+        self.assertEqual(second.used([self.key]), {self.key})
+        with self.assertRaises(ReplayDetected):
+            with transaction.atomic():
+                second.claim(self.key, "21/52HP002", self.issued_at)
+        self.assertEqual(len(second), 0)
+
+    def test_backend_setting(self):
+        with override_settings(ATTENDANCE_REPLAY_GUARD={"BACKEND": "memory"}):
+            guard = get_replay_guard()
+            self.assertIsInstance(guard, BucketedReplayGuard)
+            self.assertIsNone(guard.durable)
+        with override_settings(ATTENDANCE_REPLAY_GUARD={"BACKEND": "database"}):
+            self.assertNotIsInstance(get_replay_guard(), BucketedReplayGuard)
+
+    @override_settings(ATTENDANCE_REPLAY_GUARD={"BACKEND": "memory"})
+    def test_memory_backend_rejects_replays(self):
+        _, first = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        _, second = make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        payload = proof_payload(self.session.id)
+        response = first.post(
+            "/api/attendance/", {**payload, "student_id": "21/52HP001"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        replay = second.post(
+            "/api/attendance/", {**payload, "student_id": "21/52HP002"}, format="json"
+        )
+        self.assertEqual(
+            replay.json(), {"ble_nonce": [AttendanceProofSerializer.REPLAY_MESSAGE]}
+        )
+        self.assertFalse(AttendanceReplayGuard.objects.exists())
+
+    @override_settings(ATTENDANCE_REPLAY_GUARD={"BACKEND": "memory"})
+    def test_failed_insert_releases_the_claim(self):
+        _, student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        single = proof_payload(self.session.id, student_id="21/52HP001")
+        other = make_session(self.lecturer, course_code="CSC102")
+        batch = {"proofs": [proof_payload(other.id, "c2", "n2")]}
+        for path, payload in (("/api/attendance/", single), ("/api/attendance/batch/", batch)):
+            claimed = len(get_replay_guard())
+            # Any rollback, not only a constraint violation, stores nothing.
+            with mock.patch(
+                "attendance.serializers.record_accepted_proofs",
+                side_effect=OperationalError("database is locked"),
+            ):
+                with self.assertRaises(OperationalError):
+                    student.post(path, payload, format="json")
+            self.assertEqual(len(get_replay_guard()), claimed)
+            retry = student.post(path, payload, format="json")
+            self.assertIn(retry.status_code, (200, 201), retry.content)
+        self.assertEqual(AttendanceProof.objects.count(), 2)
+
+
+@skipIf(Ed25519PrivateKey is None, "cryptography is not installed")
+class DeviceSignatureTests(TestCase):
+    def setUp(self):
+        # The key cache is per process and outlives each test's rollback.
+        self.addCleanup(get_signature_verifier().cache.clear)
+        self.lecturer, _ = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        self.session = make_session(self.lecturer)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        self.key = self.register(Ed25519PrivateKey.generate())
+        self.tokens = 0
+
+    def register(self, private_key):
+        public_key = private_key.public_key().public_bytes_raw().hex()
+        response = self.student.post(
+            "/api/devices/", {"device_id": "device-1", "public_key": public_key}, format="json"
+        )
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return private_key
+
+    def signed(self, private_key, student_id="21/52HP001", **changes):
+        self.tokens += 1
+        payload = proof_payload(
+            self.session.id, f"c{self.tokens}", f"n{self.tokens}", student_id=student_id
+        )
+        message = canonical_payload(
+            self.session.id,
+            student_id,
+            payload["device_id"],
+            payload["acoustic_token"],
+            payload["ble_nonce"],
+            payload["rssi"],
+            payload["observed_at"],
+        )
+        return {**payload, "signature": private_key.sign(message).hex(), **changes}
+
+    def submit(self, payload, client=None):
+        return (client or self.student).post("/api/attendance/", payload, format="json")
+
+    def assertSignatureError(self, response, message):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"signature": [message]})
+
+    def test_valid_signature_is_accepted(self):
+        response = self.submit(self.signed(self.key))
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_wrong_key_or_tampered_payload_is_rejected(self):
+        self.assertSignatureError(
+            self.submit(self.signed(Ed25519PrivateKey.generate())), INVALID_SIGNATURE_MESSAGE
+        )
+        self.assertSignatureError(
+            self.submit(self.signed(self.key, rssi=-40)), INVALID_SIGNATURE_MESSAGE
+        )
+        self.assertSignatureError(
+            self.submit(self.signed(self.key, signature="not-a-signature")),
+            INVALID_SIGNATURE_MESSAGE,
+        )
+        self.assertFalse(AttendanceProof.objects.exists())
+
+    def test_device_of_another_student_is_rejected(self):
+        _, other = make_user("21/52HP002", UserProfile.ROLE_STUDENT, "21/52HP002")
+        response = self.submit(self.signed(self.key, student_id="21/52HP002"), client=other)
+        self.assertSignatureError(response, FOREIGN_DEVICE_MESSAGE)
+
+    @override_settings(ATTENDANCE_DEVICE_KEYS={"REQUIRED": True})
+    def test_required_rejects_unregistered_devices(self):
+        response = self.submit(self.signed(self.key, device_id="device-2"))
+        self.assertSignatureError(response, UNREGISTERED_MESSAGE)
+
+    def test_key_changes_evict_the_cache(self):
+        self.assertEqual(self.submit(self.signed(self.key)).status_code, 201)
+        AttendanceProof.objects.all().delete()
+        rotated = self.register(Ed25519PrivateKey.generate())
+        self.assertSignatureError(self.submit(self.signed(self.key)), INVALID_SIGNATURE_MESSAGE)
+        self.assertEqual(self.submit(self.signed(rotated)).status_code, 201)
+
+        AttendanceProof.objects.all().delete()
+        self.assertEqual(self.student.delete("/api/devices/device-1/").status_code, 204)
+        # Unregistered and not required: the signature is no longer checked.
+        response = self.submit(self.signed(rotated, signature="unsigned"))
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_cache_evicts_least_recently_used_and_expired(self):
+        clock = mock.Mock(return_value=0)
+        cache = DeviceKeyCache(max_entries=2, ttl_seconds=60, clock=clock)
+        cache.set("a", None)
+        cache.set("b", None)
+        cache.get("a")
+        cache.set("c", None)
+        self.assertIs(cache.get("b"), DeviceKeyCache.MISSING)
+        self.assertIsNone(cache.get("a"))
+        clock.return_value = 60
+        self.assertIs(cache.get("c"), DeviceKeyCache.MISSING)
+
+
+@override_settings(ATTENDANCE_SIGNED_TOKENS={"REQUIRED": True})
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        self.lecturer, self.lecturer_client = make_user("lecturer", UserProfile.ROLE_LECTURER)
+        _, self.student = make_user("21/52HP001", UserProfile.ROLE_STUDENT, "21/52HP001")
+        self.session = make_session(self.lecturer, token_version="v1")
+
+    def payload(self, tokens, **changes):
+        return {
+            **proof_payload(self.session.id, student_id="21/52HP001"),
+            "acoustic_token": tokens["acoustic_token"],
+            "ble_nonce": tokens["ble_nonce"],
+            **changes,
+        }
+
+    def assertRejectedWithoutQueries(self, payload, errors):
+        serializer = AttendanceProofSerializer(data=payload)
+        with self.assertNumQueries(0):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors, errors)
+
+    def test_issued_tokens_are_accepted(self):
+        response = self.lecturer_client.post(f"/api/sessions/{self.session.id}/tokens/")
+        self.assertEqual(response.status_code, 200, response.content)
+        submitted = self.student.post("/api/attendance/", self.payload(response.json()), format="json")
+        self.assertEqual(submitted.status_code, 201, submitted.content)
+
+    def test_forged_tokens_are_rejected_before_any_query(self):
+        tokens = get_token_signer().issue(self.session)
+        self.assertRejectedWithoutQueries(
+            self.payload(tokens, acoustic_token=tokens["acoustic_token"][:-1] + "x"),
+            {"acoustic_token": [FORGED_ACOUSTIC_MESSAGE]},
+        )
+        self.assertRejectedWithoutQueries(
+            self.payload(tokens, ble_nonce=tokens["ble_nonce"][:-1] + "x"),
+            {"ble_nonce": [FORGED_BLE_MESSAGE]},
+        )
+        # Well-formed, but signed with another server's key.
+        elsewhere = SessionTokenSigner("another-secret-key").issue(self.session)
+        self.assertRejectedWithoutQueries(
+            self.payload(elsewhere), {"acoustic_token": [FORGED_ACOUSTIC_MESSAGE]}
+        )
+
+    def test_stale_tokens_are_rejected_before_any_query(self):
+        signer = get_token_signer()
+        issued_earlier = SessionTokenSigner(
+            "unused", slot_seconds=signer.slot_seconds, clock=lambda: time.time() - 3600
+        )
+        # Same keys as the live signer, so only the age is wrong.
+        issued_earlier._master = signer._master
+        self.assertRejectedWithoutQueries(
+            self.payload(issued_earlier.issue(self.session)),
+            {"acoustic_token": [STALE_MESSAGE]},
+        )
+
+    def test_token_version_change_revokes_issued_tokens(self):
+        tokens = get_token_signer().issue(self.session)
+        self.session.token_version = "v2"
+        self.session.save(update_fields=["token_version"])
+        response = self.student.post("/api/attendance/", self.payload(tokens), format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"acoustic_token": [VERSION_MESSAGE]})
+        self.assertFalse(AttendanceProof.objects.exists())
@@ -0,0 +1,151 @@
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .codec import CHALLENGE_BYTES, decode_acoustic, decode_ble, encode_acoustic, version_tag
+from .validation import EXPIRY_SECONDS
+
+# Tokens may be issued slightly in the future to tolerate clock skew.
+SKEW_SECONDS = 10
+SALT_BYTES = 4
+MAC_HEX_CHARS = 16
+
+FORGED_ACOUSTIC_MESSAGE = "Acoustic token was not issued by this server."
+FORGED_BLE_MESSAGE = "BLE nonce was not issued by this server."
+STALE_MESSAGE = "Token has expired."
+SESSION_MISMATCH_MESSAGE = "Payload session_id does not match selected session."
+VERSION_MESSAGE = "Token was issued for another token_version; fetch a new one."
+
+
+def token_version(session):
+    # The acoustic format needs a non-empty version field.
+    return session.token_version or "0"
+
+
+class SessionTokenSigner:
+    """Issues and checks HMAC-authenticated acoustic/BLE token pairs.
+
+    Each session has its own key derived from SECRET_KEY, so nothing is
+    stored. The MAC covers token_version, and the serializer compares it
+    with the session's, so changing token_version revokes every token
+    issued for it. ``issued`` is the start of a SLOT_SECONDS slot, TOTP
+    style. The BLE nonce carries a random salt, which keeps every issued
+    pair distinct for the replay guard.
+    """
+
+    def __init__(self, secret_key, slot_seconds=10, required=False, clock=time.time):
+        self._master = hmac.new(
+            secret_key.encode(), b"attendance.tokens", hashlib.sha256
+        ).digest()
+        self.slot_seconds = slot_seconds
+        self.required = required
+        self._clock = clock
+
+    def issue(self, session):
+        version = token_version(session)
+        now = int(self._clock())
+        issued = now - now % self.slot_seconds
+        key = self._session_key(session.id)
+        acoustic = encode_acoustic(session.id, version, issued, secrets.token_hex(SALT_BYTES))
+        ble = f"ble|{session.id}|{issued}|{secrets.token_hex(SALT_BYTES)}"
+        return {
+            "session": session.id,
+            "token_version": version,
+            "acoustic_token": f"{acoustic}_{self._mac(key, acoustic)}",
+            "acoustic_compact": encode_acoustic(
+                session.id,
+                version,
+                issued,
+                self._compact_challenge(key, session.id, f"#{version_tag(version):02x}", issued),
+                compact=True,
+            ),
+            "ble_nonce": f"{ble}_{self._mac(key, ble)}",
+            "issued_at": datetime.fromtimestamp(issued, tz=dt_timezone.utc),
+            "expires_at": datetime.fromtimestamp(issued + EXPIRY_SECONDS, tz=dt_timezone.utc),
+        }
+
+    def verify(self, session_id, acoustic_token, ble_nonce):
+        """Return a field -> message dict, or None if both tokens are genuine.
+
+        Runs on the raw submitted values and never touches the database.
+        """
+        acoustic_raw = str(acoustic_token or "").strip()
+        acoustic = decode_acoustic(acoustic_raw)
+        if acoustic is None:
+            return {"acoustic_token": FORGED_ACOUSTIC_MESSAGE}
+        ble_raw = str(ble_nonce or "").strip()
+        ble = decode_ble(ble_raw)
+        if ble is None:
+            return {"ble_nonce": FORGED_BLE_MESSAGE}
+
+        if ble.session_id != acoustic.session_id or str(session_id).strip() != str(
+            acoustic.session_id
+        ):
+            return {"session": SESSION_MISMATCH_MESSAGE}
+        if ble.issued != acoustic.issued:
+            return {"ble_nonce": FORGED_BLE_MESSAGE}
+        age = self._clock() - acoustic.issued
+        if acoustic.issued % self.slot_seconds or not -SKEW_SECONDS <= age <= EXPIRY_SECONDS:
+            return {"acoustic_token": STALE_MESSAGE}
+
+        key = self._session_key(acoustic.session_id)
+        if acoustic.compact:
+            expected = self._compact_challenge(
+                key, acoustic.session_id, acoustic.version, acoustic.issued
+            ).hex()
+            genuine = hmac.compare_digest(expected, acoustic.challenge)
+        else:
+            genuine = self._signed(key, acoustic_raw)
+        if not genuine:
+            return {"acoustic_token": FORGED_ACOUSTIC_MESSAGE}
+        if not self._signed(key, ble_raw):
+            return {"ble_nonce": FORGED_BLE_MESSAGE}
+        return None
+
+    def _session_key(self, session_id):
+        return hmac.new(self._master, str(session_id).encode(), hashlib.sha256).digest()
+
+    @staticmethod
+    def _compact_challenge(key, session_id, tag, issued):
+        # Five bytes is all the compact form carries. One challenge per slot,
+        # so the BLE nonce's salt is what keeps replay keys distinct.
+        message = f"ac|{session_id}|{tag}|{issued}".encode()
+        return hmac.new(key, message, hashlib.sha256).digest()[:CHALLENGE_BYTES]
+
+    @staticmethod
+    def _mac(key, message):
+        return hmac.new(key, message.encode(), hashlib.sha256).hexdigest()[:MAC_HEX_CHARS]
+
+    def _signed(self, key, token):
+        body, _, mac = token.rpartition("_")
+        if not body:
+            return False
+        return hmac.compare_digest(self._mac(key, body), mac)
+
+
+_signer = None
+
+
+def get_token_signer():
+    global _signer
+    if _signer is None:
+        config = getattr(settings, "ATTENDANCE_SIGNED_TOKENS", {})
+        _signer = SessionTokenSigner(
+            settings.SECRET_KEY,
+            slot_seconds=config.get("SLOT_SECONDS", 10),
+            required=config.get("REQUIRED", False),
+        )
+    return _signer
+
+
+@receiver(setting_changed)
+def _reset_token_signer(setting, **kwargs):
+    global _signer
+    if setting in ("ATTENDANCE_SIGNED_TOKENS", "SECRET_KEY"):
+        _signer = None
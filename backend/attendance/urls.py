@@ -1,10 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from .live import live_attendance_stream
+from .metrics import metrics_view
 from .views import (
+    AttendanceAnomalyListAPIView,
+    AttendanceExportCSVAPIView,
+    AttendanceHistoryAPIView,
+    AttendanceProofBatchAPIView,
     AttendanceProofListCreateAPIView,
+    DeviceKeyDestroyAPIView,
+    DeviceKeyListCreateAPIView,
+    SessionSummaryListAPIView,
     SessionViewSet,
+    SyncAPIView,
     RegisterAPIView,
+    RosterImportAPIView,
+    RssiAnalyticsAPIView,
     LoginAPIView,
     AttendanceValidationReportAPIView,
 )
@@ -14,9 +26,22 @@ router = DefaultRouter()
 router.register("sessions", SessionViewSet, basename="session")
 
 urlpatterns = [
+    # Ahead of the router so "summaries" is not taken for a session id.
+    path("sessions/summaries/", SessionSummaryListAPIView.as_view(), name="session-summaries"),
     path("", include(router.urls)),
+    path("sessions/<int:session_id>/live/", live_attendance_stream, name="session-live"),
     path("attendance/", AttendanceProofListCreateAPIView.as_view(), name="attendance-list-create"),
+    path("attendance/batch/", AttendanceProofBatchAPIView.as_view(), name="attendance-batch-create"),
+    path("attendance/history/", AttendanceHistoryAPIView.as_view(), name="attendance-history"),
+    path("attendance/export/", AttendanceExportCSVAPIView.as_view(), name="attendance-export-csv"),
+    path("attendance/anomalies/", AttendanceAnomalyListAPIView.as_view(), name="attendance-anomalies"),
+    path("attendance/rssi/", RssiAnalyticsAPIView.as_view(), name="attendance-rssi-analytics"),
     path("attendance/report/", AttendanceValidationReportAPIView.as_view(), name="attendance-validation-report"),
+    path("sync/", SyncAPIView.as_view(), name="sync"),
+    path("devices/", DeviceKeyListCreateAPIView.as_view(), name="device-key-list-create"),
+    path("devices/<str:device_id>/", DeviceKeyDestroyAPIView.as_view(), name="device-key-destroy"),
     path("auth/register/", RegisterAPIView.as_view(), name="auth-register"),
+    path("auth/roster/import/", RosterImportAPIView.as_view(), name="auth-roster-import"),
     path("auth/login/", LoginAPIView.as_view(), name="auth-login"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone as dt_timezone
+from typing import NamedTuple, Optional
+
+from .codec import decode_acoustic, decode_ble
+
+EXPIRY_SECONDS = 60
+
+STATUS_PASS = "pass"
+STATUS_FAIL = "fail"
+STATUS_CHOICES = [
+    (STATUS_PASS, "Pass"),
+    (STATUS_FAIL, "Fail"),
+]
+
+# Report checks in display order: (key, label when passed, label when failed).
+# Each check owns one bit in AttendanceProof.validation_checks/_failures, so
+# the order must only ever be appended to.
+CHECKS = [
+    ("acoustic_format", "Acoustic format", "Acoustic format"),
+    ("ble_format", "BLE format", "BLE format"),
+    ("acoustic_session", "Acoustic session match", "Acoustic session mismatch"),
+    ("acoustic_freshness", "Acoustic freshness", "Acoustic freshness"),
+    ("ble_session", "BLE session match", "BLE session mismatch"),
+    ("ble_freshness", "BLE freshness", "BLE freshness"),
+]
+CHECK_BITS = {key: 1 << position for position, (key, _, _) in enumerate(CHECKS)}
+
+
+class CheckResult(NamedTuple):
+    checks: int
+    failures: int
+    acoustic_age_seconds: Optional[int]
+    ble_age_seconds: Optional[int]
+
+    @property
+    def status(self) -> str:
+        return STATUS_FAIL if self.failures else STATUS_PASS
+
+
+def evaluate_proof(session_id, acoustic_token, ble_nonce, observed_at) -> CheckResult:
+    """Run the report checks once, measuring signal age at ``observed_at``."""
+    checks = 0
+    failures = 0
+    ages = {}
+
+    for prefix, decoded in (
+        ("acoustic", decode_acoustic(acoustic_token.strip())),
+        ("ble", decode_ble(ble_nonce.strip())),
+    ):
+        checks |= CHECK_BITS[f"{prefix}_format"]
+        if decoded is None:
+            failures |= CHECK_BITS[f"{prefix}_format"]
+            ages[prefix] = None
+            continue
+
+        issued = datetime.fromtimestamp(decoded.issued, tz=dt_timezone.utc)
+        age = int((observed_at - issued).total_seconds())
+        ages[prefix] = age
+        checks |= CHECK_BITS[f"{prefix}_session"] | CHECK_BITS[f"{prefix}_freshness"]
+        if decoded.session_id != session_id:
+            failures |= CHECK_BITS[f"{prefix}_session"]
+        if not 0 <= age <= EXPIRY_SECONDS:
+            failures |= CHECK_BITS[f"{prefix}_freshness"]
+
+    return CheckResult(checks, failures, ages["acoustic"], ages["ble"])
+
+
+def check_labels(checks, failures):
+    passed = []
+    failed = []
+    for key, passed_label, failed_label in CHECKS:
+        bit = CHECK_BITS[key]
+        if failures & bit:
+            failed.append(failed_label)
+        elif checks & bit:
+            passed.append(passed_label)
+    return passed, failed
@@ -0,0 +1,290 @@
+"""Classroom burst load test against a running backend.
+
+A simulated lecturer creates a session and runs a beacon that rotates
+``ac|...`` / ``ble|...`` tokens like the app does. N simulated students
+register, log in and then submit proofs inside the freshness window. Each
+student gets a pair of their own (the beacon's challenge and nonce plus a
+per-student suffix), so the replay guard does not reject all but the first
+proof per rotation.
+
+    python manage.py runserver --noreload &
+    python benchmarks/classroom_burst.py --students 200 --concurrency 32
+
+Only the standard library is used, so it runs from any machine that can
+reach the server. Query counts come from the X-DB-Query-Count header, which
+the server adds when ATTENDANCE_QUERY_COUNT_HEADER is on (the default with
+DEBUG).
+"""
+
+import argparse
+import json
+import random
+import secrets
+import string
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+
+@dataclass
+class Sample:
+    phase: str
+    status: int
+    seconds: float
+    queries: int = None
+    errors: list = field(default_factory=list)
+
+
+class Api:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def call(self, phase, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Token {token}"
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, headers=headers, method=method
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, raw, response_headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as exc:
+            status, raw, response_headers = exc.code, exc.read(), exc.headers
+        except (urllib.error.URLError, OSError) as exc:
+            return Sample(phase, 0, time.perf_counter() - started, errors=[f"network: {exc}"]), None
+        elapsed = time.perf_counter() - started
+
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            payload = {}
+        queries = response_headers.get("X-DB-Query-Count")
+        sample = Sample(phase, status, elapsed, int(queries) if queries else None)
+        if status >= 400:
+            sample.errors = _error_messages(payload) or [f"HTTP {status}"]
+        return sample, payload
+
+
+def _error_messages(payload):
+    if isinstance(payload, dict):
+        return [message for value in payload.values() for message in _error_messages(value)]
+    if isinstance(payload, list):
+        return [message for value in payload for message in _error_messages(value)]
+    return [str(payload)]
+
+
+class Beacon:
+    """Rotates acoustic/BLE tokens every ``rotate_seconds`` like the lecturer app."""
+
+    def __init__(self, session_id, token_version, rotate_seconds):
+        self.session_id = session_id
+        self.token_version = token_version
+        self.rotate_seconds = rotate_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._rotate()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def current(self, suffix):
+        """The current pair, made unique to one student by ``suffix``."""
+        with self._lock:
+            return f"{self._acoustic}_{suffix}", f"{self._ble}_{suffix}"
+
+    def _run(self):
+        while not self._stop.wait(self.rotate_seconds):
+            self._rotate()
+
+    def _rotate(self):
+        issued = int(time.time())
+        challenge = "ac_" + _random_suffix()
+        nonce = "ble_" + _random_suffix()
+        with self._lock:
+            self._acoustic = f"ac|{self.session_id}|{self.token_version}|{issued}|{challenge}"
+            self._ble = f"ble|{self.session_id}|{issued}|{nonce}"
+
+
+def _random_suffix(length=12):
+    alphabet = string.ascii_lowercase + string.digits
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def setup_lecturer(api, run_id):
+    username = f"lecturer-{run_id}"
+    password = "burst-" + run_id
+    sample, payload = api.call(
+        "setup",
+        "POST",
+        "/api/auth/register/",
+        {"full_name": "Load Test Lecturer", "username": username, "role": "lecturer", "password": password},
+    )
+    if sample.status != 201:
+        raise SystemExit(f"Lecturer registration failed: {sample.errors}")
+    token = payload["token"]
+    sample, session = api.call(
+        "setup",
+        "POST",
+        "/api/sessions/",
+        {
+            "course_code": "LOAD101",
+            "course_title": "Burst Load Test",
+            "lecturer_name": "Load Test Lecturer",
+            "room": "Hall A",
+            "starts_at": datetime.now(timezone.utc).isoformat(),
+            "token_version": "v1",
+        },
+        token=token,
+    )
+    if sample.status != 201:
+        raise SystemExit(f"Session creation failed: {sample.errors}")
+    return session
+
+
+def setup_student(api, run_id, index):
+    matric = f"LT/{run_id}/{index:05d}"
+    password = "burst-" + run_id
+    register, _ = api.call(
+        "register",
+        "POST",
+        "/api/auth/register/",
+        {"full_name": f"Student {index}", "matric_number": matric, "role": "student", "password": password},
+    )
+    login, payload = api.call(
+        "login", "POST", "/api/auth/login/", {"identifier": matric, "password": password}
+    )
+    token = payload.get("token") if payload else None
+    return matric, token, [register, login]
+
+
+def submit_proof(api, beacon, session_id, matric, token, arrival_seconds):
+    if arrival_seconds:
+        time.sleep(random.uniform(0, arrival_seconds))
+    acoustic, ble = beacon.current(_random_suffix())
+    sample, _ = api.call(
+        "submit",
+        "POST",
+        "/api/attendance/",
+        {
+            "session": session_id,
+            "student_id": matric,
+            "device_id": f"loadtest-{matric}",
+            "acoustic_token": acoustic,
+            "ble_nonce": ble,
+            "rssi": random.randint(-85, -45),
+            "observed_at": datetime.now(timezone.utc).isoformat(),
+            "signature": secrets.token_hex(32),
+        },
+        token=token,
+    )
+    return sample
+
+
+def report(samples, submit_seconds):
+    phases = {}
+    for sample in samples:
+        phases.setdefault(sample.phase, []).append(sample)
+
+    print(f"{'phase':<10}{'requests':>10}{'ok':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries/req':>14}")
+    for phase in ("register", "login", "submit"):
+        items = phases.get(phase, [])
+        if not items:
+            continue
+        latencies = [item.seconds * 1000 for item in items]
+        ok = sum(1 for item in items if 200 <= item.status < 300)
+        counted = [item.queries for item in items if item.queries is not None]
+        queries = f"{sum(counted) / len(counted):.1f}" if counted else "n/a"
+        print(
+            f"{phase:<10}{len(items):>10}{ok:>8}"
+            f"{_percentile(latencies, 50):>10.1f}{_percentile(latencies, 95):>10.1f}"
+            f"{_percentile(latencies, 99):>10.1f}{queries:>14}"
+        )
+
+    submits = phases.get("submit", [])
+    accepted = sum(1 for item in submits if item.status == 201)
+    if submit_seconds > 0:
+        print(
+            f"\nSubmit phase: {len(submits) / submit_seconds:.1f} req/s, "
+            f"{accepted / submit_seconds:.1f} accepted proofs/s over {submit_seconds:.2f}s"
+        )
+
+    errors = Counter(message for item in submits for message in item.errors)
+    if errors:
+        print("\nSubmit errors:")
+        for message, count in errors.most_common():
+            print(f"{count:>8}  {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=100, help="Class size.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel client threads.")
+    parser.add_argument(
+        "--rotate-seconds", type=float, default=60, help="Beacon token rotation interval."
+    )
+    parser.add_argument(
+        "--arrival-seconds",
+        type=float,
+        default=0,
+        help="Spread student submissions uniformly over this many seconds (0 = all at once).",
+    )
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout.")
+    args = parser.parse_args()
+
+    api = Api(args.base_url, args.timeout)
+    run_id = f"{int(time.time())}{secrets.token_hex(2)}"
+    session = setup_lecturer(api, run_id)
+    beacon = Beacon(session["id"], session.get("token_version") or "v1", args.rotate_seconds)
+    beacon.start()
+
+    samples = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        students = list(
+            pool.map(lambda index: setup_student(api, run_id, index), range(args.students))
+        )
+        for _, _, setup_samples in students:
+            samples.extend(setup_samples)
+
+        started = time.perf_counter()
+        samples.extend(
+            pool.map(
+                lambda student: submit_proof(
+                    api, beacon, session["id"], student[0], student[1], args.arrival_seconds
+                ),
+                [student for student in students if student[1]],
+            )
+        )
+        submit_seconds = time.perf_counter() - started
+    beacon.stop()
+
+    print(
+        f"Session {session['id']}: {args.students} students, concurrency {args.concurrency}, "
+        f"beacon rotation {args.rotate_seconds:g}s\n"
+    )
+    report(samples, submit_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Accepted proofs per second for each database profile.
+
+Every profile runs in its own process against a fresh database. Threads
+push proofs through AttendanceProofSerializer, which does the same replay
+guard and proof writes as POST /api/attendance/, so the numbers show how
+each profile copes with concurrent writers without HTTP in the way.
+
+    python benchmarks/db_profiles.py --proofs 2000 --concurrency 16
+    python benchmarks/db_profiles.py --profiles postgres --postgres-db attendance_bench
+
+Each proof uses its own beacon tokens so every submission reaches both
+INSERTs. The postgres profile reads the other POSTGRES_* variables, but
+not POSTGRES_DB: the database it uses is flushed, so it must be named
+with --postgres-db, or --yes-flush given to use attendance_bench. Never
+aim it at real data.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PROFILES = ("sqlite", "sqlite-wal", "postgres")
+# Not the app's "attendance": the benchmark flushes this database.
+BENCH_DATABASE = "attendance_bench"
+
+
+def run_worker(args):
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import close_old_connections, connection, connections
+    from django.utils import timezone
+
+    from attendance.models import Session, UserProfile
+    from attendance.serializers import AttendanceProofSerializer
+
+    call_command("migrate", verbosity=0)
+    if connection.vendor == "postgresql":
+        call_command("flush", interactive=False, verbosity=0)
+
+    user = User.objects.create(username="bench-lecturer")
+    lecturer = UserProfile.objects.create(user=user, role=UserProfile.ROLE_LECTURER)
+    session = Session.objects.create(
+        course_code="BENCH101",
+        course_title="Database profile benchmark",
+        lecturer_name="Bench",
+        room="Hall A",
+        starts_at=timezone.now(),
+        token_version="v1",
+        created_by=lecturer,
+    )
+    connections.close_all()
+
+    errors = Counter()
+    errors_lock = threading.Lock()
+
+    def submit(index):
+        issued = int(time.time())
+        serializer = AttendanceProofSerializer(
+            data={
+                "session": session.id,
+                "student_id": f"BENCH/{index:06d}",
+                "device_id": f"bench-{index}",
+                "acoustic_token": f"ac|{session.id}|v1|{issued}|ac_{index:012d}",
+                "ble_nonce": f"ble|{session.id}|{issued}|ble_{index:012d}",
+                "rssi": -60,
+                "observed_at": timezone.now().isoformat(),
+                "signature": "0" * 64,
+            }
+        )
+        try:
+            if serializer.is_valid():
+                serializer.save()
+                return True
+            message = json.dumps(serializer.errors)
+        except Exception as exc:
+            message = f"{type(exc).__name__}: {exc}"
+        finally:
+            # What request_finished does: honours CONN_MAX_AGE and the pool.
+            close_old_connections()
+        with errors_lock:
+            errors[message] += 1
+        return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        accepted = sum(pool.map(submit, range(args.proofs)))
+    elapsed = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {
+                "profile": os.environ.get("ATTENDANCE_DB_PROFILE", "sqlite"),
+                "accepted": accepted,
+                "seconds": elapsed,
+                "errors": errors.most_common(5),
+            }
+        )
+    )
+
+
+def run_profile(profile, args):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            ATTENDANCE_DB_PROFILE=profile,
+            SQLITE_PATH=os.path.join(directory, "bench.sqlite3"),
+            POSTGRES_DB=args.postgres_db or BENCH_DATABASE,
+        )
+        completed = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--worker",
+                "--proofs",
+                str(args.proofs),
+                "--concurrency",
+                str(args.concurrency),
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if completed.returncode != 0:
+        reason = (completed.stderr.strip().splitlines() or ["worker failed"])[-1]
+        return {"profile": profile, "skipped": reason}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=["sqlite", "sqlite-wal"])
+    parser.add_argument("--proofs", type=int, default=1000, help="Proofs submitted per profile.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel writer threads.")
+    parser.add_argument(
+        "--postgres-db",
+        help=f"Database the postgres profile flushes and writes to (default {BENCH_DATABASE}).",
+    )
+    parser.add_argument(
+        "--yes-flush",
+        action="store_true",
+        help=f"Let the postgres profile flush {BENCH_DATABASE} without --postgres-db.",
+    )
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+    if "postgres" in args.profiles and not (args.postgres_db or args.yes_flush):
+        parser.error(
+            "the postgres profile flushes its database: name it with --postgres-db, "
+            f"or pass --yes-flush to use {BENCH_DATABASE}"
+        )
+
+    print(f"{args.proofs} proofs per profile, concurrency {args.concurrency}\n")
+    print(f"{'profile':<12}{'accepted':>10}{'failed':>8}{'seconds':>10}{'proofs/s':>10}")
+    for profile in args.profiles:
+        result = run_profile(profile, args)
+        if "skipped" in result:
+            print(f"{profile:<12}  skipped: {result['skipped']}")
+            continue
+        failed = args.proofs - result["accepted"]
+        print(
+            f"{profile:<12}{result['accepted']:>10}{failed:>8}{result['seconds']:>10.2f}"
+            f"{result['accepted'] / result['seconds']:>10.1f}"
+        )
+        for message, count in result["errors"]:
+            print(f"{'':<12}{count:>6}  {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Ed25519 proof verifications per second on one core.
+
+Compares verifying with a key decoded for every proof against the cached
+path ingest uses (attendance.signing.DeviceSignatureVerifier), so the cost
+of parsing keys is visible next to the signature check itself.
+
+    python benchmarks/signature_verify.py --proofs 20000 --devices 500
+
+No database is touched: the verifier's cache is filled up front, as it is
+after a batch upload's single prefetch query.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--proofs", type=int, default=20000, help="Signed proofs to verify.")
+    parser.add_argument("--devices", type=int, default=500, help="Distinct device keys.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    from attendance.signing import (
+        DeviceKeyCache,
+        DeviceSignatureVerifier,
+        RegisteredDevice,
+        canonical_payload,
+        decode_public_key,
+    )
+
+    keys = [Ed25519PrivateKey.generate() for _ in range(args.devices)]
+    encoded_keys = [key.public_key().public_bytes_raw().hex() for key in keys]
+    issued = int(time.time())
+    proofs = []
+    for index in range(args.proofs):
+        device = index % args.devices
+        student_id = f"21/52HP{device:04d}"
+        device_id = f"device-{device}"
+        payload = canonical_payload(
+            1,
+            student_id,
+            device_id,
+            f"ac|1|v1|{issued}|ac_{index:012d}",
+            f"ble|1|{issued}|ble_{index:012d}",
+            -60,
+            "2026-02-16T10:30:12.000Z",
+        )
+        proofs.append((device, student_id, device_id, payload, keys[device].sign(payload).hex()))
+
+    cache = DeviceKeyCache(max_entries=args.devices, ttl_seconds=3600)
+    for device, key in enumerate(encoded_keys):
+        cache.set(f"device-{device}", RegisteredDevice(f"21/52HP{device:04d}", decode_public_key(key)))
+    verifier = DeviceSignatureVerifier(cache, required=True)
+
+    def decode_every_time():
+        for device, _, _, payload, signature in proofs:
+            decode_public_key(encoded_keys[device]).verify(bytes.fromhex(signature), payload)
+
+    def cached():
+        for _, student_id, device_id, payload, signature in proofs:
+            error = verifier.verify(student_id, device_id, payload, signature)
+            if error:
+                raise SystemExit(error)
+
+    print(f"{args.proofs} proofs from {args.devices} devices, one thread\n")
+    print(f"{'path':<22}{'seconds':>10}{'verifies/s':>14}{'us/verify':>12}")
+    for name, run in (("decode key per proof", decode_every_time), ("cached verifier", cached)):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<22}{elapsed:>10.2f}{args.proofs / elapsed:>14.0f}"
+            f"{elapsed / args.proofs * 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
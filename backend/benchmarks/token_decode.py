@@ -0,0 +1,77 @@
+"""Acoustic token decodes per second: regex vs attendance.codec.
+
+Decodes the same tokens three ways: the ``ac|...`` regex the serializer
+used to run, the codec's parser for that string form, and the codec's
+26-character compact form. It also prints each form's length, since the
+ultrasonic channel carries only a few bits per second.
+
+    python benchmarks/token_decode.py --tokens 200000
+
+Only attendance.codec is imported, so Django is not set up.
+"""
+
+import argparse
+import re
+import secrets
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+ACOUSTIC_PATTERN = re.compile(
+    r"^ac\|(?P<session>\d+)\|(?P<version>[A-Za-z0-9_.-]+)\|(?P<issued>\d{10})\|(?P<challenge>[A-Za-z0-9_]+)$"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=200000, help="Tokens to decode per path.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from attendance.codec import CHALLENGE_BYTES, decode_acoustic, encode_acoustic
+
+    issued = int(time.time())
+    challenges = [secrets.token_bytes(8) for _ in range(1000)]
+    text = [
+        # The salt_mac challenge POST /api/sessions/<id>/tokens/ issues.
+        encode_acoustic(index % 5000 + 1, "v3", issued, f"{secrets.token_hex(4)}_{challenge.hex()}")
+        for index, challenge in enumerate(challenges)
+    ]
+    compact = [
+        encode_acoustic(index % 5000 + 1, "v3", issued, challenge[:CHALLENGE_BYTES], compact=True)
+        for index, challenge in enumerate(challenges)
+    ]
+    rounds = max(1, args.tokens // len(challenges))
+
+    def regex(tokens):
+        for _ in range(rounds):
+            for token in tokens:
+                match = ACOUSTIC_PATTERN.match(token)
+                int(match.group("session")), int(match.group("issued")), match.group("challenge")
+
+    def codec(tokens):
+        for _ in range(rounds):
+            for token in tokens:
+                decode_acoustic(token)
+
+    total = rounds * len(challenges)
+    print(f"{total} decodes per path, one thread\n")
+    print(f"{'path':<20}{'chars':>7}{'seconds':>10}{'decodes/s':>14}{'ns/decode':>12}")
+    for name, run, tokens in (
+        ("regex, text form", regex, text),
+        ("codec, text form", codec, text),
+        ("codec, compact", codec, compact),
+    ):
+        started = time.perf_counter()
+        run(tokens)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<20}{len(tokens[0]):>7}{elapsed:>10.2f}{total / elapsed:>14.0f}"
+            f"{elapsed / total * 1e9:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    "attendance.middleware.RequestMetricsMiddleware",
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -77,12 +81,94 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# ATTENDANCE_DB_PROFILE picks the database:
+#   sqlite      local development (default)
+#   sqlite-wal  SQLite tuned for concurrent proof submissions
+#   postgres    PostgreSQL from the POSTGRES_* variables
+
+ATTENDANCE_DB_PROFILE = os.environ.get("ATTENDANCE_DB_PROFILE", "sqlite")
+
+if ATTENDANCE_DB_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "attendance"),
+            "USER": os.environ.get("POSTGRES_USER", "attendance"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "127.0.0.1"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        }
     }
-}
+    if os.environ.get("POSTGRES_POOL", "1") == "1":
+        # psycopg pool shared by the worker's threads; check() pings a
+        # connection before it is handed out.
+        from psycopg_pool import ConnectionPool
+
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get("POSTGRES_POOL_MIN", "2")),
+                "max_size": int(os.environ.get("POSTGRES_POOL_MAX", "10")),
+                "timeout": 10,
+                "check": ConnectionPool.check_connection,
+            }
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("POSTGRES_CONN_MAX_AGE", "600"))
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif ATTENDANCE_DB_PROFILE in ("sqlite", "sqlite-wal"):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
+        }
+    }
+    if ATTENDANCE_DB_PROFILE == "sqlite-wal":
+        # WAL lets readers run alongside the single writer, IMMEDIATE takes
+        # the write lock when a transaction starts instead of failing on
+        # upgrade, and the timeout makes writers queue instead of raising
+        # "database is locked".
+        DATABASES["default"]["OPTIONS"] = {
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        }
+else:
+    raise ImproperlyConfigured(f"Unknown ATTENDANCE_DB_PROFILE: {ATTENDANCE_DB_PROFILE!r}")
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/ref/settings/#caches
+
+#
+# ATTENDANCE_CACHE picks the default cache, which holds the history results
+# and their version counters. run_session_sweeper bumps those counters from
+# its own process, so every deployment with more than one process (web
+# workers plus the sweeper) needs a shared backend:
+#   locmem    per process; a single runserver only (default)
+#   database  the attendance_cache table (python manage.py createcachetable)
+#   redis     REDIS_URL (pip install redis)
+
+ATTENDANCE_CACHE = os.environ.get("ATTENDANCE_CACHE", "locmem")
+
+if ATTENDANCE_CACHE == "locmem":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+elif ATTENDANCE_CACHE == "database":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "attendance_cache",
+        }
+    }
+elif ATTENDANCE_CACHE == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/0"),
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown ATTENDANCE_CACHE: {ATTENDANCE_CACHE!r}")
 
 
 # Password validation
@@ -128,9 +214,99 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "attendance.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
+
+# Replay protection for challenge/nonce pairs. "database" keeps every claim in
+# AttendanceReplayGuard; "memory" keeps them in a per-process store that drops
+# expired buckets, with DURABLE also writing through to the table so several
+# worker processes share claims.
+ATTENDANCE_REPLAY_GUARD = {
+    "BACKEND": "database",
+    "DURABLE": True,
+    "BUCKET_SECONDS": 10,
+}
+
+# Token -> user/profile resolution cached per process by
+# attendance.authentication.CachedTokenAuthentication. Entries are evicted on
+# token deletion and user/profile changes in the process that made them.
+# Other workers keep accepting a deleted token or deactivated user until
+# their entry expires, so TTL_SECONDS is the revocation window.
+ATTENDANCE_AUTH_CACHE = {
+    "MAX_ENTRIES": 10000,
+    "TTL_SECONDS": 5,
+}
+
+# Adds X-DB-Query-Count to every response (read by benchmarks/classroom_burst.py).
+ATTENDANCE_QUERY_COUNT_HEADER = DEBUG
+
+# Per-process request latency, SQL and proof validation metrics in Prometheus
+# text format at /api/metrics/. Nothing is recorded or served until TOKEN is
+# set; scrapers send it as a bearer token.
+ATTENDANCE_METRICS = {
+    "ENABLED": True,
+    "TOKEN": os.environ.get("ATTENDANCE_METRICS_TOKEN", ""),
+}
+
+# Ed25519 proof signatures from devices registered at /api/devices/. With
+# REQUIRED off, devices without a registered key may still submit; proofs
+# from registered devices are always verified.
+ATTENDANCE_DEVICE_KEYS = {
+    "REQUIRED": False,
+    "CACHE_MAX_ENTRIES": 20000,
+    "CACHE_TTL_SECONDS": 300,
+}
+
+# HMAC-authenticated acoustic/BLE tokens from POST /api/sessions/<id>/tokens/.
+# With REQUIRED on, proofs carrying any other token are rejected before the
+# database is queried.
+ATTENDANCE_SIGNED_TOKENS = {
+    "REQUIRED": False,
+    "SLOT_SECONDS": 10,
+}
+
+# Where archive_proofs writes past terms' proofs (gzip JSONL, one file per
+# course and term per run) and how many months make up a term.
+ATTENDANCE_ARCHIVE = {
+    "ROOT": os.environ.get("ATTENDANCE_ARCHIVE_ROOT", BASE_DIR / "archive"),
+    "TERM_MONTHS": 6,
+}
+
+# GET /api/attendance/history/ results are cached in the default cache and
+# invalidated through version counters. Set ATTENDANCE_CACHE to a shared
+# backend (see Cache above) so every worker sees the sweeper's bumps.
+ATTENDANCE_HISTORY = {
+    "CACHE_SECONDS": 300,
+}
+
+# GET /api/sessions/ ETags come from SessionListMarker rows and also roll
+# over every MARKER_TTL_SECONDS; see attendance.conditional.
+ATTENDANCE_SESSION_LIST = {
+    "MARKER_TTL_SECONDS": 300,
+}
+
+# Roster imports; see DEFAULTS in attendance.roster. POST
+# /api/auth/roster/import/ refuses files over MAX_REQUEST_ROWS. Passwords
+# are hashed in up to MAX_WORKERS spawned processes.
+ATTENDANCE_ROSTER = {
+    "MAX_REQUEST_ROWS": 100,
+    "MAX_WORKERS": 4,
+}
+
+# GET /api/sync/ change log; see DEFAULTS in attendance.sync for every key.
+ATTENDANCE_SYNC = {
+    "PAGE_SIZE": 500,
+    "RETENTION_DAYS": 30,
+}
+
+# Thresholds for attendance.anomalies; see DEFAULTS there for every key.
+ATTENDANCE_ANOMALIES = {
+    "RSSI_MIN": -110,
+    "RSSI_MAX": -15,
+    "RATE_WINDOW_SECONDS": 10,
+    "RATE_MAX": 60,
+}